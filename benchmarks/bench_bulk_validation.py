@@ -0,0 +1,65 @@
+"""
+benchmark for validate_tokens_bulk against a local stub server.
+
+the stub answers validate_and_get_payload_from_token/v0 after a fixed delay to stand in
+for network and server time, and the same tokens are validated with a python loop and
+with validate_tokens_bulk. the stub runs in the same process, so at very low latencies
+both sides compete for the gil and the speedup is bounded by cpu, not by waiting.
+
+usage (from the repository root): python -m benchmarks.bench_bulk_validation
+    [--tokens N] [--latency SECONDS] [--concurrency N]
+"""
+
+import argparse
+import time
+
+from benchmarks.stub_server import StubServer, serve_in_background
+from square_authentication_helper.main import SquareAuthenticationHelper
+from square_authentication_helper.pydantic_models import TokenType
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    server = serve_in_background(StubServer(latency=args.latency))
+    tokens = [f"token_{i}" for i in range(args.tokens)]
+    try:
+        with SquareAuthenticationHelper(
+            param_int_square_authentication_port=server.server_address[1],
+            param_str_square_authentication_ip="127.0.0.1",
+            param_int_pool_maxsize=args.concurrency,
+        ) as helper:
+            start = time.perf_counter()
+            for token in tokens:
+                helper.validate_and_get_payload_from_token_v0(
+                    token=token, token_type=TokenType.access_token, app_id=1
+                )
+            loop_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            results = helper.validate_tokens_bulk(
+                tokens,
+                TokenType.access_token,
+                app_id=1,
+                max_concurrency=args.concurrency,
+            )
+            bulk_seconds = time.perf_counter() - start
+            assert all(result.ok for result in results)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print(
+        f"{args.tokens} tokens, {args.latency * 1000:.1f} ms server latency   "
+        f"loop: {loop_seconds:6.3f} s   "
+        f"validate_tokens_bulk (concurrency {args.concurrency}): {bulk_seconds:6.3f} s   "
+        f"speedup: {loop_seconds / bulk_seconds:5.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
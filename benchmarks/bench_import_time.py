@@ -0,0 +1,89 @@
+"""
+import time benchmark for `import square_authentication_helper`.
+
+every run starts a fresh interpreter with python -X importtime and reads the cumulative
+time of the package from its report. "package" is the plain import, "eager" also imports
+what the helpers defer to first use (pydantic models, square_commons,
+square_database_structure), i.e. roughly what the import cost before they were deferred.
+with --max-ms the script exits with status 1 when the package median is above it, so it
+can guard the import time in ci.
+
+usage (from the repository root): python -m benchmarks.bench_import_time
+    [--runs N] [--max-ms MILLISECONDS]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from typing import Dict, Set
+
+_EAGER_IMPORTS = (
+    "square_authentication_helper.pydantic_models",
+    "square_commons.api_utils",
+    "square_database_structure.square.authentication.enums",
+)
+
+
+def _get_top_level_imports(statement: str) -> Dict[str, int]:
+    """
+    top level module -> cumulative microseconds from python -X importtime.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports = {}
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | name", nested imports are indented.
+        parts = line.split("|")
+        if len(parts) == 3 and not parts[2].startswith("   "):
+            try:
+                imports[parts[2].strip()] = int(parts[1])
+            except ValueError:
+                continue
+    return imports
+
+
+def _measure(statement: str, startup: Set[str]) -> float:
+    """
+    milliseconds spent importing what statement imports on top of interpreter startup.
+    """
+    imports = _get_top_level_imports(statement)
+    return sum(t for name, t in imports.items() if name not in startup) / 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-ms", type=float)
+    args = parser.parse_args()
+
+    package_statement = "import square_authentication_helper"
+    eager_statement = "; ".join(
+        [package_statement] + [f"import {module}" for module in _EAGER_IMPORTS]
+    )
+    startup = set(_get_top_level_imports("pass"))
+    # warm the bytecode caches first.
+    _measure(eager_statement, startup)
+    results = {}
+    for name, statement in (("package", package_statement), ("eager", eager_statement)):
+        samples = sorted(_measure(statement, startup) for _ in range(args.runs))
+        results[name] = samples
+        print(
+            f"{name:>8}: median {statistics.median(samples):8.1f} ms"
+            f"  min {samples[0]:8.1f} ms  max {samples[-1]:8.1f} ms"
+        )
+    print(
+        "eager / package median: "
+        f"{statistics.median(results['eager']) / statistics.median(results['package']):.2f}"
+    )
+    if args.max_ms is not None and statistics.median(results["package"]) > args.max_ms:
+        print(f"package import is above {args.max_ms} ms.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+microbenchmark of building response models without validation.
+
+compares turning a raw response body into a dict (response_as_pydantic=False), a
+validated model (response_as_pydantic=True) and the same model built recursively with
+model_construct, i.e. skipping validation.
+
+with pydantic v2 the compiled validator builds models faster than model_construct can
+from python, so skipping validation costs more cpu than validating, which is why the
+helpers have no such mode. the cheap option is the dict output.
+
+usage (from the repository root): python -m benchmarks.bench_response_modes [--number N]
+"""
+
+import argparse
+import json
+import timeit
+import types
+from typing import Any, Union, get_args, get_origin
+
+from pydantic import BaseModel
+
+from benchmarks.bench_response_parsing import (
+    GET_USER_DETAILS_RESPONSE,
+    LOGIN_USERNAME_RESPONSE,
+)
+from square_authentication_helper.pydantic_models import (
+    GetUserDetailsV0Response,
+    LoginUsernameV0Response,
+    get_standard_response_model,
+)
+
+
+def _construct_value(annotation: Any, value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _construct(annotation, value)
+    origin = get_origin(annotation)
+    if origin in (Union, types.UnionType):
+        models = [a for a in get_args(annotation) if a is not type(None)]
+        return _construct_value(models[0], value) if len(models) == 1 else value
+    if origin is list:
+        return [_construct_value(get_args(annotation)[0], each) for each in value]
+    return value
+
+
+def _construct(model: type, data: Any) -> Any:
+    """
+    model built from a json dict with model_construct, nested models included.
+    """
+    if not isinstance(data, dict):
+        return data
+    return model.model_construct(
+        **{
+            name: _construct_value(field.annotation, data[name])
+            for name, field in model.model_fields.items()
+            if name in data
+        }
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    cases = [
+        (GetUserDetailsV0Response, GET_USER_DETAILS_RESPONSE),
+        (LoginUsernameV0Response, LOGIN_USERNAME_RESPONSE),
+    ]
+    for model, response in cases:
+        body = json.dumps(response).encode()
+        response_model = get_standard_response_model(model)
+        timings = {
+            "dict": timeit.timeit(lambda: json.loads(body), number=args.number),
+            "validated": timeit.timeit(
+                lambda: response_model.model_validate_json(body), number=args.number
+            ),
+            "constructed": timeit.timeit(
+                lambda: _construct(response_model, json.loads(body)),
+                number=args.number,
+            ),
+        }
+        print(
+            f"{model.__name__:<28} "
+            + "   ".join(
+                f"{name}: {seconds / args.number * 1e6:6.2f} us/call"
+                for name, seconds in timings.items()
+            )
+            + f"   constructed / validated: "
+            f"{timings['constructed'] / timings['validated']:4.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+microbenchmark for the response_as_pydantic path.
+
+compares subscripting StandardResponse[...] and validating through keyword expansion
+on every call against the cached specialization validating the dict directly, and
+decoding the body with json.loads before validating against parsing the raw bytes with
+model_validate_json.
+
+usage (from the repository root): python -m benchmarks.bench_response_parsing [--number N]
+"""
+
+import argparse
+import json
+import timeit
+
+from square_commons.api_utils import StandardResponse
+
+from square_authentication_helper.pydantic_models import (
+    GetUserDetailsV0Response,
+    LoginUsernameV0Response,
+    get_standard_response_model,
+)
+
+GET_USER_DETAILS_RESPONSE = {
+    "data": {
+        "main": {
+            "user_id": "7c3f6c1e-5a4d-4b5e-9f0a-1d2e3f4a5b6c",
+            "username": "benchmark_user",
+            "profile": {
+                "user_profile_id": 1,
+                "user_profile_photo_storage_token": None,
+                "user_profile_email": "benchmark@example.com",
+                "user_profile_phone_number_country_code": "+1",
+                "user_profile_phone_number": "5550100",
+                "user_profile_first_name": "bench",
+                "user_profile_last_name": "mark",
+                "user_profile_email_verified": "2025-01-01T00:00:00",
+            },
+            "apps": ["app_one", "app_two", "app_three"],
+            "sessions": [
+                {"app_name": "app_one", "active_sessions": 3},
+                {"app_name": "app_two", "active_sessions": 1},
+            ],
+            "recovery_methods": {"email": True, "backup_code": True},
+            "email_verification_details": None,
+            "backup_code_details": {
+                "total": 10,
+                "available": 8,
+                "generated_at": "2025-01-01T00:00:00",
+            },
+            "auth_providers": ["self", "google"],
+        }
+    },
+    "message": "user details read successfully.",
+    "log": None,
+}
+
+LOGIN_USERNAME_RESPONSE = {
+    "data": {
+        "main": {
+            "user_id": "7c3f6c1e-5a4d-4b5e-9f0a-1d2e3f4a5b6c",
+            "access_token": "a" * 200,
+            "refresh_token": "r" * 200,
+            "refresh_token_expiry_time": "2025-01-01T00:00:00",
+        }
+    },
+    "message": "login successful.",
+    "log": None,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    cases = [
+        (GetUserDetailsV0Response, GET_USER_DETAILS_RESPONSE),
+        (LoginUsernameV0Response, LOGIN_USERNAME_RESPONSE),
+    ]
+    for model, response in cases:
+        before = timeit.timeit(
+            lambda: StandardResponse[model](**response), number=args.number
+        )
+        after = timeit.timeit(
+            lambda: get_standard_response_model(model).model_validate(response),
+            number=args.number,
+        )
+        print(
+            f"{model.__name__:<28} "
+            f"subscript + **kwargs: {before / args.number * 1e6:7.2f} us/call   "
+            f"cached model_validate: {after / args.number * 1e6:7.2f} us/call   "
+            f"speedup: {before / after:4.2f}x"
+        )
+        body = json.dumps(response).encode()
+        model_cached = get_standard_response_model(model)
+        before = timeit.timeit(
+            lambda: model_cached.model_validate(json.loads(body)), number=args.number
+        )
+        after = timeit.timeit(
+            lambda: model_cached.model_validate_json(body), number=args.number
+        )
+        print(
+            f"{model.__name__:<28} "
+            f"json.loads + validate: {before / args.number * 1e6:6.2f} us/call   "
+            f"model_validate_json:   {after / args.number * 1e6:7.2f} us/call   "
+            f"speedup: {before / after:4.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,499 @@
+"""
+benchmark suite of every SquareAuthenticationHelper *_v0 method against a local stub.
+
+the stub answers each endpoint with a response body recorded once from
+FakeAuthenticationServer, so the payloads (and their validation cost) are realistic, and
+runs in a separate process so the measurements below only see the client.
+
+for dict and pydantic output, every method is called sequentially and at each
+concurrency level (threads sharing one helper) and reports ops/sec and p50 / p99 latency.
+allocations per call are measured sequentially with tracemalloc (peak bytes allocated
+during a call and bytes still held afterwards), rss is read after each output mode.
+
+results are written as json with --output, --compare reads such a file from an earlier
+run (e.g. the previous release) and prints the change of every row, exiting with status 1
+when a row lost more than --max-regression of its ops/sec.
+
+usage (from the repository root): python -m benchmarks.bench_suite
+    [--requests N] [--concurrency 1,8,32] [--latency SECONDS] [--methods a_v0,b_v0]
+    [--allocation-calls N] [--output results.json] [--compare baseline.json]
+    [--max-regression 0.1]
+"""
+
+import argparse
+import functools
+import gc
+import importlib.metadata
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+import tomllib
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.stub_server import StubServer
+from square_authentication_helper.endpoints import ENDPOINTS
+from square_authentication_helper.fake_server import FakeAuthenticationServer
+from square_authentication_helper.main import SquareAuthenticationHelper
+from square_authentication_helper.pydantic_models import TokenType
+
+_OUTPUTS = ("dict", "pydantic")
+
+
+def _get_arguments() -> Dict[str, Dict[str, Any]]:
+    """
+    arguments of every benchmarked call, the stub ignores them so tokens are placeholders.
+    """
+    from square_database_structure.square.authentication.enums import (
+        RecoveryMethodEnum,
+    )
+
+    token = {"access_token": "token"}
+    login = {"username": "alice", "new_password": "pw", "app_id": 1}
+    return {
+        "register_username_v0": {"username": "alice", "password": "pw", "app_id": 1},
+        "login_username_v0": {
+            "username": "alice",
+            "password": "pw",
+            "app_id": 1,
+            "assign_app_id_if_missing": False,
+        },
+        "generate_access_token_v0": {"refresh_token": "token"},
+        "logout_v0": {"refresh_token": "token"},
+        "logout_apps_v0": {**token, "app_ids": [1]},
+        "logout_all_v0": token,
+        "get_user_details_v0": token,
+        "update_user_app_ids_v0": {
+            **token,
+            "app_ids_to_add": [1],
+            "app_ids_to_remove": [2],
+        },
+        "update_username_v0": {**token, "new_username": "alice"},
+        "delete_user_v0": {**token, "password": "pw"},
+        "update_password_v0": {
+            **token,
+            "old_password": "pw",
+            "new_password": "pw2",
+            "logout_other_sessions": True,
+            "preserve_session_refresh_token": "token",
+        },
+        "validate_and_get_payload_from_token_v0": {
+            "token": "token",
+            "token_type": TokenType.access_token,
+            "app_id": 1,
+        },
+        "update_profile_photo_v0": {
+            **token,
+            "profile_photo": ("photo.png", b"\x89PNG" + bytes(1024), "image/png"),
+        },
+        "update_user_recovery_methods_v0": {
+            **token,
+            "recovery_methods_to_add": list(RecoveryMethodEnum),
+            "recovery_methods_to_remove": [],
+        },
+        "generate_account_backup_codes_v0": token,
+        "reset_password_and_login_using_backup_code_v0": {
+            **login,
+            "backup_code": "code",
+            "logout_other_sessions": False,
+        },
+        "send_reset_password_email_v0": {"username": "alice", "redirect_url": None},
+        "validate_email_verification_code_v0": {**token, "verification_code": "1"},
+        "send_verification_email_v0": {**token, "redirect_url": None},
+        "update_profile_details_v0": {
+            **token,
+            "first_name": "Alice",
+            "email": "alice@example.com",
+        },
+        "reset_password_and_login_using_reset_email_code_v0": {
+            **login,
+            "reset_email_code": "1",
+            "logout_other_sessions": False,
+        },
+        "register_login_google_v0": {
+            "google_id": "google",
+            "app_id": 1,
+            "assign_app_id_if_missing": False,
+        },
+        "get_user_recovery_methods_v0": {"username": "alice"},
+        "add_self_auth_provider_v0": {**token, "password": "pw"},
+        "add_google_auth_provider_v0": {**token, "google_id_token": "google"},
+        "unlink_auth_provider_v0": {**token, "auth_provider": "GOOGLE"},
+    }
+
+
+def _record_bodies() -> Dict[str, bytes]:
+    """
+    path -> response body of one successful call of every endpoint on the fake server.
+    """
+    recovery_methods = _get_arguments()["update_user_recovery_methods_v0"][
+        "recovery_methods_to_add"
+    ]
+    bodies = {}
+    with (
+        FakeAuthenticationServer() as server,
+        SquareAuthenticationHelper(
+            param_str_square_authentication_url=server.url
+        ) as helper,
+    ):
+        state = server.state
+
+        def call(name, **kwargs):
+            response = getattr(helper, name)(**kwargs)
+            bodies[ENDPOINTS[name].path] = json.dumps(response).encode()
+            return response["data"]
+
+        main = call("register_username_v0", username="alice", password="pw", app_id=1)[
+            "main"
+        ]
+        user_id, refresh_token = main["user_id"], main["refresh_token"]
+        access_token = call(
+            "login_username_v0",
+            username="alice",
+            password="pw",
+            app_id=2,
+            assign_app_id_if_missing=True,
+        )["main"]["access_token"]
+        token = {"access_token": access_token}
+        call("generate_access_token_v0", refresh_token=refresh_token)
+        call(
+            "validate_and_get_payload_from_token_v0",
+            token=access_token,
+            token_type=TokenType.access_token,
+            app_id=2,
+        )
+        call(
+            "update_user_app_ids_v0", **token, app_ids_to_add=[3], app_ids_to_remove=[]
+        )
+        call("update_username_v0", **token, new_username="alicia")
+        call(
+            "update_profile_details_v0",
+            **token,
+            first_name="Alice",
+            last_name="Smith",
+            email="alice@example.com",
+            phone_number_country_code="+1",
+            phone_number="5550100",
+        )
+        call("update_profile_photo_v0", **token, profile_photo=("p.png", b"p", "x"))
+        call("send_verification_email_v0", **token, redirect_url=None)
+        call(
+            "validate_email_verification_code_v0",
+            **token,
+            verification_code=state.email_verification_codes[user_id],
+        )
+        call(
+            "update_user_recovery_methods_v0",
+            **token,
+            recovery_methods_to_add=recovery_methods,
+            recovery_methods_to_remove=[],
+        )
+        backup_codes = call("generate_account_backup_codes_v0", **token)["main"][
+            "backup_codes"
+        ]
+        call("send_reset_password_email_v0", username="alicia", redirect_url=None)
+        call("get_user_details_v0", **token)
+        call("get_user_recovery_methods_v0", username="alicia")
+        call(
+            "reset_password_and_login_using_backup_code_v0",
+            backup_code=backup_codes[0],
+            username="alicia",
+            new_password="pw",
+            app_id=1,
+            logout_other_sessions=False,
+        )
+        call(
+            "reset_password_and_login_using_reset_email_code_v0",
+            reset_email_code=state.reset_email_codes[user_id],
+            username="alicia",
+            new_password="pw",
+            app_id=1,
+            logout_other_sessions=False,
+        )
+        call("add_google_auth_provider_v0", **token, google_id_token="google-alice")
+        call("unlink_auth_provider_v0", **token, auth_provider="GOOGLE")
+        google = call(
+            "register_login_google_v0",
+            google_id="google-bob",
+            app_id=1,
+            assign_app_id_if_missing=False,
+        )["main"]
+        call(
+            "add_self_auth_provider_v0",
+            access_token=google["access_token"],
+            password="pw",
+        )
+        call("logout_v0", refresh_token=google["refresh_token"])
+        call("logout_apps_v0", **token, app_ids=[3])
+        call("logout_all_v0", **token)
+        call(
+            "update_password_v0",
+            **token,
+            old_password="pw",
+            new_password="pw2",
+            logout_other_sessions=False,
+            preserve_session_refresh_token=None,
+        )
+        call("delete_user_v0", **token, password="pw2")
+    return bodies
+
+
+def _serve_stub(bodies: Dict[str, bytes], latency: float, connection):
+    server = StubServer(bodies=bodies, latency=latency)
+    connection.send(server.server_address[1])
+    server.serve_forever()
+
+
+def _get_rss_bytes() -> Optional[int]:
+    """
+    current resident set size of this process, none where /proc is not available.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def _get_max_rss_bytes() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos.
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def _get_version() -> Optional[str]:
+    """
+    installed package version, or the one in pyproject.toml of a source checkout.
+    """
+    try:
+        return importlib.metadata.version("square_authentication_helper")
+    except importlib.metadata.PackageNotFoundError:
+        pass
+    try:
+        with open(Path(__file__).parent.parent / "pyproject.toml", "rb") as pyproject:
+            return tomllib.load(pyproject)["project"]["version"]
+    except (OSError, KeyError, tomllib.TOMLDecodeError):
+        return None
+
+
+def _percentile(sorted_samples: List[float], fraction: float) -> float:
+    index = min(len(sorted_samples) - 1, int(fraction * len(sorted_samples)))
+    return sorted_samples[index]
+
+
+def _run_throughput(
+    call: Callable[[], Any], requests: int, concurrency: int
+) -> Dict[str, float]:
+    """
+    requests calls spread over concurrency threads, latencies in milliseconds.
+    """
+    per_worker = [
+        requests // concurrency + (i < requests % concurrency)
+        for i in range(concurrency)
+    ]
+    barrier = threading.Barrier(concurrency + 1)
+
+    def worker(count):
+        latencies = []
+        barrier.wait()
+        for _ in range(count):
+            start = time.perf_counter()
+            call()
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(worker, count) for count in per_worker]
+        barrier.wait()
+        start = time.perf_counter()
+        latencies = sorted(x for future in futures for x in future.result())
+        seconds = time.perf_counter() - start
+    return {
+        "ops_per_sec": len(latencies) / seconds,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": _percentile(latencies, 0.5) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+    }
+
+
+def _run_allocations(call: Callable[[], Any], calls: int) -> Dict[str, float]:
+    """
+    bytes allocated at the peak of each call (above what was held before it) and bytes
+    still held after all calls, both per call.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        call()
+        gc.collect()
+        start_current, _ = tracemalloc.get_traced_memory()
+        peaks = []
+        for _ in range(calls):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            call()
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - start_current
+    finally:
+        tracemalloc.stop()
+    return {
+        "peak_bytes_per_call": statistics.fmean(peaks),
+        "retained_bytes_per_call": retained / calls,
+    }
+
+
+def _compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], max_regression, log=print
+):
+    """
+    print the change of every row against baseline, true when a row regressed more
+    than max_regression.
+    """
+    rows = {
+        (row["method"], row["output"], row["concurrency"]): row
+        for row in baseline["throughput"]
+    }
+    regressed = False
+    log(
+        f"\ncompared with {baseline['meta'].get('version')} "
+        f"({baseline['meta'].get('timestamp')}):"
+    )
+    for row in results["throughput"]:
+        old = rows.get((row["method"], row["output"], row["concurrency"]))
+        if old is None:
+            continue
+        change = row["ops_per_sec"] / old["ops_per_sec"] - 1
+        flag = ""
+        if max_regression is not None and change < -max_regression:
+            regressed = True
+            flag = "  REGRESSION"
+        log(
+            f"{row['method']:>52} {row['output']:>8} c={row['concurrency']:<3} "
+            f"ops/sec {change:+7.1%}  p99 {row['p99_ms'] / old['p99_ms'] - 1:+7.1%}"
+            f"{flag}"
+        )
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--methods")
+    parser.add_argument("--allocation-calls", type=int, default=50)
+    parser.add_argument("--output", help="write the results as json, - for stdout.")
+    parser.add_argument("--compare", help="json results of an earlier run.")
+    parser.add_argument("--max-regression", type=float)
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    methods = args.methods.split(",") if args.methods else list(ENDPOINTS)
+    arguments = _get_arguments()
+    bodies = _record_bodies()
+    # the stub gets its own process so allocations, rss and cpu here are the client's.
+    context = multiprocessing.get_context("spawn")
+    parent_connection, child_connection = context.Pipe()
+    stub = context.Process(
+        target=_serve_stub,
+        args=(bodies, args.latency, child_connection),
+        daemon=True,
+    )
+    stub.start()
+    port = parent_connection.recv()
+    # json to stdout replaces the table.
+    log = functools.partial(print, file=sys.stderr) if args.output == "-" else print
+
+    results = {
+        "meta": {
+            "version": _get_version(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "requests": args.requests,
+            "concurrency": levels,
+            "latency": args.latency,
+        },
+        "throughput": [],
+        "allocations": [],
+        "rss": {"start_bytes": _get_rss_bytes()},
+    }
+    try:
+        with SquareAuthenticationHelper(
+            param_int_square_authentication_port=port,
+            param_str_square_authentication_ip="127.0.0.1",
+            param_int_pool_maxsize=max(levels),
+        ) as helper:
+            for output in _OUTPUTS:
+                log(f"\n{output} output")
+                for name in methods:
+                    method = getattr(helper, name)
+                    kwargs = dict(
+                        arguments[name], response_as_pydantic=output != "dict"
+                    )
+
+                    def call():
+                        return method(**kwargs)
+
+                    for _ in range(args.warmup):
+                        call()
+                    for level in levels:
+                        row = _run_throughput(call, args.requests, level)
+                        results["throughput"].append(
+                            {
+                                "method": name,
+                                "output": output,
+                                "concurrency": level,
+                                **row,
+                            }
+                        )
+                        log(
+                            f"{name:>52} c={level:<3} {row['ops_per_sec']:9.1f} ops/sec"
+                            f"  p50 {row['p50_ms']:7.3f} ms  p99 {row['p99_ms']:7.3f} ms"
+                        )
+                    allocations = _run_allocations(call, args.allocation_calls)
+                    results["allocations"].append(
+                        {"method": name, "output": output, **allocations}
+                    )
+                    log(
+                        f"{'':>52}       {allocations['peak_bytes_per_call']:9.0f} "
+                        f"peak bytes / call  "
+                        f"{allocations['retained_bytes_per_call']:7.1f} retained bytes / call"
+                    )
+                results["rss"][f"after_{output}_bytes"] = _get_rss_bytes()
+    finally:
+        stub.terminate()
+        stub.join()
+    results["rss"]["max_bytes"] = _get_max_rss_bytes()
+    log(f"\nrss: {results['rss']}")
+
+    if args.output == "-":
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    elif args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        if _compare(results, baseline, args.max_regression, log):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+benchmark of loopback tcp against a unix domain socket for validate_and_get_payload_from_token_v0.
+
+the same stub handler is served on 127.0.0.1 and on a unix socket, and the helper calls it
+sequentially over a kept-alive connection, so the difference is the per request cost of
+the tcp stack (the stub runs in the same process, its own cost is included on both sides).
+
+usage (from the repository root): python -m benchmarks.bench_unix_socket
+    [--requests N] [--warmup N]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.stub_server import StubServer, UnixStubServer, serve_in_background
+from square_authentication_helper.main import SquareAuthenticationHelper
+from square_authentication_helper.pydantic_models import TokenType
+
+
+def _measure(helper, requests, warmup):
+    for _ in range(warmup):
+        helper.validate_and_get_payload_from_token_v0(
+            token="t", token_type=TokenType.access_token, app_id=1
+        )
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        helper.validate_and_get_payload_from_token_v0(
+            token="t", token_type=TokenType.access_token, app_id=1
+        )
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        "mean": statistics.fmean(samples),
+        "p50": samples[len(samples) // 2],
+        "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    socket_path = os.path.join(directory, "auth.sock")
+    tcp_server = serve_in_background(StubServer())
+    unix_server = serve_in_background(UnixStubServer(socket_path))
+    try:
+        with SquareAuthenticationHelper(
+            param_int_square_authentication_port=tcp_server.server_address[1],
+            param_str_square_authentication_ip="127.0.0.1",
+        ) as helper:
+            tcp = _measure(helper, args.requests, args.warmup)
+        with SquareAuthenticationHelper(
+            param_str_square_authentication_url=f"unix://{socket_path}"
+        ) as helper:
+            unix = _measure(helper, args.requests, args.warmup)
+    finally:
+        for server in (tcp_server, unix_server):
+            server.shutdown()
+            server.server_close()
+        os.remove(socket_path)
+        os.rmdir(directory)
+
+    print(f"{args.requests} sequential requests, milliseconds per request")
+    print(f"{'':>6} {'mean':>8} {'p50':>8} {'p99':>8}")
+    for name, result in (("tcp", tcp), ("unix", unix)):
+        print(
+            f"{name:>6} "
+            + " ".join(f"{result[key] * 1000:8.3f}" for key in ("mean", "p50", "p99"))
+        )
+    print(f"unix / tcp mean: {unix['mean'] / tcp['mean']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
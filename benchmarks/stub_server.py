@@ -0,0 +1,96 @@
+"""
+canned http server shared by the benchmarks: every request is answered after latency
+seconds with a fixed raw json body (body, or the entry of bodies for the request path,
+404 for paths without one), over loopback tcp or a unix socket, from daemon threads.
+"""
+
+import json
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+DEFAULT_BODY = json.dumps(
+    {"data": {"main": {"user_id": "u"}}, "message": None, "log": None}
+).encode()
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _reply(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        body = self.server.get_body(self.path)
+        self.send_response(200 if body is not None else 404)
+        body = body or b"{}"
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PATCH = do_DELETE = _reply
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _UnixStubHandler(_StubHandler):
+    # TCP_NODELAY does not exist on unix sockets.
+    disable_nagle_algorithm = False
+
+
+class _StubServerMixin:
+    daemon_threads = True
+    # the default listen backlog (5) overflows when many connections open at once, and
+    # the dropped connects are retried after a 1 s syn timeout, skewing the timings.
+    request_queue_size = 128
+
+    def _init_stub(
+        self, body: bytes, bodies: Optional[Dict[str, bytes]], latency: float
+    ):
+        self.body = body
+        self.bodies = bodies
+        self.latency = latency
+
+    def get_body(self, path: str) -> Optional[bytes]:
+        if self.bodies is None:
+            return self.body
+        return self.bodies.get(path.split("?")[0].lstrip("/"))
+
+
+class StubServer(_StubServerMixin, ThreadingHTTPServer):
+    def __init__(
+        self,
+        body: bytes = DEFAULT_BODY,
+        bodies: Optional[Dict[str, bytes]] = None,
+        latency: float = 0.0,
+    ):
+        """
+        :param bodies: endpoint path (e.g. get_user_details/v0) -> body, replaces body.
+        """
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self._init_stub(body, bodies, latency)
+
+
+class UnixStubServer(_StubServerMixin, socketserver.ThreadingUnixStreamServer):
+    def __init__(
+        self,
+        socket_path: str,
+        body: bytes = DEFAULT_BODY,
+        bodies: Optional[Dict[str, bytes]] = None,
+        latency: float = 0.0,
+    ):
+        super().__init__(socket_path, _UnixStubHandler)
+        self._init_stub(body, bodies, latency)
+
+
+def serve_in_background(server: socketserver.BaseServer) -> socketserver.BaseServer:
+    """
+    serve from a daemon thread, stop with server.shutdown() and server.server_close().
+    """
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
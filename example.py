@@ -69,6 +69,7 @@ validate_access_token_output = (
     square_authentication_helper_obj.validate_and_get_payload_from_token_v0(
         token=generate_access_token_output["data"]["main"]["access_token"],
         token_type=TokenType.access_token,
+        app_id=app_id,
     )
 )
 print(validate_access_token_output)
@@ -1 +1,45 @@
-from square_authentication_helper.main import *
+# explicit imports: a star import of main / async_main would resolve their deferred
+# names (__all__) and load the response models at import time.
+from square_authentication_helper.main import (
+    SquareAuthenticationHelper,
+    TokenType,
+    BalancingStrategy,
+    TTLCache,
+    UserDetailsCache,
+    LocalTokenVerifier,
+    RetryPolicy,
+    CircuitBreaker,
+    CircuitOpenError,
+    MetricsSink,
+    RequestHooks,
+)
+from square_authentication_helper.async_main import (
+    AsyncSquareAuthenticationHelper,
+    DeadlineExceededError,
+)
+from square_authentication_helper.token_session import *
+from square_authentication_helper.bulk import *
+from square_authentication_helper.lazy_imports import type_hints_namespace
+from square_authentication_helper import async_main as _async_main
+from square_authentication_helper import bulk as _bulk
+from square_authentication_helper import main as _main
+from square_authentication_helper import token_session as _token_session
+
+__all__ = list(
+    dict.fromkeys(
+        [
+            *_main.__all__,
+            *_async_main.__all__,
+            *_token_session.__all__,
+            *_bulk.__all__,
+            "type_hints_namespace",
+        ]
+    )
+)
+
+
+def __getattr__(name):
+    # response models and other names the helper modules only import on first use.
+    from square_authentication_helper.lazy_imports import import_deferred
+
+    return import_deferred(__name__, name)
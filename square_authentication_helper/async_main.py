@@ -0,0 +1,1400 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import (
+    TYPE_CHECKING,
+    List,
+    Optional,
+    Tuple,
+    IO,
+    Any,
+    overload,
+    Literal,
+    Dict,
+)
+
+from square_authentication_helper.balancing import BalancingStrategy
+from square_authentication_helper.base import _BaseSquareAuthenticationHelper
+from square_authentication_helper.bulk import TokenValidationResult
+from square_authentication_helper.cache import TTLCache, UserDetailsCache
+from square_authentication_helper.coalescing import AsyncRequestCoalescer
+from square_authentication_helper.enums import TokenType
+from square_authentication_helper.endpoints import ENDPOINTS, build_request
+from square_authentication_helper.hooks import RequestHooks
+from square_authentication_helper.jwt_utils import LocalTokenVerifier
+from square_authentication_helper.lazy_imports import DEFERRED_NAMES, import_deferred
+from square_authentication_helper.metrics import MetricsSink
+from square_authentication_helper.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceededError,
+    RetryPolicy,
+    get_attempt_timeout,
+    get_call_options,
+)
+from square_authentication_helper.transport import AsyncPooledTransport, read_response
+
+# only needed for annotations, resolved on first use by __getattr__ below.
+if TYPE_CHECKING:
+    from square_commons.api_utils import StandardResponse
+    from square_database_structure.square.authentication.enums import (
+        RecoveryMethodEnum,
+    )
+
+    from square_authentication_helper.pydantic_models import (
+        RegisterUsernameV0Response,
+        LoginUsernameV0Response,
+        GenerateAccessTokenV0Response,
+        LogoutV0Response,
+        LogoutAppsV0Response,
+        GetUserDetailsV0Response,
+        LogoutAllV0Response,
+        UpdateUserAppIdsV0Response,
+        UpdateUsernameV0Response,
+        DeleteUserV0Response,
+        UpdatePasswordV0Response,
+        ValidateAndGetPayloadFromTokenV0Response,
+        UpdateProfilePhotoV0Response,
+        UpdateUserRecoveryMethodsV0Response,
+        GenerateAccountBackupCodesV0Response,
+        ResetPasswordAndLoginUsingBackupCodeV0Response,
+        SendResetPasswordEmailV0Response,
+        ValidateEmailVerificationCodeV0Response,
+        SendVerificationEmailV0Response,
+        UpdateProfileDetailsV0Response,
+        ResetPasswordAndLoginUsingResetEmailCodeV0Response,
+        RegisterLoginGoogleV0Response,
+        GetUserRecoveryMethodsV0Response,
+        AddSelfAuthProviderV0Response,
+        AddGoogleAuthProviderV0Response,
+        UnlinkAuthProviderV0Response,
+    )
+
+
+__all__ = [
+    "AsyncSquareAuthenticationHelper",
+    "TokenType",
+    "BalancingStrategy",
+    "TTLCache",
+    "UserDetailsCache",
+    "LocalTokenVerifier",
+    "RetryPolicy",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "MetricsSink",
+    "RequestHooks",
+    "TokenValidationResult",
+    "DeadlineExceededError",
+    *DEFERRED_NAMES,
+]
+
+
+def __getattr__(name):
+    return import_deferred(__name__, name)
+
+
+class AsyncSquareAuthenticationHelper(_BaseSquareAuthenticationHelper):
+    _coalescer_class = AsyncRequestCoalescer
+
+    def __init__(
+        self,
+        param_int_square_authentication_port: int = 10011,
+        param_str_square_authentication_ip: str = "localhost",
+        param_str_square_authentication_protocol: str = "http",
+        param_int_max_connections: int = 100,
+        param_int_max_keepalive_connections: int = 20,
+        param_float_pool_idle_timeout: Optional[float] = 5.0,
+        param_validation_cache: Optional[TTLCache] = None,
+        param_local_token_verifier: Optional[LocalTokenVerifier] = None,
+        param_bool_coalesce_requests: bool = False,
+        param_user_details_cache: Optional[UserDetailsCache] = None,
+        param_retry_policy: Optional[RetryPolicy] = None,
+        param_circuit_breaker: Optional[CircuitBreaker] = None,
+        param_float_connect_timeout: Optional[float] = None,
+        param_float_read_timeout: Optional[float] = None,
+        param_list_str_square_authentication_endpoints: Optional[List[str]] = None,
+        param_balancing_strategy: BalancingStrategy = BalancingStrategy.power_of_two_choices,
+        param_str_square_authentication_url: Optional[str] = None,
+        param_bool_http2: bool = False,
+        param_metrics: Optional[MetricsSink] = None,
+        param_list_request_hooks: Optional[List[RequestHooks]] = None,
+    ):
+        try:
+            super().__init__(
+                param_int_square_authentication_port=param_int_square_authentication_port,
+                param_str_square_authentication_ip=param_str_square_authentication_ip,
+                param_str_square_authentication_protocol=param_str_square_authentication_protocol,
+                param_validation_cache=param_validation_cache,
+                param_local_token_verifier=param_local_token_verifier,
+                param_bool_coalesce_requests=param_bool_coalesce_requests,
+                param_user_details_cache=param_user_details_cache,
+                param_retry_policy=param_retry_policy,
+                param_circuit_breaker=param_circuit_breaker,
+                param_float_connect_timeout=param_float_connect_timeout,
+                param_float_read_timeout=param_float_read_timeout,
+                param_list_str_square_authentication_endpoints=param_list_str_square_authentication_endpoints,
+                param_balancing_strategy=param_balancing_strategy,
+                param_str_square_authentication_url=param_str_square_authentication_url,
+                param_metrics=param_metrics,
+                param_list_request_hooks=param_list_request_hooks,
+            )
+            self.global_transport = AsyncPooledTransport(
+                max_connections=param_int_max_connections,
+                max_keepalive_connections=param_int_max_keepalive_connections,
+                idle_timeout=param_float_pool_idle_timeout,
+                http2=param_bool_http2,
+            )
+        except Exception:
+            raise
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """
+        close the underlying connection pool, the helper can not be used afterward.
+        """
+        try:
+            await self.global_transport.close()
+        except Exception:
+            raise
+
+    async def _make_request(
+        self,
+        method,
+        endpoint,
+        json=None,
+        data=None,
+        params=None,
+        headers=None,
+        files=None,
+        return_type="json",
+    ):
+        try:
+            request_kwargs = dict(
+                method=method,
+                endpoint=endpoint,
+                json=json,
+                data=data,
+                params=params,
+                headers=headers,
+                files=files,
+            )
+            if (
+                self.global_request_coalescer is None
+                and self.global_user_details_cache is None
+            ):
+                return await self._send(request_kwargs, return_type)
+            idempotent = self._is_idempotent(method, endpoint)
+            key = self._get_coalescing_key(idempotent, request_kwargs, return_type)
+            if key is not None:
+                return await self.global_request_coalescer.run(
+                    key, lambda: self._send(request_kwargs, return_type)
+                )
+            if self.global_user_details_cache is None or idempotent:
+                return await self._send(request_kwargs, return_type)
+            # any write may change what get_user_details_v0 returns for this user,
+            # invalidate even on failure since the server may have applied it.
+            response = None
+            try:
+                response = await self._send(request_kwargs, return_type)
+                return response
+            finally:
+                self.global_user_details_cache.invalidate_for_request(headers, response)
+
+        except Exception:
+            raise
+
+    async def _send(self, request_kwargs, return_type):
+        """
+        send a request through the retry policy, circuit breaker, balancer, metrics and
+        hooks that are configured.
+        """
+        try:
+            endpoint = request_kwargs["endpoint"]
+            method = request_kwargs["method"]
+            if self._is_direct():
+                # nothing to retry, fail over or observe: one transport call without the
+                # per call closures below.
+                try:
+                    return await self._request_within_deadline(
+                        dict(
+                            request_kwargs,
+                            url=self.global_str_square_authentication_url_base,
+                            timeout=get_attempt_timeout(
+                                self.global_float_connect_timeout,
+                                self.global_float_read_timeout,
+                            ),
+                        ),
+                        return_type,
+                    )
+                except Exception as e:
+                    self._raise_if_deadline_exceeded(endpoint, e)
+                    raise
+
+            async def send_once(url):
+                attempt_kwargs = dict(
+                    request_kwargs,
+                    url=url,
+                    timeout=get_attempt_timeout(
+                        self.global_float_connect_timeout,
+                        self.global_float_read_timeout,
+                    ),
+                )
+                if self.global_metrics is None and not self.global_list_request_hooks:
+                    return await self._request_within_deadline(
+                        attempt_kwargs, return_type
+                    )
+                return await self._send_observed(attempts, return_type, attempt_kwargs)
+
+            # endpoints already tried by this call, retries fail over to the others.
+            tried = set()
+            attempts = 0
+
+            async def send_to(url):
+                if self.global_endpoint_balancer is None:
+                    return await send_once(url)
+                return await self.global_endpoint_balancer.call_async(
+                    url, lambda: send_once(url)
+                )
+
+            async def attempt():
+                nonlocal attempts
+                attempts += 1
+                if attempts > 1 and self.global_metrics is not None:
+                    self.global_metrics.observe_retry(endpoint, method)
+                if self.global_endpoint_balancer is None:
+                    url = self.global_str_square_authentication_url_base
+                else:
+                    url = self._pick_endpoint(tried)
+                    tried.add(url)
+                if self.global_circuit_breaker is None:
+                    return await send_to(url)
+                return await self.global_circuit_breaker.call_async(
+                    url, lambda: send_to(url)
+                )
+
+            async def send_with_retries():
+                try:
+                    # uploaded file objects are consumed by the first attempt.
+                    if (
+                        self.global_retry_policy is None
+                        or request_kwargs["files"] is not None
+                    ):
+                        return await attempt()
+                    return await self.global_retry_policy.call_async(
+                        method, attempt, deadline=get_call_options().deadline
+                    )
+                except Exception as e:
+                    self._raise_if_deadline_exceeded(endpoint, e)
+                    raise
+
+            if self.global_metrics is None:
+                return await send_with_retries()
+            start = time.perf_counter()
+            try:
+                response = await send_with_retries()
+            except Exception as e:
+                self.global_metrics.observe_request(
+                    endpoint, method, time.perf_counter() - start, e
+                )
+                raise
+            self.global_metrics.observe_request(
+                endpoint, method, time.perf_counter() - start
+            )
+            return response
+        except Exception:
+            raise
+
+    async def _request_within_deadline(self, request_kwargs, return_type):
+        """
+        one transport call cancelled when the call's deadline passes, httpx timeouts
+        only bound each phase (connect, each read) on their own.
+        """
+        try:
+            deadline = get_call_options().deadline
+            if deadline is None:
+                return await self.global_transport.request(
+                    **request_kwargs, return_type=return_type
+                )
+            timeout = asyncio.timeout(deadline.remaining())
+            try:
+                async with timeout:
+                    return await self.global_transport.request(
+                        **request_kwargs, return_type=return_type
+                    )
+            except TimeoutError as e:
+                if not timeout.expired():
+                    raise
+                raise DeadlineExceededError(
+                    f"deadline exceeded calling {request_kwargs['endpoint']}."
+                ) from e
+        except Exception:
+            raise
+
+    async def _send_observed(self, attempt, return_type, request_kwargs):
+        """
+        send one attempt taking the raw response, so it can be measured for the
+        metrics sink and reported to the request hooks.
+        """
+        try:
+            info = self._before_request(attempt, request_kwargs)
+            start = time.perf_counter()
+            try:
+                response = await self._request_within_deadline(
+                    request_kwargs, "response"
+                )
+                parse_start = time.perf_counter()
+                result = read_response(response, return_type)
+            except Exception as e:
+                self._on_request_error(info, e, start)
+                raise
+            self._after_response(info, request_kwargs, response, start, parse_start)
+            return result
+        except Exception:
+            raise
+
+    async def _make_parsed_request(
+        self,
+        response_model,
+        response_as_pydantic,
+        **request_kwargs,
+    ):
+        """
+        send a request and return the json dict, or with response_as_pydantic, parse
+        the raw body straight into response_model in a single pass.
+        """
+        try:
+            if not response_as_pydantic:
+                return await self._make_request(**request_kwargs)
+            response = await self._make_request(**request_kwargs, return_type="bytes")
+            return self._parse_response(response_model, response)
+        except Exception:
+            raise
+
+    async def _call_endpoint(self, name, response_as_pydantic, **arguments):
+        """
+        call the endpoint registered under name in ENDPOINTS with the helper method's
+        arguments, through its cache when it has one.
+        """
+        try:
+            endpoint = ENDPOINTS[name]
+            if endpoint.cache == "validation" and (
+                self.global_validation_cache is not None
+                or self.global_local_token_verifier is not None
+            ):
+                return await self._call_validation_cached(
+                    endpoint, response_as_pydantic, arguments
+                )
+            if (
+                endpoint.cache == "user_details"
+                and self.global_user_details_cache is not None
+            ):
+                return await self._call_user_details_cached(
+                    endpoint, response_as_pydantic, arguments
+                )
+            return await self._make_parsed_request(
+                response_model=endpoint.response_model,
+                response_as_pydantic=response_as_pydantic,
+                **build_request(endpoint, arguments),
+            )
+        except Exception:
+            raise
+
+    async def _call_validation_cached(self, endpoint, response_as_pydantic, arguments):
+        """
+        validate_and_get_payload_from_token_v0 through the validation cache and the local
+        token verifier, a cached result is served while the circuit is open.
+        """
+        try:
+            cache_key = self._get_validation_cache_key(arguments)
+            response = self._get_cached_validation(cache_key, arguments)
+            if response is None:
+                if self.global_validation_cache is None:
+                    return await self._make_parsed_request(
+                        response_model=endpoint.response_model,
+                        response_as_pydantic=response_as_pydantic,
+                        **build_request(endpoint, arguments),
+                    )
+                try:
+                    response = await self._make_request(
+                        **build_request(endpoint, arguments)
+                    )
+                except CircuitOpenError:
+                    # stale entries never outlive the token exp.
+                    response = self.global_validation_cache.get_stale(cache_key)
+                    if response is None:
+                        raise
+                else:
+                    self._set_cached_validation(cache_key, response)
+            return self._get_result(endpoint, response_as_pydantic, response)
+        except Exception:
+            raise
+
+    async def _call_user_details_cached(
+        self, endpoint, response_as_pydantic, arguments
+    ):
+        """
+        get_user_details_v0 through the user details cache, a recently expired entry is
+        served while the circuit is open.
+        """
+        try:
+            access_token = arguments["access_token"]
+            response = self.global_user_details_cache.get(access_token)
+            if response is None:
+                generation = self.global_user_details_cache.generation
+                try:
+                    response = await self._make_request(
+                        **build_request(endpoint, arguments)
+                    )
+                except CircuitOpenError:
+                    # server is known to be down, fall back to a recently expired entry.
+                    response = self.global_user_details_cache.get_stale(access_token)
+                    if response is None:
+                        raise
+                else:
+                    self.global_user_details_cache.set(
+                        access_token, response, generation
+                    )
+            return self._get_result(endpoint, response_as_pydantic, response)
+        except Exception:
+            raise
+
+    @overload
+    async def register_username_v0(
+        self,
+        username: str,
+        password: str,
+        app_id: Optional[int] = None,
+        response_as_pydantic: Literal[True] = ...,
+    ) -> StandardResponse[RegisterUsernameV0Response]: ...
+    @overload
+    async def register_username_v0(
+        self,
+        username: str,
+        password: str,
+        app_id: Optional[int] = None,
+        response_as_pydantic: Literal[False] = ...,
+    ) -> Dict[str, Any]: ...
+    async def register_username_v0(
+        self,
+        username: str,
+        password: str,
+        app_id: Optional[int] = None,
+        response_as_pydantic: bool = False,
+    ) -> Any:
+        try:
+            return await self._call_endpoint(
+                "register_username_v0",
+                response_as_pydantic,
+                username=username,
+                password=password,
+                app_id=app_id,
+            )
+        except Exception:
+            raise
+
+    @overload
+    async def login_username_v0(
+        self,
+        username: str,
+        password: str,
+        app_id: int,
+        assign_app_id_if_missing: bool = False,
+        response_as_pydantic: Literal[True] = ...,
+    ) -> StandardResponse[LoginUsernameV0Response]: ...
+    @overload
+    async def login_username_v0(
+        self,
+        username: str,
+        password: str,
+        app_id: int,
+        assign_app_id_if_missing: bool = False,
+        response_as_pydantic: Literal[False] = ...,
+    ) -> Dict[str, Any]: ...
+    async def login_username_v0(
+        self,
+        username: str,
+        password: str,
+        app_id: int,
+        assign_app_id_if_missing: bool = False,
+        response_as_pydantic: bool = False,
+    ) -> Any:
+        try:
+            return await self._call_endpoint(
+                "login_username_v0",
+                response_as_pydantic,
+                username=username,
+                password=password,
+                app_id=app_id,
+                assign_app_id_if_missing=assign_app_id_if_missing,
+            )
+        except Exception:
+            raise
+
+    @overload
+    async def generate_access_token_v0(
+        self,
+        refresh_token: str,
+        response_as_pydantic: Literal[True] = ...,
+    ) -> StandardResponse[GenerateAccessTokenV0Response]: ...
+    @overload
+    async def generate_access_token_v0(
+        self,
+        refresh_token: str,
+        response_as_pydantic: Literal[False] = ...,
+    ) -> Dict[str, Any]: ...
+    async def generate_access_token_v0(
+        self,
+        refresh_token: str,
+        response_as_pydantic: bool = False,
+    ) -> Any:
+        try:
+            return await self._call_endpoint(
+                "generate_access_token_v0",
+                response_as_pydantic,
+                refresh_token=refresh_token,
+            )
+        except Exception:
+            raise
+
+    @overload
+    async def logout_v0(
+        self,
+        refresh_token: str,
+        response_as_pydantic: Literal[True] = ...,
+    ) -> LogoutV0Response: ...
+
+    @overload
+    async def logout_v0(
+        self,
+        refresh_token: str,
+        response_as_pydantic: Literal[False] = ...,
+    ) -> Dict[str, Any]: ...
+
+    async def logout_v0(
+        self,
+        refresh_token: str,
+        response_as_pydantic: bool = False,
+    ) -> Any:
+        try:
+            return await self._call_endpoint(
+                "logout_v0",
+                response_as_pydantic,
+                refresh_token=refresh_token,
+            )
+        except Exception:
+            raise
+
+    @overload
+    async def logout_apps_v0(
+        self,
+        access_token: str,
+        app_ids: List[int],
+        response_as_pydantic: Literal[True] = ...,
+    ) -> LogoutAppsV0Response: ...
+    @overload
+    async def logout_apps_v0(
+        self,
+        access_token: str,
+        app_ids: List[int],
+        response_as_pydantic: Literal[False] = ...,
+    ) -> Dict[str, Any]: ...
+    async def logout_apps_v0(
+        self,
+        access_token: str,
+        app_ids: List[int],
+        response_as_pydantic: bool = False,
+    ) -> Any:
+        try:
+            return await self._call_endpoint(
+                "logout_apps_v0",
+                response_as_pydantic,
+                access_token=access_token,
+                app_ids=app_ids,
+            )
+        except Exception:
+            raise
+
+    @overload
+    async def logout_all_v0(
+        self,
+        access_token: str,
+        response_as_pydantic: Literal[True] = ...,
+    ) -> LogoutAllV0Response: ...
+
+    @overload
+    async def logout_all_v0(
+        self,
+        access_token: str,
+        response_as_pydantic: Literal[False] = ...,
+    ) -> Dict[str, Any]: ...
+
+    async def logout_all_v0(
+        self,
+        access_token: str,
+        response_as_pydantic: bool = False,
+    ) -> Any:
+        try:
+            return await self._call_endpoint(
+                "logout_all_v0",
+                response_as_pydantic,
+                access_token=access_token,
+            )
+        except Exception:
+            raise
+
+    @overload
+    async def get_user_details_v0(
+        self,
+        access_token: str,
+        response_as_pydantic: Literal[True] = ...,
+    ) -> StandardResponse[GetUserDetailsV0Response]: ...
+
+    @overload
+    async def get_user_details_v0(
+        self,
+        access_token: str,
+        response_as_pydantic: Literal[False] = ...,
+    ) -> Dict[str, Any]: ...
+
+    async def get_user_details_v0(
+        self,
+        access_token: str,
+        response_as_pydantic: bool = False,
+    ) -> Any:
+        try:
+            return await self._call_endpoint(
+                "get_user_details_v0",
+                response_as_pydantic,
+                access_token=access_token,
+            )
+        except Exception:
+            raise
+
+    @overload
+    async def update_user_app_ids_v0(
+        self,
+        access_token: str,
+        app_ids_to_add: List[int],
+        app_ids_to_remove: List[int],
+        response_as_pydantic: Literal[True] = ...,
+    ) -> StandardResponse[UpdateUserAppIdsV0Response]: ...
+
+    @overload
+    async def update_user_app_ids_v0(
+        self,
+        access_token: str,
+        app_ids_to_add: List[int],
+        app_ids_to_remove: List[int],
+        response_as_pydantic: Literal[False] = ...,
+    ) -> Dict[str, Any]: ...
+
+    async def update_user_app_ids_v0(
+        self,
+        access_token: str,
+        app_ids_to_add: List[int],
+        app_ids_to_remove: List[int],
+        response_as_pydantic: bool = False,
+    ) -> Any:
+        try:
+            return await self._call_endpoint(
+                "update_user_app_ids_v0",
+                response_as_pydantic,
+                access_token=access_token,
+                app_ids_to_add=app_ids_to_add,
+                app_ids_to_remove=app_ids_to_remove,
+            )
+        except Exception:
+            raise
+
+    @overload
+    async def update_username_v0(
+        self,
+        new_username: str,
+        access_token: str,
+        response_as_pydantic: Literal[True] = ...,
+    ) -> StandardResponse[UpdateUsernameV0Response]: ...
+
+    @overload
+    async def update_username_v0(
+        self,
+        new_username: str,
+        access_token: str,
+        response_as_pydantic: Literal[False] = ...,
+    ) -> Dict[str, Any]: ...
+
+    async def update_username_v0(
+        self,
+        new_username: str,
+        access_token: str,
+        response_as_pydantic: bool = False,
+    ) -> Any:
+        try:
+            return await self._call_endpoint(
+                "update_username_v0",
+                response_as_pydantic,
+                new_username=new_username,
+                access_token=access_token,
+            )
+        except Exception:
+            raise
+
+    @overload
+    async def delete_user_v0(
+        self,
+        password: str,
+        access_token: str,
+        response_as_pydantic: Literal[True] = ...,
+    ) -> DeleteUserV0Response: ...
+
+    @overload
+    async def delete_user_v0(
+        self,
+        password: str,
+        access_token: str,
+        response_as_pydantic: Literal[False] = ...,
+    ) -> Dict[str, Any]: ...
+
+    async def delete_user_v0(
+        self,
+        password: str,
+        access_token: str,
+        response_as_pydantic: bool = False,
+    ) -> Any:
+        try:
+            return await self._call_endpoint(
+                "delete_user_v0",
+                response_as_pydantic,
+                password=password,
+                access_token=access_token,
+            )
+        except Exception:
+            raise
+
+    @overload
+    async def update_password_v0(
+        self,
+        old_password: str,
+        new_password: str,
+        access_token: str,
+        logout_other_sessions: bool = False,
+        preserve_session_refresh_token: str = None,
+        response_as_pydantic: Literal[True] = ...,
+    ) -> UpdatePasswordV0Response: ...
+
+    @overload
+    async def update_password_v0(
+        self,
+        old_password: str,
+        new_password: str,
+        access_token: str,
+        logout_other_sessions: bool = False,
+        preserve_session_refresh_token: str = None,
+        response_as_pydantic: Literal[False] = ...,
+    ) -> Dict[str, Any]: ...
+
+    async def update_password_v0(
+        self,
+        old_password: str,
+        new_password: str,
+        access_token: str,
+        logout_other_sessions: bool = False,
+        preserve_session_refresh_token: str = None,
+        response_as_pydantic: bool = False,
+    ) -> Any:
+        try:
+            return await self._call_endpoint(
+                "update_password_v0",
+                response_as_pydantic,
+                old_password=old_password,
+                new_password=new_password,
+                access_token=access_token,
+                logout_other_sessions=logout_other_sessions,
+                preserve_session_refresh_token=preserve_session_refresh_token,
+            )
+        except Exception:
+            raise
+
+    @overload
+    async def validate_and_get_payload_from_token_v0(
+        self,
+        token: str,
+        token_type: TokenType,
+        app_id: int,
+        response_as_pydantic: Literal[True] = ...,
+    ) -> StandardResponse[ValidateAndGetPayloadFromTokenV0Response]: ...
+
+    @overload
+    async def validate_and_get_payload_from_token_v0(
+        self,
+        token: str,
+        token_type: TokenType,
+        app_id: int,
+        response_as_pydantic: Literal[False] = ...,
+    ) -> Dict[str, Any]: ...
+
+    async def validate_and_get_payload_from_token_v0(
+        self,
+        token: str,
+        token_type: TokenType,
+        app_id: int,
+        response_as_pydantic: bool = False,
+    ) -> Any:
+        try:
+            return await self._call_endpoint(
+                "validate_and_get_payload_from_token_v0",
+                response_as_pydantic,
+                token=token,
+                token_type=token_type,
+                app_id=app_id,
+            )
+        except Exception:
+            raise
+
+    async def validate_tokens_bulk(
+        self,
+        tokens: List[str],
+        token_type: TokenType,
+        app_id: int,
+        max_concurrency: Optional[int] = None,
+        response_as_pydantic: bool = False,
+    ) -> List[TokenValidationResult]:
+        """
+        validate many tokens concurrently with validate_and_get_payload_from_token_v0, so
+        the validation cache and local token verifier apply to every token.
+
+        :param max_concurrency: max validations in flight, defaults to the transport max_connections.
+        :return: one result per token in input order, failures are returned, not raised.
+        """
+        try:
+            if max_concurrency is not None and max_concurrency < 1:
+                raise ValueError("max_concurrency must be >= 1.")
+            # duplicate tokens share one validation.
+            unique_tokens = list(dict.fromkeys(tokens))
+            if not unique_tokens:
+                return []
+            max_concurrency = max_concurrency or self.global_transport.max_connections
+            if max_concurrency < 1:
+                raise ValueError("max_concurrency must be >= 1.")
+            semaphore = asyncio.Semaphore(max_concurrency)
+
+            async def validate(token):
+                async with semaphore:
+                    try:
+                        response = await self.validate_and_get_payload_from_token_v0(
+                            token=token,
+                            token_type=token_type,
+                            app_id=app_id,
+                            response_as_pydantic=response_as_pydantic,
+                        )
+                        return TokenValidationResult(token, response=response)
+                    except Exception as e:
+                        return TokenValidationResult(token, error=e)
+
+            dict_results = dict(
+                zip(
+                    unique_tokens,
+                    await asyncio.gather(*map(validate, unique_tokens)),
+                )
+            )
+            return [dict_results[token] for token in tokens]
+        except Exception:
+            raise
+
+    @overload
+    async def update_profile_photo_v0(
+        self,
+        access_token: str,
+        profile_photo: Tuple[str, IO, str] | None,
+        response_as_pydantic: Literal[True] = ...,
+    ) -> StandardResponse[UpdateProfilePhotoV0Response]: ...
+
+    @overload
+    async def update_profile_photo_v0(
+        self,
+        access_token: str,
+        profile_photo: Tuple[str, IO, str] | None,
+        response_as_pydantic: Literal[False] = ...,
+    ) -> Dict[str, Any]: ...
+
+    async def update_profile_photo_v0(
+        self,
+        access_token: str,
+        profile_photo: Tuple[str, IO, str] | None,
+        response_as_pydantic: bool = False,
+    ) -> Any:
+        try:
+            return await self._call_endpoint(
+                "update_profile_photo_v0",
+                response_as_pydantic,
+                access_token=access_token,
+                profile_photo=profile_photo,
+            )
+        except Exception:
+            raise
+
+    @overload
+    async def update_user_recovery_methods_v0(
+        self,
+        access_token: str,
+        recovery_methods_to_add: List[RecoveryMethodEnum] = None,
+        recovery_methods_to_remove: List[RecoveryMethodEnum] = None,
+        response_as_pydantic: Literal[True] = ...,
+    ) -> StandardResponse[UpdateUserRecoveryMethodsV0Response]: ...
+
+    @overload
+    async def update_user_recovery_methods_v0(
+        self,
+        access_token: str,
+        recovery_methods_to_add: List[RecoveryMethodEnum] = None,
+        recovery_methods_to_remove: List[RecoveryMethodEnum] = None,
+        response_as_pydantic: Literal[False] = ...,
+    ) -> Dict[str, Any]: ...
+
+    async def update_user_recovery_methods_v0(
+        self,
+        access_token: str,
+        recovery_methods_to_add: List[RecoveryMethodEnum] = None,
+        recovery_methods_to_remove: List[RecoveryMethodEnum] = None,
+        response_as_pydantic: bool = False,
+    ) -> Any:
+        if recovery_methods_to_add is None:
+            recovery_methods_to_add = []
+        if recovery_methods_to_remove is None:
+            recovery_methods_to_remove = []
+        try:
+            return await self._call_endpoint(
+                "update_user_recovery_methods_v0",
+                response_as_pydantic,
+                access_token=access_token,
+                recovery_methods_to_add=recovery_methods_to_add,
+                recovery_methods_to_remove=recovery_methods_to_remove,
+            )
+        except Exception:
+            raise
+
+    @overload
+    async def generate_account_backup_codes_v0(
+        self,
+        access_token: str,
+        response_as_pydantic: Literal[True] = ...,
+    ) -> StandardResponse[GenerateAccountBackupCodesV0Response]: ...
+
+    @overload
+    async def generate_account_backup_codes_v0(
+        self,
+        access_token: str,
+        response_as_pydantic: Literal[False] = ...,
+    ) -> Dict[str, Any]: ...
+
+    async def generate_account_backup_codes_v0(
+        self,
+        access_token: str,
+        response_as_pydantic: bool = False,
+    ) -> Any:
+        try:
+            return await self._call_endpoint(
+                "generate_account_backup_codes_v0",
+                response_as_pydantic,
+                access_token=access_token,
+            )
+        except Exception:
+            raise
+
+    @overload
+    async def reset_password_and_login_using_backup_code_v0(
+        self,
+        backup_code: str,
+        username: str,
+        new_password: str,
+        app_id: int,
+        logout_other_sessions: bool = False,
+        response_as_pydantic: Literal[True] = ...,
+    ) -> StandardResponse[ResetPasswordAndLoginUsingBackupCodeV0Response]: ...
+
+    @overload
+    async def reset_password_and_login_using_backup_code_v0(
+        self,
+        backup_code: str,
+        username: str,
+        new_password: str,
+        app_id: int,
+        logout_other_sessions: bool = False,
+        response_as_pydantic: Literal[False] = ...,
+    ) -> Dict[str, Any]: ...
+
+    async def reset_password_and_login_using_backup_code_v0(
+        self,
+        backup_code: str,
+        username: str,
+        new_password: str,
+        app_id: int,
+        logout_other_sessions: bool = False,
+        response_as_pydantic: bool = False,
+    ) -> Any:
+        try:
+            return await self._call_endpoint(
+                "reset_password_and_login_using_backup_code_v0",
+                response_as_pydantic,
+                backup_code=backup_code,
+                username=username,
+                new_password=new_password,
+                app_id=app_id,
+                logout_other_sessions=logout_other_sessions,
+            )
+        except Exception:
+            raise
+
+    @overload
+    async def send_reset_password_email_v0(
+        self,
+        username: str,
+        redirect_url: str = None,
+        response_as_pydantic: Literal[True] = ...,
+    ) -> StandardResponse[SendResetPasswordEmailV0Response]: ...
+
+    @overload
+    async def send_reset_password_email_v0(
+        self,
+        username: str,
+        redirect_url: str = None,
+        response_as_pydantic: Literal[False] = ...,
+    ) -> Dict[str, Any]: ...
+
+    async def send_reset_password_email_v0(
+        self,
+        username: str,
+        redirect_url: str = None,
+        response_as_pydantic: bool = False,
+    ) -> Any:
+        try:
+            return await self._call_endpoint(
+                "send_reset_password_email_v0",
+                response_as_pydantic,
+                username=username,
+                redirect_url=redirect_url,
+            )
+        except Exception:
+            raise
+
+    @overload
+    async def validate_email_verification_code_v0(
+        self,
+        access_token: str,
+        verification_code: str,
+        response_as_pydantic: Literal[True] = ...,
+    ) -> StandardResponse[ValidateEmailVerificationCodeV0Response]: ...
+
+    @overload
+    async def validate_email_verification_code_v0(
+        self,
+        access_token: str,
+        verification_code: str,
+        response_as_pydantic: Literal[False] = ...,
+    ) -> Dict[str, Any]: ...
+
+    async def validate_email_verification_code_v0(
+        self,
+        access_token: str,
+        verification_code: str,
+        response_as_pydantic: bool = False,
+    ) -> Any:
+        try:
+            return await self._call_endpoint(
+                "validate_email_verification_code_v0",
+                response_as_pydantic,
+                access_token=access_token,
+                verification_code=verification_code,
+            )
+        except Exception:
+            raise
+
+    @overload
+    async def send_verification_email_v0(
+        self,
+        access_token: str,
+        redirect_url: str = None,
+        response_as_pydantic: Literal[True] = ...,
+    ) -> StandardResponse[SendVerificationEmailV0Response]: ...
+
+    @overload
+    async def send_verification_email_v0(
+        self,
+        access_token: str,
+        redirect_url: str = None,
+        response_as_pydantic: Literal[False] = ...,
+    ) -> Dict[str, Any]: ...
+
+    async def send_verification_email_v0(
+        self,
+        access_token: str,
+        redirect_url: str = None,
+        response_as_pydantic: bool = False,
+    ) -> Any:
+        try:
+            return await self._call_endpoint(
+                "send_verification_email_v0",
+                response_as_pydantic,
+                access_token=access_token,
+                redirect_url=redirect_url,
+            )
+        except Exception:
+            raise
+
+    @overload
+    async def update_profile_details_v0(
+        self,
+        access_token: str,
+        first_name: str = None,
+        last_name: str = None,
+        email: str = None,
+        phone_number_country_code: str = None,
+        phone_number: str = None,
+        response_as_pydantic: Literal[True] = ...,
+    ) -> StandardResponse[UpdateProfileDetailsV0Response]: ...
+
+    @overload
+    async def update_profile_details_v0(
+        self,
+        access_token: str,
+        first_name: str = None,
+        last_name: str = None,
+        email: str = None,
+        phone_number_country_code: str = None,
+        phone_number: str = None,
+        response_as_pydantic: Literal[False] = ...,
+    ) -> Dict[str, Any]: ...
+
+    async def update_profile_details_v0(
+        self,
+        access_token: str,
+        first_name: str = None,
+        last_name: str = None,
+        email: str = None,
+        phone_number_country_code: str = None,
+        phone_number: str = None,
+        response_as_pydantic: bool = False,
+    ) -> Any:
+        try:
+            return await self._call_endpoint(
+                "update_profile_details_v0",
+                response_as_pydantic,
+                access_token=access_token,
+                first_name=first_name,
+                last_name=last_name,
+                email=email,
+                phone_number_country_code=phone_number_country_code,
+                phone_number=phone_number,
+            )
+        except Exception:
+            raise
+
+    @overload
+    async def reset_password_and_login_using_reset_email_code_v0(
+        self,
+        reset_email_code: str,
+        username: str,
+        new_password: str,
+        app_id: int,
+        logout_other_sessions: bool = False,
+        response_as_pydantic: Literal[True] = ...,
+    ) -> StandardResponse[ResetPasswordAndLoginUsingResetEmailCodeV0Response]: ...
+
+    @overload
+    async def reset_password_and_login_using_reset_email_code_v0(
+        self,
+        reset_email_code: str,
+        username: str,
+        new_password: str,
+        app_id: int,
+        logout_other_sessions: bool = False,
+        response_as_pydantic: Literal[False] = ...,
+    ) -> Dict[str, Any]: ...
+
+    async def reset_password_and_login_using_reset_email_code_v0(
+        self,
+        reset_email_code: str,
+        username: str,
+        new_password: str,
+        app_id: int,
+        logout_other_sessions: bool = False,
+        response_as_pydantic: bool = False,
+    ) -> Any:
+        try:
+            return await self._call_endpoint(
+                "reset_password_and_login_using_reset_email_code_v0",
+                response_as_pydantic,
+                reset_email_code=reset_email_code,
+                username=username,
+                new_password=new_password,
+                app_id=app_id,
+                logout_other_sessions=logout_other_sessions,
+            )
+        except Exception:
+            raise
+
+    @overload
+    async def register_login_google_v0(
+        self,
+        google_id: str,
+        app_id: int = None,
+        assign_app_id_if_missing: bool = False,
+        response_as_pydantic: Literal[True] = ...,
+    ) -> StandardResponse[RegisterLoginGoogleV0Response]: ...
+
+    @overload
+    async def register_login_google_v0(
+        self,
+        google_id: str,
+        app_id: int = None,
+        assign_app_id_if_missing: bool = False,
+        response_as_pydantic: Literal[False] = ...,
+    ) -> Dict[str, Any]: ...
+
+    async def register_login_google_v0(
+        self,
+        google_id: str,
+        app_id: int = None,
+        assign_app_id_if_missing: bool = False,
+        response_as_pydantic: bool = False,
+    ) -> Any:
+        try:
+            return await self._call_endpoint(
+                "register_login_google_v0",
+                response_as_pydantic,
+                google_id=google_id,
+                app_id=app_id,
+                assign_app_id_if_missing=assign_app_id_if_missing,
+            )
+        except Exception:
+            raise
+
+    @overload
+    async def get_user_recovery_methods_v0(
+        self,
+        username: str,
+        response_as_pydantic: Literal[True] = ...,
+    ) -> StandardResponse[GetUserDetailsV0Response]: ...
+
+    @overload
+    async def get_user_recovery_methods_v0(
+        self,
+        username: str,
+        response_as_pydantic: Literal[False] = ...,
+    ) -> Dict[str, Any]: ...
+
+    async def get_user_recovery_methods_v0(
+        self,
+        username: str,
+        response_as_pydantic: bool = False,
+    ) -> Any:
+
+        try:
+            return await self._call_endpoint(
+                "get_user_recovery_methods_v0",
+                response_as_pydantic,
+                username=username,
+            )
+        except Exception:
+            raise
+
+    @overload
+    async def add_self_auth_provider_v0(
+        self,
+        access_token: str,
+        password: str,
+        response_as_pydantic: Literal[True] = ...,
+    ) -> StandardResponse[AddSelfAuthProviderV0Response]: ...
+
+    @overload
+    async def add_self_auth_provider_v0(
+        self,
+        access_token: str,
+        password: str,
+        response_as_pydantic: Literal[False] = ...,
+    ) -> Dict[str, Any]: ...
+
+    async def add_self_auth_provider_v0(
+        self,
+        access_token: str,
+        password: str,
+        response_as_pydantic: bool = False,
+    ) -> Any:
+        try:
+            return await self._call_endpoint(
+                "add_self_auth_provider_v0",
+                response_as_pydantic,
+                access_token=access_token,
+                password=password,
+            )
+        except Exception:
+            raise
+
+    @overload
+    async def add_google_auth_provider_v0(
+        self,
+        access_token: str,
+        google_id_token: str,
+        response_as_pydantic: Literal[True] = ...,
+    ) -> StandardResponse[AddGoogleAuthProviderV0Response]: ...
+
+    @overload
+    async def add_google_auth_provider_v0(
+        self,
+        access_token: str,
+        google_id_token: str,
+        response_as_pydantic: Literal[False] = ...,
+    ) -> Dict[str, Any]: ...
+
+    async def add_google_auth_provider_v0(
+        self,
+        access_token: str,
+        google_id_token: str,
+        response_as_pydantic: bool = False,
+    ) -> Any:
+        try:
+            return await self._call_endpoint(
+                "add_google_auth_provider_v0",
+                response_as_pydantic,
+                access_token=access_token,
+                google_id_token=google_id_token,
+            )
+        except Exception:
+            raise
+
+    @overload
+    async def unlink_auth_provider_v0(
+        self,
+        access_token: str,
+        auth_provider: str,
+        response_as_pydantic: Literal[True] = ...,
+    ) -> StandardResponse[UnlinkAuthProviderV0Response]: ...
+
+    @overload
+    async def unlink_auth_provider_v0(
+        self,
+        access_token: str,
+        auth_provider: str,
+        response_as_pydantic: Literal[False] = ...,
+    ) -> Dict[str, Any]: ...
+
+    async def unlink_auth_provider_v0(
+        self,
+        access_token: str,
+        auth_provider: str,
+        response_as_pydantic: bool = False,
+    ) -> Any:
+        try:
+            return await self._call_endpoint(
+                "unlink_auth_provider_v0",
+                response_as_pydantic,
+                access_token=access_token,
+                auth_provider=auth_provider,
+            )
+        except Exception:
+            raise
@@ -0,0 +1,227 @@
+import random
+import threading
+import time
+from enum import Enum
+from typing import Any, Callable, Collection, Dict, List, Optional, Sequence
+
+from square_authentication_helper.resilience import is_server_failure
+
+
+class BalancingStrategy(Enum):
+    """
+    power_of_two_choices: compare two random endpoints and use the cheaper one.
+    least_latency: always use the cheapest endpoint.
+
+    the cost of an endpoint is its latency ewma times (requests in flight + 1).
+    """
+
+    power_of_two_choices = "power_of_two_choices"
+    least_latency = "least_latency"
+
+
+class _EndpointState:
+    __slots__ = (
+        "url",
+        "ewma",
+        "in_flight",
+        "consecutive_failures",
+        "ejections",
+        "ejected_until",
+        "probing",
+        "requests",
+        "failures",
+    )
+
+    def __init__(self, url: str):
+        self.url = url
+        # 0 until the first response, so new endpoints are tried first.
+        self.ewma = 0.0
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        # a probe of the ejected endpoint was picked and has not been released yet.
+        self.probing = False
+        self.requests = 0
+        self.failures = 0
+
+
+class EndpointBalancer:
+    """
+    client side load balancer over several auth server replicas.
+
+    an endpoint failing max_consecutive_failures times in a row is ejected for
+    ejection_time seconds (doubling on every ejection up to max_ejection_time). once that
+    passes, a single probe request is let through, it brings the endpoint back on
+    success and ejects it again on failure.
+    """
+
+    def __init__(
+        self,
+        endpoints: Sequence[str],
+        strategy: BalancingStrategy = BalancingStrategy.power_of_two_choices,
+        ewma_alpha: float = 0.3,
+        max_consecutive_failures: int = 3,
+        ejection_time: float = 10.0,
+        max_ejection_time: float = 300.0,
+        is_failure: Callable[[BaseException], bool] = is_server_failure,
+    ):
+        """
+        :param endpoints: base urls, e.g. ["http://10.0.0.1:10011", "http://10.0.0.2:10011"].
+        :param ewma_alpha: weight of the newest latency sample in the ewma.
+        :param max_consecutive_failures: failures in a row that eject an endpoint.
+        :param ejection_time: seconds the first ejection lasts.
+        :param max_ejection_time: cap of the doubling ejection time.
+        :param is_failure: decides whether an exception counts against the endpoint.
+        """
+        if not endpoints:
+            raise ValueError("at least one endpoint is required.")
+        if not 0 < ewma_alpha <= 1:
+            raise ValueError("ewma_alpha must be in (0, 1].")
+        if max_consecutive_failures < 1 or ejection_time <= 0:
+            raise ValueError(
+                "max_consecutive_failures must be >= 1 and ejection_time positive."
+            )
+        self.strategy = BalancingStrategy(strategy)
+        self.ewma_alpha = ewma_alpha
+        self.max_consecutive_failures = max_consecutive_failures
+        self.ejection_time = ejection_time
+        self.max_ejection_time = max(max_ejection_time, ejection_time)
+        self.is_failure = is_failure
+        self._lock = threading.Lock()
+        self._states: Dict[str, _EndpointState] = {
+            url.rstrip("/"): _EndpointState(url.rstrip("/")) for url in endpoints
+        }
+        self._random = random.Random()
+
+    @property
+    def endpoints(self) -> List[str]:
+        return list(self._states)
+
+    def _is_available(self, state: _EndpointState, now: float) -> bool:
+        if state.consecutive_failures < self.max_consecutive_failures:
+            return True
+        # ejected: unavailable until the ejection ends, then one probe at a time.
+        return now >= state.ejected_until and state.in_flight == 0 and not state.probing
+
+    @staticmethod
+    def _cost(state: _EndpointState) -> float:
+        return state.ewma * (state.in_flight + 1)
+
+    def pick(self, exclude: Collection[str] = ()) -> str:
+        """
+        choose the endpoint for the next request, send it through call to record it
+        (a pick reserves the single probe of an ejected endpoint until that call ends).
+
+        :param exclude: endpoints to avoid (e.g. already tried for this call), ignored
+            when nothing else is left.
+        """
+        with self._lock:
+            now = time.monotonic()
+            states = list(self._states.values())
+            candidates = [
+                s for s in states if s.url not in exclude and self._is_available(s, now)
+            ]
+            if not candidates:
+                candidates = [s for s in states if s.url not in exclude] or states
+                # everything is ejected, use the endpoint that comes back first.
+                candidates = [min(candidates, key=lambda s: s.ejected_until)]
+            if len(candidates) == 1:
+                chosen = candidates[0]
+            elif self.strategy == BalancingStrategy.least_latency:
+                chosen = min(candidates, key=self._cost)
+            else:
+                first, second = self._random.sample(candidates, 2)
+                chosen = first if self._cost(first) <= self._cost(second) else second
+            if chosen.consecutive_failures >= self.max_consecutive_failures:
+                # reserved under the same lock, concurrent picks can not probe it too.
+                chosen.probing = True
+            return chosen.url
+
+    def acquire(self, url: str):
+        """
+        count a request to url as in flight until the matching release.
+        """
+        with self._lock:
+            state = self._states[url]
+            state.in_flight += 1
+            state.requests += 1
+
+    def release(self, url: str, latency: float, error: Optional[BaseException] = None):
+        """
+        record the outcome of a request to url started with acquire.
+        """
+        failed = (
+            error is not None
+            and isinstance(error, Exception)
+            and self.is_failure(error)
+        )
+        with self._lock:
+            state = self._states[url]
+            state.in_flight -= 1
+            state.probing = False
+            if error is not None and not isinstance(error, Exception):
+                # cancelled, says nothing about the endpoint.
+                return
+            if not failed:
+                state.ewma = (
+                    latency
+                    if state.ewma == 0.0
+                    else self.ewma_alpha * latency + (1 - self.ewma_alpha) * state.ewma
+                )
+                state.consecutive_failures = 0
+                state.ejections = 0
+                return
+            state.failures += 1
+            state.consecutive_failures += 1
+            if state.consecutive_failures >= self.max_consecutive_failures:
+                state.ejected_until = time.monotonic() + min(
+                    self.max_ejection_time, self.ejection_time * 2**state.ejections
+                )
+                state.ejections += 1
+
+    def call(self, url: str, function: Callable[[], Any]) -> Any:
+        self.acquire(url)
+        start = time.monotonic()
+        try:
+            result = function()
+        except BaseException as e:
+            self.release(url, time.monotonic() - start, e)
+            raise
+        self.release(url, time.monotonic() - start)
+        return result
+
+    async def call_async(self, url: str, function: Callable[[], Any]) -> Any:
+        self.acquire(url)
+        start = time.monotonic()
+        try:
+            result = await function()
+        except BaseException as e:
+            self.release(url, time.monotonic() - start, e)
+            raise
+        self.release(url, time.monotonic() - start)
+        return result
+
+    def is_ejected(self, url: str) -> bool:
+        with self._lock:
+            state = self._states[url]
+            return (
+                state.consecutive_failures >= self.max_consecutive_failures
+                and time.monotonic() < state.ejected_until
+            )
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                state.url: {
+                    "ewma": state.ewma,
+                    "in_flight": state.in_flight,
+                    "requests": state.requests,
+                    "failures": state.failures,
+                    "ejected": state.consecutive_failures
+                    >= self.max_consecutive_failures
+                    and now < state.ejected_until,
+                }
+                for state in self._states.values()
+            }
@@ -0,0 +1,310 @@
+import time
+from typing import Any, ContextManager, Dict, Hashable, List, Optional
+
+from square_authentication_helper.balancing import BalancingStrategy, EndpointBalancer
+from square_authentication_helper.cache import (
+    TTLCache,
+    UserDetailsCache,
+    get_payload_expiry,
+)
+from square_authentication_helper.coalescing import RequestCoalescer, make_request_key
+from square_authentication_helper.endpoints import ENDPOINTS_BY_PATH, Endpoint
+from square_authentication_helper.enums import TokenType
+from square_authentication_helper.hooks import RequestHooks, RequestInfo
+from square_authentication_helper.jwt_utils import LocalTokenVerifier
+from square_authentication_helper.lazy_imports import get_response_model
+from square_authentication_helper.metrics import MetricsSink, get_body_sizes
+from square_authentication_helper.resilience import (
+    CallOptions,
+    CircuitBreaker,
+    CircuitState,
+    DeadlineExceededError,
+    RetryPolicy,
+    call_options,
+    get_call_options,
+    get_status_code,
+)
+
+
+class _BaseSquareAuthenticationHelper:
+    """
+    configuration and i/o free logic shared by SquareAuthenticationHelper and
+    AsyncSquareAuthenticationHelper, which create global_transport and send the requests.
+    """
+
+    _coalescer_class = RequestCoalescer
+
+    def __init__(
+        self,
+        param_int_square_authentication_port: int,
+        param_str_square_authentication_ip: str,
+        param_str_square_authentication_protocol: str,
+        param_validation_cache: Optional[TTLCache],
+        param_local_token_verifier: Optional[LocalTokenVerifier],
+        param_bool_coalesce_requests: bool,
+        param_user_details_cache: Optional[UserDetailsCache],
+        param_retry_policy: Optional[RetryPolicy],
+        param_circuit_breaker: Optional[CircuitBreaker],
+        param_float_connect_timeout: Optional[float],
+        param_float_read_timeout: Optional[float],
+        param_list_str_square_authentication_endpoints: Optional[List[str]],
+        param_balancing_strategy: BalancingStrategy,
+        param_str_square_authentication_url: Optional[str],
+        param_metrics: Optional[MetricsSink],
+        param_list_request_hooks: Optional[List[RequestHooks]],
+    ):
+        try:
+            self.global_str_square_authentication_url_base = (
+                f"{param_str_square_authentication_protocol}://"
+                f"{param_str_square_authentication_ip}:{param_int_square_authentication_port}"
+            )
+            # full base url, e.g. unix:///run/square_authentication.sock to skip tcp.
+            if param_str_square_authentication_url:
+                self.global_str_square_authentication_url_base = (
+                    param_str_square_authentication_url.rstrip("/")
+                )
+            # several replicas: requests are spread over them, protocol / ip / port are ignored.
+            self.global_endpoint_balancer = None
+            if param_list_str_square_authentication_endpoints:
+                self.global_endpoint_balancer = EndpointBalancer(
+                    param_list_str_square_authentication_endpoints,
+                    strategy=param_balancing_strategy,
+                )
+                self.global_str_square_authentication_url_base = (
+                    self.global_endpoint_balancer.endpoints[0]
+                )
+            self.global_validation_cache = param_validation_cache
+            self.global_local_token_verifier = param_local_token_verifier
+            self.global_user_details_cache = param_user_details_cache
+            self.global_retry_policy = param_retry_policy
+            self.global_circuit_breaker = param_circuit_breaker
+            self.global_float_connect_timeout = param_float_connect_timeout
+            self.global_float_read_timeout = param_float_read_timeout
+            self.global_list_request_hooks = list(param_list_request_hooks or [])
+            self.global_metrics = param_metrics
+            if param_metrics is not None:
+                if param_validation_cache is not None:
+                    param_metrics.register_cache("validation", param_validation_cache)
+                if param_user_details_cache is not None:
+                    param_metrics.register_cache(
+                        "user_details", param_user_details_cache.cache
+                    )
+            self.global_request_coalescer = (
+                self._coalescer_class() if param_bool_coalesce_requests else None
+            )
+        except Exception:
+            raise
+
+    def call_options(
+        self,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> ContextManager[CallOptions]:
+        """
+        context manager overriding timeouts / setting a deadline for the calls inside it,
+        e.g. with helper.call_options(deadline=0.5): helper.get_user_details_v0(...)
+
+        :param connect_timeout: seconds to wait for a connection.
+        :param read_timeout: seconds to wait for response data.
+        :param timeout: shorthand for the same connect and read timeout.
+        :param deadline: time budget in seconds for every call inside the block, retries
+            and backoff included.
+        """
+        try:
+            return call_options(
+                connect_timeout=connect_timeout,
+                read_timeout=read_timeout,
+                timeout=timeout,
+                deadline=deadline,
+            )
+        except Exception:
+            raise
+
+    def _pick_endpoint(self, exclude):
+        """
+        balancer choice, skipping endpoints whose circuit is open.
+        """
+        try:
+            exclude = set(exclude)
+            if self.global_circuit_breaker is not None:
+                exclude.update(
+                    url
+                    for url in self.global_endpoint_balancer.endpoints
+                    if self.global_circuit_breaker.get_state(url) == CircuitState.open
+                )
+            return self.global_endpoint_balancer.pick(exclude)
+        except Exception:
+            raise
+
+    def _is_direct(self) -> bool:
+        """
+        true when no retry policy, circuit breaker, balancer, metrics or hooks are
+        configured, requests then go straight to the transport.
+        """
+        return (
+            self.global_retry_policy is None
+            and self.global_circuit_breaker is None
+            and self.global_endpoint_balancer is None
+            and self.global_metrics is None
+            and not self.global_list_request_hooks
+        )
+
+    def _is_idempotent(self, method: str, endpoint: str) -> bool:
+        # registered endpoints say whether they are idempotent reads, anything
+        # else (e.g. a raw path) is treated as one when it is a GET.
+        spec = ENDPOINTS_BY_PATH.get(endpoint)
+        return spec.idempotent if spec is not None else method == "GET"
+
+    def _get_coalescing_key(
+        self, idempotent: bool, request_kwargs: Dict[str, Any], return_type: str
+    ) -> Optional[Hashable]:
+        """
+        key to share the request under, none when it must be sent on its own.
+        """
+        # only idempotent reads without a body are safe to share.
+        if (
+            self.global_request_coalescer is None
+            or not idempotent
+            or request_kwargs["json"] is not None
+            or request_kwargs["data"] is not None
+            or request_kwargs["files"] is not None
+        ):
+            return None
+        return make_request_key(
+            request_kwargs["method"],
+            request_kwargs["endpoint"],
+            request_kwargs["headers"],
+            request_kwargs["params"],
+            return_type,
+        )
+
+    def _raise_if_deadline_exceeded(self, endpoint: str, error: BaseException):
+        """
+        raise DeadlineExceededError from error when the call's deadline has passed.
+        """
+        deadline = get_call_options().deadline
+        if (
+            deadline is not None
+            and deadline.expired
+            and not isinstance(error, DeadlineExceededError)
+        ):
+            raise DeadlineExceededError(
+                f"deadline exceeded calling {endpoint}."
+            ) from error
+
+    def _before_request(
+        self, attempt: int, request_kwargs: Dict[str, Any]
+    ) -> Optional[RequestInfo]:
+        """
+        run the before_request hooks on an attempt, the RequestInfo is none without hooks.
+        """
+        if not self.global_list_request_hooks:
+            return None
+        info = RequestInfo(
+            request_kwargs["endpoint"],
+            request_kwargs["method"],
+            request_kwargs["url"],
+            attempt,
+            request_kwargs["headers"],
+        )
+        for hook in self.global_list_request_hooks:
+            hook.before_request(info)
+        headers = request_kwargs["headers"] or {}
+        added = {
+            name: value for name, value in info.headers.items() if name not in headers
+        }
+        if added:
+            request_kwargs["headers"] = {**headers, **added}
+        request_kwargs["timings"] = info.timings
+        return info
+
+    def _on_request_error(
+        self, info: Optional[RequestInfo], error: BaseException, start: float
+    ):
+        if info is None:
+            return
+        info.status_code = get_status_code(error)
+        info.timings["total"] = time.perf_counter() - start
+        for hook in self.global_list_request_hooks:
+            hook.on_error(info, error)
+
+    def _after_response(
+        self,
+        info: Optional[RequestInfo],
+        request_kwargs: Dict[str, Any],
+        response: Any,
+        start: float,
+        parse_start: float,
+    ):
+        """
+        report a received response to the metrics sink and the after_response hooks.
+        """
+        end = time.perf_counter()
+        request_bytes, response_bytes = get_body_sizes(response)
+        if self.global_metrics is not None:
+            self.global_metrics.observe_bytes(
+                request_kwargs["endpoint"],
+                request_kwargs["method"],
+                request_bytes,
+                response_bytes,
+            )
+        if info is not None:
+            info.status_code = response.status_code
+            info.request_bytes = request_bytes
+            info.response_bytes = response_bytes
+            info.timings["parse"] = end - parse_start
+            info.timings["total"] = end - start
+            for hook in self.global_list_request_hooks:
+                hook.after_response(info)
+
+    def _parse_response(self, response_model, response):
+        """
+        validate response_model (the name of a model in pydantic_models) from a json dict
+        or raw body.
+        """
+        try:
+            response_model = get_response_model(response_model)
+            if isinstance(response, (bytes, str)):
+                return response_model.model_validate_json(response)
+            return response_model.model_validate(response)
+        except Exception:
+            raise
+
+    def _get_result(
+        self, endpoint: Endpoint, response_as_pydantic: bool, response: Dict[str, Any]
+    ) -> Any:
+        if response_as_pydantic:
+            return self._parse_response(endpoint.response_model, response)
+        return response
+
+    def _get_validation_cache_key(self, arguments: Dict[str, Any]) -> Hashable:
+        return arguments["token"], arguments["token_type"].value, arguments["app_id"]
+
+    def _get_cached_validation(
+        self, cache_key: Hashable, arguments: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        validation response from the cache or the local token verifier, none when the
+        server has to be asked.
+        """
+        response = None
+        if self.global_validation_cache is not None:
+            response = self.global_validation_cache.get(cache_key)
+        if (
+            response is None
+            and self.global_local_token_verifier is not None
+            and arguments["token_type"] == TokenType.access_token
+        ):
+            payload = self.global_local_token_verifier.verify(
+                arguments["token"], arguments["app_id"]
+            )
+            if payload is not None:
+                response = {"data": {"main": payload}, "message": None, "log": None}
+        return response
+
+    def _set_cached_validation(self, cache_key: Hashable, response: Dict[str, Any]):
+        self.global_validation_cache.set(
+            cache_key, response, expires_at=get_payload_expiry(response)
+        )
@@ -0,0 +1,305 @@
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Union,
+)
+
+__all__ = [
+    "TokenValidationResult",
+    "BulkResult",
+    "BulkStats",
+    "run_bulk",
+    "run_bulk_async",
+]
+
+
+class TokenValidationResult(NamedTuple):
+    """
+    outcome for one token of validate_tokens_bulk, exactly one of response / error is set.
+    """
+
+    token: str
+    response: Any = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class BulkResult(NamedTuple):
+    """
+    outcome for one item of run_bulk / run_bulk_async, exactly one of response / error is set.
+
+    index is the position of the item in the input, results are yielded as they complete.
+    """
+
+    index: int
+    kwargs: Mapping[str, Any]
+    response: Any = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class BulkStats:
+    """
+    live counters of a bulk run, safe to read from another thread while it is running.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def completed(self) -> int:
+        return self.succeeded + self.failed
+
+    @property
+    def in_flight(self) -> int:
+        return self.submitted - self.completed
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """
+        completed items per second.
+        """
+        elapsed = self.elapsed
+        return self.completed / elapsed if elapsed > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "in_flight": self.in_flight,
+            "elapsed": self.elapsed,
+            "throughput": self.throughput,
+        }
+
+    def __repr__(self) -> str:
+        return (
+            f"BulkStats(completed={self.completed}, failed={self.failed}, "
+            f"in_flight={self.in_flight}, elapsed={self.elapsed:.1f}s, "
+            f"throughput={self.throughput:.1f}/s)"
+        )
+
+    def _start(self):
+        self.started_at = time.monotonic()
+        self.finished_at = None
+
+    def _finish(self):
+        self.finished_at = time.monotonic()
+
+    def _record(self, result: BulkResult):
+        with self._lock:
+            if result.ok:
+                self.succeeded += 1
+            else:
+                self.failed += 1
+
+
+class _ProgressReporter:
+    def __init__(
+        self,
+        stats: BulkStats,
+        callback: Optional[Callable[[BulkStats], None]],
+        interval: float,
+    ):
+        self.stats = stats
+        self.callback = callback
+        self.interval = interval
+        self._float_next_report = time.monotonic() + interval
+
+    def tick(self, force: bool = False):
+        if self.callback is None:
+            return
+        now = time.monotonic()
+        if force or now >= self._float_next_report:
+            self._float_next_report = now + self.interval
+            self.callback(self.stats)
+
+
+def _validate_limits(max_concurrency: int, max_pending: Optional[int]) -> int:
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be >= 1.")
+    if max_pending is None:
+        return 2 * max_concurrency
+    if max_pending < max_concurrency:
+        raise ValueError("max_pending must be >= max_concurrency.")
+    return max_pending
+
+
+def run_bulk(
+    function: Callable[..., Any],
+    items: Iterable[Mapping[str, Any]],
+    max_concurrency: int = 10,
+    max_pending: Optional[int] = None,
+    stats: Optional[BulkStats] = None,
+    progress_callback: Optional[Callable[[BulkStats], None]] = None,
+    progress_interval: float = 5.0,
+) -> Iterator[BulkResult]:
+    """
+    call function(**kwargs) for every kwargs in items on a bounded thread pool and yield
+    a BulkResult per item as soon as it completes (not in input order).
+
+    items is consumed lazily, at most max_pending items are read ahead of the results, so
+    generators of any size run in constant memory.
+
+    e.g. run_bulk(helper.logout_all_v0, ({"access_token": t} for t in tokens))
+
+    :param function: any helper *_v0 method (or other callable taking keyword arguments).
+    :param max_concurrency: worker threads, keep it at or below the helper pool_maxsize.
+    :param max_pending: max submitted but not yet yielded items, defaults to 2 * max_concurrency.
+    :param stats: BulkStats updated while running, for throughput reporting.
+    :param progress_callback: called with the stats at most every progress_interval seconds
+        and once at the end.
+    """
+    max_pending = _validate_limits(max_concurrency, max_pending)
+    stats = stats if stats is not None else BulkStats()
+    reporter = _ProgressReporter(stats, progress_callback, progress_interval)
+
+    # worker threads run in a copy of the caller context (e.g. call_options).
+    context = contextvars.copy_context()
+
+    def call(index, kwargs):
+        try:
+            return BulkResult(
+                index, kwargs, response=context.copy().run(function, **kwargs)
+            )
+        except Exception as e:
+            return BulkResult(index, kwargs, error=e)
+
+    iterator = enumerate(items)
+    pending = set()
+    executor = ThreadPoolExecutor(
+        max_workers=max_concurrency, thread_name_prefix="square_authentication_bulk"
+    )
+    stats._start()
+    try:
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < max_pending:
+                try:
+                    index, kwargs = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.add(executor.submit(call, index, kwargs))
+                stats.submitted += 1
+            if not pending:
+                break
+            done, pending = wait(
+                pending, timeout=progress_interval, return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                result = future.result()
+                stats._record(result)
+                yield result
+            reporter.tick()
+    finally:
+        # on early exit (break / close) drop work that has not started yet.
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+        stats._finish()
+        reporter.tick(force=True)
+
+
+async def _aiter_items(
+    items: Union[Iterable[Mapping[str, Any]], AsyncIterable[Mapping[str, Any]]],
+) -> AsyncIterator[Mapping[str, Any]]:
+    if isinstance(items, AsyncIterable):
+        async for each in items:
+            yield each
+    else:
+        for each in items:
+            yield each
+
+
+async def run_bulk_async(
+    function: Callable[..., Awaitable[Any]],
+    items: Union[Iterable[Mapping[str, Any]], AsyncIterable[Mapping[str, Any]]],
+    max_concurrency: int = 20,
+    max_pending: Optional[int] = None,
+    stats: Optional[BulkStats] = None,
+    progress_callback: Optional[Callable[[BulkStats], None]] = None,
+    progress_interval: float = 5.0,
+) -> AsyncIterator[BulkResult]:
+    """
+    asyncio version of run_bulk for AsyncSquareAuthenticationHelper methods, at most
+    max_concurrency calls run at once (bounded by a semaphore).
+
+    e.g. async for result in run_bulk_async(helper.delete_user_v0, rows): ...
+    """
+    max_pending = _validate_limits(max_concurrency, max_pending)
+    stats = stats if stats is not None else BulkStats()
+    reporter = _ProgressReporter(stats, progress_callback, progress_interval)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def call(index, kwargs):
+        async with semaphore:
+            try:
+                return BulkResult(index, kwargs, response=await function(**kwargs))
+            except Exception as e:
+                return BulkResult(index, kwargs, error=e)
+
+    iterator = _aiter_items(items).__aiter__()
+    pending = set()
+    index = 0
+    stats._start()
+    try:
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < max_pending:
+                try:
+                    kwargs = await iterator.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                pending.add(asyncio.ensure_future(call(index, kwargs)))
+                index += 1
+                stats.submitted += 1
+            if not pending:
+                break
+            done, pending = await asyncio.wait(
+                pending, timeout=progress_interval, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                result = task.result()
+                stats._record(result)
+                yield result
+            reporter.tick()
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        stats._finish()
+        reporter.tick(force=True)
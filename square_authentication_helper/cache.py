@@ -0,0 +1,318 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from square_authentication_helper.jwt_utils import InvalidTokenError, decode_unverified
+
+
+def _estimate_size(key: Hashable, value: Any) -> int:
+    return len(repr(key)) + len(repr(value))
+
+
+class TTLCache:
+    """
+    thread safe lru cache with a per entry expiry and an optional memory cap.
+
+    values are shared between callers, treat anything returned from it as read only.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        max_entries: int = 10000,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Hashable, Any], int] = _estimate_size,
+        stale_ttl: float = 0.0,
+    ):
+        """
+        :param ttl: max seconds an entry is served for.
+        :param max_entries: max number of entries before the least recently used is evicted.
+        :param max_bytes: approximate memory cap (as measured by sizeof), none for no cap.
+        :param sizeof: callable returning the approximate size of an entry in bytes, only
+            called (and total_bytes only tracked) with max_bytes.
+        :param stale_ttl: seconds an expired entry is kept for get_stale (e.g. while the
+            server is unreachable), never past the expires_at given to set.
+        """
+        if ttl <= 0:
+            raise ValueError("ttl must be positive.")
+        if max_entries < 1:
+            raise ValueError("max_entries must be >= 1.")
+        if max_bytes is not None and max_bytes < 1:
+            raise ValueError("max_bytes must be >= 1.")
+        if stale_ttl < 0:
+            raise ValueError("stale_ttl must be >= 0.")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.stale_ttl = stale_ttl
+        self._lock = threading.Lock()
+        # key -> (value, monotonic expiry, size, monotonic end of the stale window)
+        self._entries: OrderedDict[Hashable, tuple[Any, float, int, float]] = (
+            OrderedDict()
+        )
+        self._int_total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_hits = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[1] > time.monotonic()
+
+    @property
+    def total_bytes(self) -> int:
+        return self._int_total_bytes
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            now = time.monotonic()
+            if entry[1] <= now:
+                if entry[3] <= now:
+                    self._remove(key)
+                    self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None):
+        """
+        :param expires_at: unix timestamp after which the entry must not be served,
+            the entry expires at the earlier of this and the cache ttl.
+        """
+        now = time.monotonic()
+        expiry = now + self.ttl
+        stale_until = expiry + self.stale_ttl
+        if expires_at is not None:
+            hard_expiry = now + (expires_at - time.time())
+            expiry = min(expiry, hard_expiry)
+            stale_until = min(stale_until, hard_expiry)
+        size = 0
+        if self.max_bytes is not None and expiry > now:
+            size = self.sizeof(key, value)
+        if expiry <= now or (self.max_bytes is not None and size > self.max_bytes):
+            # not stored, the value it replaces must not be served either.
+            self.delete(key)
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expiry, size, stale_until)
+            self._int_total_bytes += size
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self._int_total_bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_stale(self, key: Hashable) -> Optional[Any]:
+        """
+        like get, but also returns entries that expired less than stale_ttl ago.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[3] <= time.monotonic():
+                return None
+            self.stale_hits += 1
+            return entry[0]
+
+    def retains(self, key: Hashable) -> bool:
+        """
+        true while the entry can still be returned by get or get_stale.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[3] > time.monotonic()
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._int_total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._int_total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "stale_hits": self.stale_hits,
+        }
+
+    def _remove(self, key: Hashable):
+        size = self._entries.pop(key)[2]
+        self._int_total_bytes -= size
+
+
+def get_payload_expiry(response: Any) -> Optional[float]:
+    """
+    read the exp claim from a validate_and_get_payload_from_token_v0 response.
+    """
+    try:
+        expiry = response["data"]["main"]["exp"]
+    except (KeyError, TypeError):
+        return None
+    if isinstance(expiry, (int, float)) and not isinstance(expiry, bool):
+        return float(expiry)
+    return None
+
+
+def _get_user_id_from_token(token: Optional[str]) -> Optional[str]:
+    if not token:
+        return None
+    try:
+        _, payload = decode_unverified(token)
+    except InvalidTokenError:
+        return None
+    user_id = payload.get("user_id")
+    return None if user_id is None else str(user_id)
+
+
+def _get_user_id_from_response(response: Any) -> Optional[str]:
+    if isinstance(response, bytes):
+        try:
+            response = json.loads(response)
+        except ValueError:
+            return None
+    try:
+        user_id = response["data"]["main"]["user_id"]
+    except (KeyError, TypeError):
+        return None
+    return None if user_id is None else str(user_id)
+
+
+class UserDetailsCache:
+    """
+    per user cache of get_user_details_v0 responses, keyed on the access token and
+    invalidated for the whole user whenever the helper runs a mutating call for them.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 60.0,
+        max_entries: int = 10000,
+        max_bytes: Optional[int] = None,
+        stale_ttl: float = 0.0,
+    ):
+        self.cache = TTLCache(
+            ttl=ttl, max_entries=max_entries, max_bytes=max_bytes, stale_ttl=stale_ttl
+        )
+        self._lock = threading.Lock()
+        self._dict_user_tokens: Dict[str, set] = {}
+        self._dict_token_user: Dict[str, str] = {}
+        # bumped on every invalidation, a fetch started at an older generation than the
+        # latest invalidation of its user / token is not stored.
+        self.generation = 0
+        self._dict_user_generation: Dict[str, int] = {}
+        self._dict_token_generation: Dict[str, int] = {}
+        # fetches started before it are never stored (clear, forgotten invalidations).
+        self._min_generation = 0
+        self.invalidations = 0
+
+    def get(self, access_token: str) -> Optional[Any]:
+        return self.cache.get(access_token)
+
+    def get_stale(self, access_token: str) -> Optional[Any]:
+        return self.cache.get_stale(access_token)
+
+    def set(self, access_token: str, response: Any, generation: int):
+        """
+        :param generation: value of self.generation read before the fetch started, the
+            response is dropped if the user or token was invalidated since.
+        """
+        user_id = _get_user_id_from_response(response) or _get_user_id_from_token(
+            access_token
+        )
+        with self._lock:
+            if (
+                generation < self._min_generation
+                or self._dict_token_generation.get(access_token, -1) > generation
+                or self._dict_user_generation.get(user_id, -1) > generation
+            ):
+                return
+            self.cache.set(access_token, response)
+            if user_id is None:
+                return
+            self._dict_token_user[access_token] = user_id
+            tokens = self._dict_user_tokens.setdefault(user_id, set())
+            tokens.add(access_token)
+            if len(self._dict_token_user) > 2 * self.cache.max_entries:
+                self._prune_index()
+
+    def invalidate(self, token: Optional[str] = None, user_id: Optional[str] = None):
+        """
+        drop every cached response of the user owning token and / or user_id.
+        """
+        with self._lock:
+            self.generation += 1
+            self.invalidations += 1
+            user_ids = {user_id} if user_id is not None else set()
+            if token is not None:
+                self.cache.delete(token)
+                user_ids.add(
+                    self._dict_token_user.get(token) or _get_user_id_from_token(token)
+                )
+            if token is not None:
+                self._dict_token_generation[token] = self.generation
+            for each_user_id in user_ids - {None}:
+                self._dict_user_generation[each_user_id] = self.generation
+                for each_token in self._dict_user_tokens.pop(each_user_id, ()):
+                    self.cache.delete(each_token)
+                    self._dict_token_user.pop(each_token, None)
+            # bound the history, forgetting it rejects every fetch already in flight.
+            if (
+                len(self._dict_user_generation) + len(self._dict_token_generation)
+                > self.cache.max_entries
+            ):
+                self._forget_generations()
+
+    def invalidate_for_request(self, headers: Optional[dict], response: Any):
+        headers = headers or {}
+        self.invalidate(
+            token=headers.get("access_token") or headers.get("refresh_token"),
+            user_id=_get_user_id_from_response(response),
+        )
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._forget_generations()
+            self.cache.clear()
+            self._dict_user_tokens.clear()
+            self._dict_token_user.clear()
+
+    def _forget_generations(self):
+        self._min_generation = self.generation
+        self._dict_user_generation.clear()
+        self._dict_token_generation.clear()
+
+    def _prune_index(self):
+        for token in [t for t in self._dict_token_user if not self.cache.retains(t)]:
+            user_id = self._dict_token_user.pop(token)
+            tokens = self._dict_user_tokens.get(user_id)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._dict_user_tokens[user_id]
@@ -0,0 +1,299 @@
+"""
+square-auth-bulk: stream a jsonl or csv file of operations through SquareAuthenticationHelper.
+
+every input row is one call of a helper *_v0 method, e.g. (jsonl)
+
+    {"operation": "logout_apps_v0", "access_token": "...", "app_ids": [1, 2]}
+
+or (csv, cells are json decoded when possible unless the argument is a string, empty
+cells are left out)
+
+    operation,username,password,app_id
+    register_username_v0,alice,secret,1
+
+rows without an operation use --operation. results are written as one json line per row
+(in completion order) with the input line number, so memory use does not grow with the
+input size. a row that is not valid json or fails is reported with "ok": false. with
+--checkpoint, finished rows are recorded and skipped when the same command is run again,
+except the failed ones (up to --retry-limit of them), which are retried. rows finished
+after the last checkpoint save are sent again, so operations should be safe to repeat.
+"""
+
+import argparse
+import csv
+import enum
+import json
+import os
+import sys
+import typing
+from typing import Any, Dict, Iterator, Optional, Set, TextIO, Tuple, Union
+
+from square_authentication_helper.bulk import BulkStats, run_bulk
+from square_authentication_helper.endpoints import ENDPOINTS
+from square_authentication_helper.lazy_imports import type_hints_namespace
+from square_authentication_helper.main import SquareAuthenticationHelper
+
+
+class Checkpoint:
+    """
+    resume state of a bulk run: every line below watermark plus the lines in done are
+    finished, the lines in failed (at most max_failed, later failures are only counted
+    in dropped) have to be sent again. done only holds lines finished out of order, so
+    the state stays small whatever the input size.
+    """
+
+    def __init__(self, path: str, max_failed: int = 1000):
+        self.path = path
+        self.max_failed = max_failed
+        self.watermark = 0
+        self.done: Set[int] = set()
+        self.failed: Set[int] = set()
+        self.dropped = 0
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                state = json.load(file)
+            self.watermark = state["watermark"]
+            self.done = set(state["done"])
+            self.failed = set(state.get("failed", ()))
+
+    def __contains__(self, line: int) -> bool:
+        return (line < self.watermark or line in self.done) and line not in self.failed
+
+    def add(self, line: int, ok: bool = True):
+        self.failed.discard(line)
+        if not ok:
+            if len(self.failed) < self.max_failed:
+                self.failed.add(line)
+            else:
+                self.dropped += 1
+        if line < self.watermark:
+            # a retried failure.
+            return
+        self.done.add(line)
+        while self.watermark in self.done:
+            self.done.remove(self.watermark)
+            self.watermark += 1
+
+    def save(self):
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "watermark": self.watermark,
+                    "done": sorted(self.done),
+                    "failed": sorted(self.failed),
+                },
+                file,
+            )
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, self.path)
+
+
+def _decode_cell(value: str) -> Any:
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def _accepts_str(annotation: Any) -> bool:
+    return annotation is str or str in typing.get_args(annotation)
+
+
+def _read_rows(file: TextIO, input_format: str) -> Iterator[Union[Dict[str, Any], str]]:
+    """
+    csv rows as dicts, jsonl rows as their undecoded text (decoded per row by the caller,
+    so one malformed line only fails that row).
+    """
+    if input_format == "csv":
+        for row in csv.DictReader(file):
+            yield {key: value for key, value in row.items() if value != ""}
+    else:
+        for line in file:
+            if line.strip():
+                yield line
+
+
+def _get_enum_type(annotation: Any) -> Tuple[Optional[type], bool]:
+    """
+    (enum class, is list) for Enum / Optional[Enum] / List[Enum] annotations.
+    """
+    if isinstance(annotation, type) and issubclass(annotation, enum.Enum):
+        return annotation, False
+    for arg in typing.get_args(annotation):
+        if isinstance(arg, type) and issubclass(arg, enum.Enum):
+            return arg, typing.get_origin(annotation) is list
+    return None, False
+
+
+def _coerce_arguments(
+    method, arguments: Dict[str, Any], decode_cells: bool = False
+) -> Dict[str, Any]:
+    """
+    turn enum values given as plain strings into the enums the method expects, with
+    decode_cells (csv input) json decode every value the method does not take as a string.
+    """
+    # the helpers postpone their annotations and import some of the types lazily.
+    annotations = typing.get_type_hints(method, localns=type_hints_namespace(method))
+    for name, value in arguments.items():
+        if name not in annotations:
+            continue
+        if decode_cells and not _accepts_str(annotations[name]):
+            value = arguments[name] = _decode_cell(value)
+        if value is None:
+            continue
+        enum_type, is_list = _get_enum_type(annotations[name])
+        if enum_type is None:
+            continue
+        if is_list:
+            arguments[name] = [enum_type(each) for each in value]
+        else:
+            arguments[name] = enum_type(value)
+    return arguments
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="square-auth-bulk",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("input", help="jsonl or csv file, - for stdin.")
+    parser.add_argument(
+        "-o", "--output", default="-", help="jsonl results file, - for stdout."
+    )
+    parser.add_argument(
+        "--format",
+        choices=("jsonl", "csv"),
+        help="input format, guessed from the file extension by default.",
+    )
+    parser.add_argument("--operation", help="helper method for rows without one.")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument(
+        "--checkpoint", help="file to record completed rows in and resume from."
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=100,
+        help="save the checkpoint after this many completed rows.",
+    )
+    parser.add_argument(
+        "--retry-limit",
+        type=int,
+        default=1000,
+        help="failed rows recorded in the checkpoint to retry on resume, later failures "
+        "are only reported in the output.",
+    )
+    parser.add_argument("--ip", default="localhost")
+    parser.add_argument("--port", type=int, default=10011)
+    parser.add_argument("--protocol", default="http")
+    parser.add_argument(
+        "--quiet", action="store_true", help="do not print progress to stderr."
+    )
+    return parser
+
+
+def main(argv: Optional[list] = None) -> int:
+    args = _build_parser().parse_args(argv)
+    input_format = args.format or ("csv" if args.input.endswith(".csv") else "jsonl")
+    checkpoint = (
+        Checkpoint(args.checkpoint, max_failed=args.retry_limit)
+        if args.checkpoint
+        else None
+    )
+
+    helper = SquareAuthenticationHelper(
+        param_int_square_authentication_port=args.port,
+        param_str_square_authentication_ip=args.ip,
+        param_str_square_authentication_protocol=args.protocol,
+        param_int_pool_connections=1,
+        param_int_pool_maxsize=args.concurrency,
+    )
+
+    def call(line, row):
+        if isinstance(row, str):
+            row = json.loads(row)
+            if not isinstance(row, dict):
+                raise ValueError("row is not a json object.")
+        operation = row.pop("operation", None) or args.operation
+        if operation not in ENDPOINTS:
+            raise ValueError(f"unknown operation: {operation}.")
+        method = getattr(helper, operation)
+        return method(
+            **_coerce_arguments(method, row, decode_cells=input_format == "csv")
+        )
+
+    input_file = (
+        sys.stdin
+        if args.input == "-"
+        else open(args.input, encoding="utf-8", newline="")
+    )
+    # resumed runs append to the results of the previous attempt.
+    output_file = (
+        sys.stdout
+        if args.output == "-"
+        else open(
+            args.output,
+            (
+                "a"
+                if checkpoint is not None and (checkpoint.watermark or checkpoint.done)
+                else "w"
+            ),
+            encoding="utf-8",
+        )
+    )
+    stats = BulkStats()
+    failed = 0
+    try:
+        items = (
+            {"line": line, "row": row}
+            for line, row in enumerate(_read_rows(input_file, input_format))
+            if checkpoint is None or line not in checkpoint
+        )
+        results = run_bulk(
+            call,
+            items,
+            max_concurrency=args.concurrency,
+            stats=stats,
+            progress_callback=None if args.quiet else _print_progress,
+        )
+        for count, result in enumerate(results, start=1):
+            record = {"line": result.kwargs["line"], "ok": result.ok}
+            if result.ok:
+                record["response"] = result.response
+            else:
+                failed += 1
+                record["error"] = f"{type(result.error).__name__}: {result.error}"
+            output_file.write(json.dumps(record, default=str) + "\n")
+            if checkpoint is not None:
+                checkpoint.add(result.kwargs["line"], ok=result.ok)
+                if count % args.checkpoint_every == 0:
+                    output_file.flush()
+                    checkpoint.save()
+    finally:
+        # keep the work done so far when a row crashes the run or on ctrl-c.
+        output_file.flush()
+        if checkpoint is not None:
+            checkpoint.save()
+            if checkpoint.dropped:
+                print(
+                    f"{checkpoint.dropped} failed rows are over --retry-limit and will "
+                    "not be retried on resume.",
+                    file=sys.stderr,
+                )
+        helper.close()
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+    return 1 if failed else 0
+
+
+def _print_progress(stats: BulkStats):
+    print(stats, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+import asyncio
+import functools
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from square_authentication_helper.resilience import (
+    DeadlineExceededError,
+    get_call_options,
+)
+
+
+def make_request_key(
+    method: str,
+    endpoint: str,
+    headers: Optional[dict] = None,
+    params: Optional[dict] = None,
+    return_type: str = "json",
+) -> Optional[Hashable]:
+    """
+    identity of a request for coalescing, none if it can not be hashed.
+    """
+    try:
+        key = (
+            method,
+            endpoint,
+            tuple(sorted(headers.items())) if headers else None,
+            tuple(sorted(params.items())) if params else None,
+            return_type,
+        )
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+class _InFlightCall:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RequestCoalescer:
+    """
+    single flight for threads: concurrent calls with the same key share one
+    upstream call and receive the same (read only) result or exception. a caller
+    waiting on another's call stops waiting at its own call_options deadline.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _InFlightCall] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def run(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _InFlightCall()
+                self._calls[key] = call
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        if not is_leader:
+            deadline = get_call_options().deadline
+            if not call.event.wait(
+                None if deadline is None else max(deadline.remaining(), 0)
+            ):
+                raise DeadlineExceededError(
+                    "deadline exceeded waiting for a coalesced request."
+                )
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = function()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+
+class AsyncRequestCoalescer:
+    """
+    single flight for asyncio tasks, see RequestCoalescer.
+
+    the upstream call runs in a task owned by the coalescer and every caller awaits
+    it through asyncio.shield, so cancelling one caller (the first one included)
+    never cancels the call the others are waiting on, and each caller stops waiting
+    at its own call_options deadline (the call itself runs under the first caller's).
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, function: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(function())
+            self._calls[key] = task
+            task.add_done_callback(functools.partial(self._finish, key))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+        deadline = get_call_options().deadline
+        if deadline is None:
+            return await asyncio.shield(task)
+        timeout = asyncio.timeout(deadline.remaining())
+        try:
+            async with timeout:
+                return await asyncio.shield(task)
+        except TimeoutError as e:
+            if not timeout.expired():
+                raise
+            raise DeadlineExceededError(
+                "deadline exceeded waiting for a coalesced request."
+            ) from e
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # mark as retrieved so a call whose callers all left does not log a warning.
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,295 @@
+from enum import Enum
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+
+class Endpoint(NamedTuple):
+    """
+    one endpoint of the authentication server, every helper *_v0 method is driven by its
+    entry in ENDPOINTS.
+
+    headers / json / params / files: names of the method arguments sent in that part of
+    the request, under the same name.
+    response_model: name of the response model in pydantic_models.
+    idempotent: reads that are safe to repeat, they can be coalesced and never
+        invalidate the user details cache (every other call does).
+    cache: helper cache serving the endpoint, "user_details" or "validation".
+    """
+
+    name: str
+    path: str
+    method: str
+    response_model: str
+    headers: Tuple[str, ...] = ()
+    json: Tuple[str, ...] = ()
+    params: Tuple[str, ...] = ()
+    files: Tuple[str, ...] = ()
+    idempotent: bool = False
+    cache: Optional[str] = None
+
+
+def _to_json(arguments: Dict[str, Any], names: Tuple[str, ...]) -> Dict[str, Any]:
+    values = {}
+    for name in names:
+        value = arguments[name]
+        # plain values are by far the most common, only look closer at the rest.
+        if isinstance(value, Enum):
+            value = value.value
+        elif isinstance(value, list):
+            value = [each.value if isinstance(each, Enum) else each for each in value]
+        values[name] = value
+    return values
+
+
+def build_request(endpoint: Endpoint, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    _make_request keyword arguments for a call of endpoint with the method's arguments,
+    enums are sent as their values and files is none when nothing is uploaded.
+    """
+    request = {"method": endpoint.method, "endpoint": endpoint.path}
+    if endpoint.headers:
+        request["headers"] = {name: arguments[name] for name in endpoint.headers}
+    if endpoint.json:
+        request["json"] = _to_json(arguments, endpoint.json)
+    if endpoint.params:
+        request["params"] = _to_json(arguments, endpoint.params)
+    if endpoint.files:
+        request["files"] = {
+            name: arguments[name] for name in endpoint.files if arguments[name]
+        } or None
+    return request
+
+
+_ENDPOINTS: List[Endpoint] = [
+    Endpoint(
+        "register_username_v0",
+        "register_username/v0",
+        "POST",
+        "RegisterUsernameV0Response",
+        json=("username", "password", "app_id"),
+    ),
+    Endpoint(
+        "login_username_v0",
+        "login_username/v0",
+        "POST",
+        "LoginUsernameV0Response",
+        json=("username", "password", "app_id", "assign_app_id_if_missing"),
+    ),
+    Endpoint(
+        "generate_access_token_v0",
+        "generate_access_token/v0",
+        "GET",
+        "GenerateAccessTokenV0Response",
+        headers=("refresh_token",),
+        idempotent=True,
+    ),
+    Endpoint(
+        "logout_v0",
+        "logout/v0",
+        "DELETE",
+        "LogoutV0Response",
+        headers=("refresh_token",),
+    ),
+    Endpoint(
+        "logout_apps_v0",
+        "logout/apps/v0",
+        "POST",
+        "LogoutAppsV0Response",
+        headers=("access_token",),
+        json=("app_ids",),
+    ),
+    Endpoint(
+        "logout_all_v0",
+        "logout/all/v0",
+        "DELETE",
+        "LogoutAllV0Response",
+        headers=("access_token",),
+    ),
+    Endpoint(
+        "get_user_details_v0",
+        "get_user_details/v0",
+        "GET",
+        "GetUserDetailsV0Response",
+        headers=("access_token",),
+        idempotent=True,
+        cache="user_details",
+    ),
+    Endpoint(
+        "update_user_app_ids_v0",
+        "update_user_app_ids/v0",
+        "PATCH",
+        "UpdateUserAppIdsV0Response",
+        headers=("access_token",),
+        json=("app_ids_to_add", "app_ids_to_remove"),
+    ),
+    Endpoint(
+        "update_username_v0",
+        "update_username/v0",
+        "PATCH",
+        "UpdateUsernameV0Response",
+        headers=("access_token",),
+        params=("new_username",),
+    ),
+    Endpoint(
+        "delete_user_v0",
+        "delete_user/v0",
+        "POST",
+        "DeleteUserV0Response",
+        headers=("access_token",),
+        json=("password",),
+    ),
+    Endpoint(
+        "update_password_v0",
+        "update_password/v0",
+        "PATCH",
+        "UpdatePasswordV0Response",
+        headers=("access_token",),
+        json=(
+            "old_password",
+            "new_password",
+            "logout_other_sessions",
+            "preserve_session_refresh_token",
+        ),
+    ),
+    Endpoint(
+        "validate_and_get_payload_from_token_v0",
+        "validate_and_get_payload_from_token/v0",
+        "GET",
+        "ValidateAndGetPayloadFromTokenV0Response",
+        headers=("token",),
+        params=("token_type", "app_id"),
+        idempotent=True,
+        cache="validation",
+    ),
+    Endpoint(
+        "update_profile_photo_v0",
+        "update_profile_photo/v0",
+        "PATCH",
+        "UpdateProfilePhotoV0Response",
+        headers=("access_token",),
+        files=("profile_photo",),
+    ),
+    Endpoint(
+        "update_user_recovery_methods_v0",
+        "update_user_recovery_methods/v0",
+        "PATCH",
+        "UpdateUserRecoveryMethodsV0Response",
+        headers=("access_token",),
+        json=("recovery_methods_to_add", "recovery_methods_to_remove"),
+    ),
+    Endpoint(
+        "generate_account_backup_codes_v0",
+        "generate_account_backup_codes/v0",
+        "POST",
+        "GenerateAccountBackupCodesV0Response",
+        headers=("access_token",),
+    ),
+    Endpoint(
+        "reset_password_and_login_using_backup_code_v0",
+        "reset_password_and_login_using_backup_code/v0",
+        "POST",
+        "ResetPasswordAndLoginUsingBackupCodeV0Response",
+        json=(
+            "backup_code",
+            "username",
+            "new_password",
+            "app_id",
+            "logout_other_sessions",
+        ),
+    ),
+    Endpoint(
+        "send_reset_password_email_v0",
+        "send_reset_password_email/v0",
+        "POST",
+        "SendResetPasswordEmailV0Response",
+        json=("username", "redirect_url"),
+    ),
+    Endpoint(
+        "validate_email_verification_code_v0",
+        "validate_email_verification_code/v0",
+        "POST",
+        "ValidateEmailVerificationCodeV0Response",
+        headers=("access_token",),
+        json=("verification_code",),
+    ),
+    Endpoint(
+        "send_verification_email_v0",
+        "send_verification_email/v0",
+        "POST",
+        "SendVerificationEmailV0Response",
+        headers=("access_token",),
+        json=("redirect_url",),
+    ),
+    Endpoint(
+        "update_profile_details_v0",
+        "update_profile_details/v0",
+        "PATCH",
+        "UpdateProfileDetailsV0Response",
+        headers=("access_token",),
+        params=(
+            "first_name",
+            "last_name",
+            "email",
+            "phone_number_country_code",
+            "phone_number",
+        ),
+    ),
+    Endpoint(
+        "reset_password_and_login_using_reset_email_code_v0",
+        "reset_password_and_login_using_reset_email_code/v0",
+        "POST",
+        "ResetPasswordAndLoginUsingResetEmailCodeV0Response",
+        json=(
+            "reset_email_code",
+            "username",
+            "new_password",
+            "app_id",
+            "logout_other_sessions",
+        ),
+    ),
+    Endpoint(
+        "register_login_google_v0",
+        "register_login_google/v0",
+        "POST",
+        "RegisterLoginGoogleV0Response",
+        json=("google_id", "app_id", "assign_app_id_if_missing"),
+    ),
+    Endpoint(
+        "get_user_recovery_methods_v0",
+        "get_user_recovery_methods/v0",
+        "GET",
+        "GetUserRecoveryMethodsV0Response",
+        params=("username",),
+        idempotent=True,
+    ),
+    Endpoint(
+        "add_self_auth_provider_v0",
+        "add_self_auth_provider/v0",
+        "POST",
+        "AddSelfAuthProviderV0Response",
+        headers=("access_token",),
+        json=("password",),
+    ),
+    Endpoint(
+        "add_google_auth_provider_v0",
+        "add_google_auth_provider/v0",
+        "POST",
+        "AddGoogleAuthProviderV0Response",
+        headers=("access_token",),
+        json=("google_id_token",),
+    ),
+    Endpoint(
+        "unlink_auth_provider_v0",
+        "unlink_auth_provider/v0",
+        "POST",
+        "UnlinkAuthProviderV0Response",
+        headers=("access_token",),
+        json=("auth_provider",),
+    ),
+]
+
+# helper method name -> endpoint.
+ENDPOINTS: Dict[str, Endpoint] = {endpoint.name: endpoint for endpoint in _ENDPOINTS}
+# path -> endpoint, for _make_request which only sees the path.
+ENDPOINTS_BY_PATH: Dict[str, Endpoint] = {
+    endpoint.path: endpoint for endpoint in _ENDPOINTS
+}
@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class TokenType(Enum):
+    access_token = "access_token"
+    refresh_token = "refresh_token"
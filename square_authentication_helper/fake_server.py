@@ -0,0 +1,856 @@
+"""
+in-process fake of the square authentication server, standard library only.
+
+every endpoint in ENDPOINTS is served from in-memory state (users, sessions, tokens, app
+ids, recovery methods, backup codes, email codes), so the helpers can be exercised end to
+end (pooling, retries, caching, coalescing) without a database or network. latency and
+errors can be injected to measure the client under a slow or flaky server.
+
+tokens are hs256 jwts signed with secret, so LocalTokenVerifier(secret) can verify them.
+codes that the real server emails are kept in state.reset_email_codes /
+state.email_verification_codes (user_id -> code).
+
+usage: python -m square_authentication_helper.fake_server [--port 10011]
+    [--latency SECONDS] [--latency-jitter SECONDS] [--error-rate RATE]
+"""
+
+import argparse
+import base64
+import email.parser
+import email.policy
+import hashlib
+import hmac
+import json
+import random
+import secrets
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from square_authentication_helper.endpoints import ENDPOINTS_BY_PATH
+
+_RECOVERY_METHODS = ("EMAIL", "BACKUP_CODE")
+_AUTH_PROVIDERS = ("SELF", "GOOGLE")
+_BACKUP_CODE_COUNT = 10
+# lifetime of emailed codes and the wait before another email can be sent.
+_CODE_TTL = 600.0
+_EMAIL_COOLDOWN = 60.0
+
+
+class FakeServerError(Exception):
+    """
+    rejected call, answered with status_code and message like the real server.
+    """
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+def _b64url_encode(value: bytes) -> str:
+    return base64.urlsafe_b64encode(value).rstrip(b"=").decode()
+
+
+def _b64url_decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def _format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+def _to_int(value: Any, name: str) -> Optional[int]:
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise FakeServerError(400, f"{name} must be an integer.")
+
+
+class FakeAuthenticationState:
+    """
+    users, sessions and codes behind FakeAuthenticationServer, every *_v0 method takes the
+    arguments of the helper method of the same name and returns the response data.
+    """
+
+    def __init__(
+        self,
+        secret: str = "fake-secret",
+        access_token_ttl: float = 1800.0,
+        refresh_token_ttl: float = 86400.0,
+    ):
+        self.secret = secret.encode()
+        self.access_token_ttl = access_token_ttl
+        self.refresh_token_ttl = refresh_token_ttl
+        self.lock = threading.RLock()
+        # user_id -> user dict.
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.user_ids_by_username: Dict[str, str] = {}
+        # session_id -> {"user_id", "app_id", "expires_at"}, one per refresh token.
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        self.reset_email_codes: Dict[str, str] = {}
+        self.email_verification_codes: Dict[str, str] = {}
+        self._last_profile_id = 0
+
+    # tokens.
+
+    def encode_token(self, payload: Dict[str, Any]) -> str:
+        header = _b64url_encode(json.dumps({"alg": "HS256", "typ": "JWT"}).encode())
+        body = _b64url_encode(json.dumps(payload).encode())
+        signature = hmac.new(
+            self.secret, f"{header}.{body}".encode(), hashlib.sha256
+        ).digest()
+        return f"{header}.{body}.{_b64url_encode(signature)}"
+
+    def decode_token(self, token: Optional[str], token_type: str) -> Dict[str, Any]:
+        """
+        payload of a token issued by this server, like the real server access tokens stay
+        valid until they expire while refresh tokens end with their session.
+        """
+        try:
+            header, body, signature = (token or "").split(".")
+            expected = hmac.new(
+                self.secret, f"{header}.{body}".encode(), hashlib.sha256
+            ).digest()
+            if not hmac.compare_digest(expected, _b64url_decode(signature)):
+                raise ValueError
+            payload = json.loads(_b64url_decode(body))
+        except ValueError:
+            raise FakeServerError(401, "invalid token.")
+        if payload.get("type") != token_type:
+            raise FakeServerError(401, f"token is not a {token_type}.")
+        if payload["exp"] < time.time():
+            raise FakeServerError(401, "token has expired.")
+        if token_type == "refresh_token" and payload["session_id"] not in self.sessions:
+            raise FakeServerError(401, "session has ended.")
+        return payload
+
+    def _get_user(self, access_token: Optional[str]) -> Dict[str, Any]:
+        user_id = self.decode_token(access_token, "access_token")["user_id"]
+        if user_id not in self.users:
+            raise FakeServerError(404, "user not found.")
+        return self.users[user_id]
+
+    def _get_user_by_username(self, username: Optional[str]) -> Dict[str, Any]:
+        user_id = self.user_ids_by_username.get(username)
+        if user_id is None:
+            raise FakeServerError(404, f"user {username} not found.")
+        return self.users[user_id]
+
+    def _login(self, user: Dict[str, Any], app_id: int) -> Dict[str, Any]:
+        """
+        open a session for app_id, returns the token fields of the login responses.
+        """
+        now = time.time()
+        session_id = uuid.uuid4().hex
+        expires_at = now + self.refresh_token_ttl
+        self.sessions[session_id] = {
+            "user_id": user["user_id"],
+            "app_id": app_id,
+            "expires_at": expires_at,
+        }
+        claims = {
+            "user_id": user["user_id"],
+            "app_id": app_id,
+            "session_id": session_id,
+        }
+        return {
+            "user_id": user["user_id"],
+            "access_token": self.encode_token(
+                {**claims, "type": "access_token", "exp": now + self.access_token_ttl}
+            ),
+            "refresh_token": self.encode_token(
+                {**claims, "type": "refresh_token", "exp": expires_at}
+            ),
+            "refresh_token_expiry_time": _format_time(expires_at),
+        }
+
+    def _logout(self, user_id: str, app_ids=None, keep_session_id=None):
+        for session_id, session in list(self.sessions.items()):
+            if (
+                session["user_id"] == user_id
+                and session_id != keep_session_id
+                and (app_ids is None or session["app_id"] in app_ids)
+            ):
+                del self.sessions[session_id]
+
+    def _login_to_app(
+        self, user: Dict[str, Any], app_id: Any, assign_app_id_if_missing: bool
+    ) -> Dict[str, Any]:
+        app_id = _to_int(app_id, "app_id")
+        if app_id is None:
+            raise FakeServerError(400, "app_id is required.")
+        if app_id not in user["app_ids"]:
+            if not assign_app_id_if_missing:
+                raise FakeServerError(400, f"user is not registered for app {app_id}.")
+            user["app_ids"].append(app_id)
+        return self._login(user, app_id)
+
+    def _create_user(self, username: str) -> Dict[str, Any]:
+        if not username:
+            raise FakeServerError(400, "username is required.")
+        if username in self.user_ids_by_username:
+            raise FakeServerError(409, f"username {username} already exists.")
+        self._last_profile_id += 1
+        user = {
+            "user_id": str(uuid.uuid4()),
+            "username": username,
+            "password": None,
+            "google_id": None,
+            "app_ids": [],
+            "auth_providers": [],
+            "recovery_methods": {method: False for method in _RECOVERY_METHODS},
+            "backup_codes": [],
+            "backup_codes_total": 0,
+            "backup_codes_generated_at": None,
+            "email_sent_at": None,
+            "reset_email_sent_at": None,
+            "profile": {
+                "user_profile_id": self._last_profile_id,
+                "user_profile_photo_storage_token": None,
+                "user_profile_email": None,
+                "user_profile_phone_number_country_code": None,
+                "user_profile_phone_number": None,
+                "user_profile_first_name": None,
+                "user_profile_last_name": None,
+                "user_profile_email_verified": None,
+            },
+        }
+        self.users[user["user_id"]] = user
+        self.user_ids_by_username[username] = user["user_id"]
+        return user
+
+    def _check_password(self, user: Dict[str, Any], password: Optional[str]):
+        if user["password"] is None or not hmac.compare_digest(
+            user["password"], password or ""
+        ):
+            raise FakeServerError(401, "incorrect password.")
+
+    def _get_google_user_id(self, google_id: Optional[str]) -> Optional[str]:
+        for user in self.users.values():
+            if google_id and user["google_id"] == google_id:
+                return user["user_id"]
+        return None
+
+    def _send_code(self, user: Dict[str, Any], codes: Dict[str, str], sent_at_key):
+        now = time.time()
+        sent_at = user[sent_at_key]
+        if sent_at is not None and now < sent_at + _EMAIL_COOLDOWN:
+            raise FakeServerError(429, "email was sent recently, try again later.")
+        user[sent_at_key] = now
+        codes[user["user_id"]] = f"{secrets.randbelow(10 ** 6):06d}"
+        return {
+            "expires_at": _format_time(now + _CODE_TTL),
+            "cooldown_reset_at": _format_time(now + _EMAIL_COOLDOWN),
+        }
+
+    def _get_code_details(self, user: Dict[str, Any], sent_at_key):
+        if user[sent_at_key] is None:
+            return None
+        return {
+            "expires_at": _format_time(user[sent_at_key] + _CODE_TTL),
+            "cooldown_reset_at": _format_time(user[sent_at_key] + _EMAIL_COOLDOWN),
+        }
+
+    def _check_code(
+        self, user: Dict[str, Any], codes: Dict[str, str], code, sent_at_key
+    ):
+        expected = codes.get(user["user_id"])
+        if (
+            expected is None
+            or time.time() > user[sent_at_key] + _CODE_TTL
+            or not hmac.compare_digest(expected, str(code))
+        ):
+            raise FakeServerError(400, "invalid or expired code.")
+        del codes[user["user_id"]]
+
+    def _reset_password(self, user, new_password, app_id, logout_other_sessions):
+        user["password"] = new_password
+        if logout_other_sessions:
+            self._logout(user["user_id"])
+        return self._login_to_app(user, app_id, False)
+
+    def _get_backup_code_details(self, user: Dict[str, Any]):
+        if user["backup_codes_generated_at"] is None:
+            return None
+        return {
+            "total": user["backup_codes_total"],
+            "available": len(user["backup_codes"]),
+            "generated_at": _format_time(user["backup_codes_generated_at"]),
+        }
+
+    # endpoints.
+
+    def register_username_v0(self, username, password, app_id):
+        user = self._create_user(username)
+        user["password"] = password
+        user["auth_providers"].append("SELF")
+        main = {
+            "user_id": user["user_id"],
+            "username": username,
+            "app_id": None,
+            "access_token": None,
+            "refresh_token": None,
+            "refresh_token_expiry_time": None,
+        }
+        if app_id is not None:
+            main.update(self._login_to_app(user, app_id, True), app_id=app_id)
+        return {"main": main}
+
+    def login_username_v0(self, username, password, app_id, assign_app_id_if_missing):
+        user = self._get_user_by_username(username)
+        self._check_password(user, password)
+        return {"main": self._login_to_app(user, app_id, assign_app_id_if_missing)}
+
+    def generate_access_token_v0(self, refresh_token):
+        payload = self.decode_token(refresh_token, "refresh_token")
+        payload.update(type="access_token", exp=time.time() + self.access_token_ttl)
+        return {"main": {"access_token": self.encode_token(payload)}}
+
+    def logout_v0(self, refresh_token):
+        del self.sessions[
+            self.decode_token(refresh_token, "refresh_token")["session_id"]
+        ]
+        return None
+
+    def logout_apps_v0(self, access_token, app_ids):
+        user = self._get_user(access_token)
+        self._logout(user["user_id"], app_ids=set(app_ids or []))
+        return None
+
+    def logout_all_v0(self, access_token):
+        self._logout(self._get_user(access_token)["user_id"])
+        return None
+
+    def get_user_details_v0(self, access_token):
+        user = self._get_user(access_token)
+        active_sessions = Counter(
+            session["app_id"]
+            for session in self.sessions.values()
+            if session["user_id"] == user["user_id"]
+        )
+        return {
+            "main": {
+                "user_id": user["user_id"],
+                "username": user["username"],
+                "profile": dict(user["profile"]),
+                "apps": [f"app_{app_id}" for app_id in user["app_ids"]],
+                "sessions": [
+                    {"app_name": f"app_{app_id}", "active_sessions": count}
+                    for app_id, count in active_sessions.items()
+                ],
+                "recovery_methods": dict(user["recovery_methods"]),
+                "email_verification_details": self._get_code_details(
+                    user, "email_sent_at"
+                ),
+                "backup_code_details": self._get_backup_code_details(user),
+                "auth_providers": list(user["auth_providers"]),
+            }
+        }
+
+    def update_user_app_ids_v0(self, access_token, app_ids_to_add, app_ids_to_remove):
+        user = self._get_user(access_token)
+        for app_id in app_ids_to_add or []:
+            if app_id not in user["app_ids"]:
+                user["app_ids"].append(app_id)
+        app_ids_to_remove = set(app_ids_to_remove or [])
+        user["app_ids"] = [a for a in user["app_ids"] if a not in app_ids_to_remove]
+        self._logout(user["user_id"], app_ids=app_ids_to_remove)
+        return {"main": list(user["app_ids"])}
+
+    def update_username_v0(self, access_token, new_username):
+        user = self._get_user(access_token)
+        if not new_username:
+            raise FakeServerError(400, "new_username is required.")
+        if new_username in self.user_ids_by_username:
+            raise FakeServerError(409, f"username {new_username} already exists.")
+        del self.user_ids_by_username[user["username"]]
+        self.user_ids_by_username[new_username] = user["user_id"]
+        user["username"] = new_username
+        return {"main": {"user_id": user["user_id"], "username": new_username}}
+
+    def delete_user_v0(self, access_token, password):
+        user = self._get_user(access_token)
+        self._check_password(user, password)
+        self._logout(user["user_id"])
+        del self.users[user["user_id"]]
+        del self.user_ids_by_username[user["username"]]
+        return None
+
+    def update_password_v0(
+        self,
+        access_token,
+        old_password,
+        new_password,
+        logout_other_sessions,
+        preserve_session_refresh_token,
+    ):
+        user = self._get_user(access_token)
+        self._check_password(user, old_password)
+        user["password"] = new_password
+        if logout_other_sessions:
+            keep_session_id = None
+            if preserve_session_refresh_token:
+                payload = self.decode_token(
+                    preserve_session_refresh_token, "refresh_token"
+                )
+                if payload["user_id"] != user["user_id"]:
+                    raise FakeServerError(400, "refresh token belongs to another user.")
+                keep_session_id = payload["session_id"]
+            self._logout(user["user_id"], keep_session_id=keep_session_id)
+        return None
+
+    def validate_and_get_payload_from_token_v0(self, token, token_type, app_id):
+        if token_type not in ("access_token", "refresh_token"):
+            raise FakeServerError(400, f"unknown token_type {token_type}.")
+        payload = self.decode_token(token, token_type)
+        if payload["app_id"] != _to_int(app_id, "app_id"):
+            raise FakeServerError(401, "token was issued for another app.")
+        return {"main": payload}
+
+    def update_profile_photo_v0(self, access_token, profile_photo):
+        user = self._get_user(access_token)
+        token = f"{uuid.uuid4().hex}.bin" if profile_photo else None
+        user["profile"]["user_profile_photo_storage_token"] = token
+        return {"main": token}
+
+    def update_user_recovery_methods_v0(
+        self, access_token, recovery_methods_to_add, recovery_methods_to_remove
+    ):
+        user = self._get_user(access_token)
+        to_add = recovery_methods_to_add or []
+        to_remove = recovery_methods_to_remove or []
+        for method in [*to_add, *to_remove]:
+            if method not in _RECOVERY_METHODS:
+                raise FakeServerError(400, f"unknown recovery method {method}.")
+        for method in to_add:
+            user["recovery_methods"][method] = True
+        for method in to_remove:
+            user["recovery_methods"][method] = False
+            if method == "BACKUP_CODE":
+                user["backup_codes"] = []
+        return {
+            "main": [
+                method
+                for method, enabled in user["recovery_methods"].items()
+                if enabled
+            ]
+        }
+
+    def generate_account_backup_codes_v0(self, access_token):
+        user = self._get_user(access_token)
+        if not user["recovery_methods"]["BACKUP_CODE"]:
+            raise FakeServerError(400, "backup code recovery is not enabled.")
+        user["backup_codes"] = [secrets.token_hex(4) for _ in range(_BACKUP_CODE_COUNT)]
+        user["backup_codes_total"] = _BACKUP_CODE_COUNT
+        user["backup_codes_generated_at"] = time.time()
+        return {
+            "main": {
+                "user_id": user["user_id"],
+                "backup_codes": list(user["backup_codes"]),
+            }
+        }
+
+    def reset_password_and_login_using_backup_code_v0(
+        self, backup_code, username, new_password, app_id, logout_other_sessions
+    ):
+        user = self._get_user_by_username(username)
+        if (
+            not user["recovery_methods"]["BACKUP_CODE"]
+            or backup_code not in user["backup_codes"]
+        ):
+            raise FakeServerError(400, "invalid backup code.")
+        user["backup_codes"].remove(backup_code)
+        return {
+            "main": self._reset_password(
+                user, new_password, app_id, logout_other_sessions
+            )
+        }
+
+    def send_reset_password_email_v0(self, username, redirect_url):
+        user = self._get_user_by_username(username)
+        if (
+            not user["recovery_methods"]["EMAIL"]
+            or not user["profile"]["user_profile_email_verified"]
+        ):
+            raise FakeServerError(400, "email recovery is not enabled.")
+        return self._send_code(user, self.reset_email_codes, "reset_email_sent_at")
+
+    def validate_email_verification_code_v0(self, access_token, verification_code):
+        user = self._get_user(access_token)
+        self._check_code(
+            user, self.email_verification_codes, verification_code, "email_sent_at"
+        )
+        verified_at = _format_time(time.time())
+        user["profile"]["user_profile_email_verified"] = verified_at
+        return {"user_profile_email_verified": verified_at}
+
+    def send_verification_email_v0(self, access_token, redirect_url):
+        user = self._get_user(access_token)
+        if not user["profile"]["user_profile_email"]:
+            raise FakeServerError(400, "user has no email.")
+        if user["profile"]["user_profile_email_verified"]:
+            raise FakeServerError(400, "email is already verified.")
+        return self._send_code(user, self.email_verification_codes, "email_sent_at")
+
+    def update_profile_details_v0(
+        self,
+        access_token,
+        first_name,
+        last_name,
+        email,
+        phone_number_country_code,
+        phone_number,
+    ):
+        user = self._get_user(access_token)
+        profile = user["profile"]
+        updates = {
+            "user_profile_first_name": first_name,
+            "user_profile_last_name": last_name,
+            "user_profile_email": email,
+            "user_profile_phone_number_country_code": phone_number_country_code,
+            "user_profile_phone_number": phone_number,
+        }
+        if email is not None and email != profile["user_profile_email"]:
+            profile["user_profile_email_verified"] = None
+        profile.update({k: v for k, v in updates.items() if v is not None})
+        return {"main": {**profile, "user_id": user["user_id"]}}
+
+    def reset_password_and_login_using_reset_email_code_v0(
+        self, reset_email_code, username, new_password, app_id, logout_other_sessions
+    ):
+        user = self._get_user_by_username(username)
+        self._check_code(
+            user, self.reset_email_codes, reset_email_code, "reset_email_sent_at"
+        )
+        return {
+            "main": self._reset_password(
+                user, new_password, app_id, logout_other_sessions
+            )
+        }
+
+    def register_login_google_v0(self, google_id, app_id, assign_app_id_if_missing):
+        # the google id token is taken as the google account id, nothing is verified.
+        if not google_id:
+            raise FakeServerError(400, "google_id is required.")
+        user_id = self._get_google_user_id(google_id)
+        was_new_user = user_id is None
+        if was_new_user:
+            digest = hashlib.sha256(google_id.encode()).hexdigest()[:12]
+            user = self._create_user(f"google_{digest}")
+            user["google_id"] = google_id
+            user["auth_providers"].append("GOOGLE")
+        else:
+            user = self.users[user_id]
+        main = {
+            "user_id": user["user_id"],
+            "username": user["username"],
+            "app_id": None,
+            "access_token": None,
+            "refresh_token": None,
+            "refresh_token_expiry_time": None,
+            "was_new_user": was_new_user,
+        }
+        if app_id is not None:
+            tokens = self._login_to_app(
+                user, app_id, was_new_user or assign_app_id_if_missing
+            )
+            main.update(tokens, app_id=app_id)
+        return {"main": main}
+
+    def get_user_recovery_methods_v0(self, username):
+        user = self._get_user_by_username(username)
+        return {
+            "main": dict(user["recovery_methods"]),
+            "email_recovery_details": self._get_code_details(
+                user, "reset_email_sent_at"
+            ),
+            "backup_code_details": self._get_backup_code_details(user),
+        }
+
+    def add_self_auth_provider_v0(self, access_token, password):
+        user = self._get_user(access_token)
+        if "SELF" in user["auth_providers"]:
+            raise FakeServerError(400, "self auth provider is already linked.")
+        if not password:
+            raise FakeServerError(400, "password is required.")
+        user["password"] = password
+        user["auth_providers"].append("SELF")
+        return {"main": {"auth_providers": list(user["auth_providers"])}}
+
+    def add_google_auth_provider_v0(self, access_token, google_id_token):
+        user = self._get_user(access_token)
+        if "GOOGLE" in user["auth_providers"]:
+            raise FakeServerError(400, "google auth provider is already linked.")
+        if self._get_google_user_id(google_id_token) is not None:
+            raise FakeServerError(409, "google account is linked to another user.")
+        user["google_id"] = google_id_token
+        user["auth_providers"].append("GOOGLE")
+        return {"main": {"auth_providers": list(user["auth_providers"])}}
+
+    def unlink_auth_provider_v0(self, access_token, auth_provider):
+        user = self._get_user(access_token)
+        if auth_provider not in _AUTH_PROVIDERS:
+            raise FakeServerError(400, f"unknown auth provider {auth_provider}.")
+        if auth_provider not in user["auth_providers"]:
+            raise FakeServerError(400, f"{auth_provider} is not linked.")
+        if len(user["auth_providers"]) == 1:
+            raise FakeServerError(400, "cannot unlink the only auth provider.")
+        user["auth_providers"].remove(auth_provider)
+        if auth_provider == "SELF":
+            user["password"] = None
+        else:
+            user["google_id"] = None
+        return {"main": {"auth_providers": list(user["auth_providers"])}}
+
+
+def _get_uploaded_file(content_type: str, body: bytes, name: str) -> Optional[bytes]:
+    if not body or not content_type.startswith("multipart/form-data"):
+        return None
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + body
+    )
+    for part in message.iter_parts():
+        if part.get_param("name", header="content-disposition") == name:
+            return part.get_payload(decode=True)
+    return None
+
+
+class _FakeAuthenticationHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def do_PATCH(self):
+        self._handle()
+
+    def do_DELETE(self):
+        self._handle()
+
+    def _handle(self):
+        url = urlsplit(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        status_code, response = self.server.fake_server.handle(
+            self.command,
+            url.path.lstrip("/"),
+            self.headers,
+            parse_qs(url.query),
+            body,
+        )
+        payload = json.dumps(response).encode()
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeAuthenticationServer:
+    """
+    serves FakeAuthenticationState over http from a daemon thread, use as a context
+    manager or call start() / stop().
+
+    every request first sleeps latency plus a uniform random 0..latency_jitter seconds,
+    then fails with error_status at error_rate (before touching any state, so retries
+    are safe) and fail_next forces the next failures deterministically.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        secret: str = "fake-secret",
+        access_token_ttl: float = 1800.0,
+        refresh_token_ttl: float = 86400.0,
+        seed: Optional[int] = None,
+    ):
+        """
+        :param port: 0 picks a free port, read it back from port / url after start().
+        :param error_rate: fraction (0..1) of requests answered with error_status.
+        :param secret: hs256 key of the issued tokens.
+        :param seed: seed of the latency jitter and error injection.
+        """
+        self.host = host
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.state = FakeAuthenticationState(
+            secret=secret,
+            access_token_ttl=access_token_ttl,
+            refresh_token_ttl=refresh_token_ttl,
+        )
+        # path -> requests received, injected failures included.
+        self.requests: Counter = Counter()
+        self.injected_errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._pending_failures: List[int] = []
+        self._server = ThreadingHTTPServer((host, port), _FakeAuthenticationHandler)
+        self._server.daemon_threads = True
+        self._server.fake_server = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "FakeAuthenticationServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def serve_forever(self):
+        """
+        serve on the calling thread until interrupted, e.g. from the command line.
+        """
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def fail_next(self, count: int = 1, status_code: Optional[int] = None):
+        """
+        answer the next count requests with status_code (default error_status).
+        """
+        with self._lock:
+            self._pending_failures.extend([status_code or self.error_status] * count)
+
+    def _get_injected_error(self) -> Optional[int]:
+        with self._lock:
+            if self._pending_failures:
+                return self._pending_failures.pop(0)
+            if self.error_rate and self._random.random() < self.error_rate:
+                return self.error_status
+            return None
+
+    def _get_delay(self) -> float:
+        if not self.latency_jitter:
+            return self.latency
+        with self._lock:
+            return self.latency + self._random.uniform(0, self.latency_jitter)
+
+    def handle(
+        self,
+        method: str,
+        path: str,
+        headers,
+        query: Dict[str, List[str]],
+        body: bytes,
+    ) -> Tuple[int, Dict[str, Any]]:
+        """
+        status code and json body for one request.
+        """
+        with self._lock:
+            self.requests[path] += 1
+        delay = self._get_delay()
+        if delay > 0:
+            time.sleep(delay)
+        status_code = self._get_injected_error()
+        if status_code is not None:
+            with self._lock:
+                self.injected_errors += 1
+            return status_code, {
+                "data": None,
+                "message": "injected error.",
+                "log": None,
+            }
+        endpoint = ENDPOINTS_BY_PATH.get(path)
+        try:
+            if endpoint is None:
+                raise FakeServerError(404, f"unknown endpoint {path}.")
+            if endpoint.method != method:
+                raise FakeServerError(405, f"{path} expects {endpoint.method}.")
+            try:
+                data = json.loads(body) if endpoint.json and body else {}
+            except ValueError:
+                raise FakeServerError(422, "invalid json body.")
+            # fastapi style headers, the helpers send access_token as access-token.
+            arguments = {
+                name: headers.get(name.replace("_", "-")) for name in endpoint.headers
+            }
+            arguments.update({name: data.get(name) for name in endpoint.json})
+            arguments.update(
+                {name: query.get(name, [None])[0] for name in endpoint.params}
+            )
+            content_type = headers.get("Content-Type", "")
+            arguments.update(
+                {
+                    name: _get_uploaded_file(content_type, body, name)
+                    for name in endpoint.files
+                }
+            )
+            with self.state.lock:
+                response = getattr(self.state, endpoint.name)(**arguments)
+        except FakeServerError as e:
+            return e.status_code, {"data": None, "message": e.message, "log": None}
+        return 200, {"data": response, "message": None, "log": None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=10011)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--secret", default="fake-secret")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    server = FakeAuthenticationServer(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        secret=args.secret,
+        seed=args.seed,
+    )
+    print(f"fake authentication server on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+from typing import Any, Dict, Optional
+
+# request headers carrying credentials, hooks see them as REDACTED.
+CREDENTIAL_HEADERS = frozenset(
+    {"access_token", "refresh_token", "token", "authorization", "cookie"}
+)
+REDACTED = "[redacted]"
+
+
+def is_credential_header(name: str) -> bool:
+    return name.lower().replace("-", "_") in CREDENTIAL_HEADERS
+
+
+class RequestInfo:
+    """
+    one attempt of an upstream call, the same object is passed to every hook from
+    before_request to after_response / on_error.
+
+    timings (seconds, each only present when measured):
+        connect: opening a new connection, dns lookup included (httpx transports only).
+        tls: tls handshake of a new connection (httpx transports only).
+        first_byte: from sending the request until the response headers arrived.
+        parse: decoding the body (json for dict results), pydantic validation of
+            response_as_pydantic results happens after after_response.
+        total: the whole attempt, parse included.
+    """
+
+    __slots__ = (
+        "endpoint",
+        "method",
+        "url",
+        "attempt",
+        "headers",
+        "status_code",
+        "request_bytes",
+        "response_bytes",
+        "timings",
+        "context",
+    )
+
+    def __init__(
+        self,
+        endpoint: str,
+        method: str,
+        url: str,
+        attempt: int = 1,
+        headers: Optional[Dict[str, Any]] = None,
+    ):
+        self.endpoint = endpoint
+        self.method = method
+        self.url = url
+        self.attempt = attempt
+        # sent with the request with credentials redacted, headers before_request adds
+        # (e.g. a traceparent) are sent too, changes to the existing ones are ignored.
+        self.headers: Dict[str, Any] = {
+            name: REDACTED if is_credential_header(name) else value
+            for name, value in (headers or {}).items()
+        }
+        self.status_code: Optional[int] = None
+        self.request_bytes: Optional[int] = None
+        self.response_bytes: Optional[int] = None
+        self.timings: Dict[str, float] = {}
+        # free for hooks to keep their own state in, e.g. an open span.
+        self.context: Dict[str, Any] = {}
+
+    def __repr__(self) -> str:
+        return (
+            f"RequestInfo({self.method} {self.endpoint}, attempt={self.attempt}, "
+            f"status_code={self.status_code}, timings={self.timings})"
+        )
+
+
+class RequestHooks:
+    """
+    callbacks around every attempt of an upstream call, override the methods you need
+    (e.g. to open and close a tracing span), the defaults do nothing.
+
+    hooks run on the calling thread / event loop in the request path, so they should be
+    quick, and exceptions raised from them propagate to the caller.
+    """
+
+    def before_request(self, info: RequestInfo):
+        pass
+
+    def after_response(self, info: RequestInfo):
+        pass
+
+    def on_error(self, info: RequestInfo, error: BaseException):
+        pass
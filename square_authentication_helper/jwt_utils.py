@@ -0,0 +1,182 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+
+_HMAC_ALGORITHMS = {
+    "HS256": hashlib.sha256,
+    "HS384": hashlib.sha384,
+    "HS512": hashlib.sha512,
+}
+# prefixes of pem encoded keys / certificates and openssh public keys.
+_ASYMMETRIC_KEY_PREFIXES = (
+    b"-----BEGIN ",
+    b"ssh-rsa",
+    b"ssh-dss",
+    b"ssh-ed25519",
+    b"ecdsa-sha2-",
+)
+
+
+class InvalidTokenError(ValueError):
+    """
+    raised when a token is definitively invalid (bad signature, expired, wrong app).
+    """
+
+
+def _b64url_decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def _is_asymmetric_key(key: str | bytes) -> bool:
+    if isinstance(key, str):
+        key = key.encode()
+    return key.lstrip().startswith(_ASYMMETRIC_KEY_PREFIXES)
+
+
+def decode_unverified(token: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    split a jwt into its header and payload without checking the signature.
+
+    never trust the result for authorization, use it only for hints like exp.
+    """
+    try:
+        header_segment, payload_segment, _ = token.split(".")
+        header = json.loads(_b64url_decode(header_segment))
+        payload = json.loads(_b64url_decode(payload_segment))
+    except Exception as e:
+        raise InvalidTokenError("malformed token.") from e
+    if not isinstance(header, dict) or not isinstance(payload, dict):
+        raise InvalidTokenError("malformed token.")
+    return header, payload
+
+
+class LocalTokenVerifier:
+    """
+    verifies access tokens in process instead of calling the authentication server.
+
+    hmac algorithms use the standard library, asymmetric ones (RS*, ES*, PS*, EdDSA)
+    need the optional pyjwt[crypto] dependency. verify returns none whenever the
+    outcome is ambiguous so the caller can fall back to the server.
+
+    a verifier accepts either hmac or asymmetric algorithms, never both, and refuses
+    public keys as hmac secrets, otherwise a token signed with HS256 and the (public)
+    key as secret would verify (algorithm confusion).
+    """
+
+    def __init__(
+        self,
+        keys: str | bytes | Mapping[str, str | bytes],
+        algorithms: Sequence[str] = ("HS256",),
+        app_id_claim: str = "app_id",
+        leeway: float = 0.0,
+    ):
+        """
+        :param keys: shared secret / public key, or a mapping of kid to key for rotation.
+        :param algorithms: accepted signing algorithms, anything else falls back to the server.
+        :param app_id_claim: claim holding the app id the token was issued for.
+        :param leeway: seconds of clock skew tolerated on exp and nbf.
+        :raises ValueError: for a mix of hmac and asymmetric algorithms, or a public key
+            given for hmac.
+        """
+        if isinstance(keys, Mapping):
+            self._dict_keys = dict(keys)
+            self._default_key = None
+        else:
+            self._dict_keys = {}
+            self._default_key = keys
+        self.algorithms = tuple(algorithms)
+        hmac_algorithms = [a for a in self.algorithms if a in _HMAC_ALGORITHMS]
+        if hmac_algorithms and len(hmac_algorithms) != len(self.algorithms):
+            raise ValueError(
+                "hmac and asymmetric algorithms can not be mixed in one verifier."
+            )
+        if hmac_algorithms and any(
+            _is_asymmetric_key(key)
+            for key in (self._default_key, *self._dict_keys.values())
+            if key is not None
+        ):
+            raise ValueError(
+                "an asymmetric key or certificate can not be used as an hmac secret."
+            )
+        self.app_id_claim = app_id_claim
+        self.leeway = leeway
+        self.verified = 0
+        self.fallbacks = 0
+
+    def _get_key(self, header: Dict[str, Any]) -> Optional[str | bytes]:
+        kid = header.get("kid")
+        if kid is not None and kid in self._dict_keys:
+            return self._dict_keys[kid]
+        return self._default_key
+
+    @staticmethod
+    def _verify_signature(
+        algorithm: str, key: str | bytes, signing_input: bytes, signature: bytes
+    ) -> Optional[bool]:
+        if algorithm in _HMAC_ALGORITHMS:
+            if isinstance(key, str):
+                key = key.encode()
+            expected = hmac.new(key, signing_input, _HMAC_ALGORITHMS[algorithm])
+            return hmac.compare_digest(expected.digest(), signature)
+        try:
+            from jwt.algorithms import get_default_algorithms
+        except ImportError:
+            return None
+        algorithm_object = get_default_algorithms().get(algorithm)
+        if algorithm_object is None:
+            return None
+        try:
+            prepared_key = algorithm_object.prepare_key(key)
+        except Exception:
+            return None
+        return bool(algorithm_object.verify(signing_input, prepared_key, signature))
+
+    def verify(self, token: str, app_id: int) -> Optional[Dict[str, Any]]:
+        """
+        :return: the token payload if verified locally, none if the server must decide.
+        :raises InvalidTokenError: if the token is definitively invalid.
+        """
+        try:
+            header, payload = decode_unverified(token)
+        except InvalidTokenError:
+            self.fallbacks += 1
+            return None
+        algorithm = header.get("alg")
+        key = self._get_key(header)
+        if algorithm not in self.algorithms or key is None:
+            self.fallbacks += 1
+            return None
+        header_segment, payload_segment, signature_segment = token.split(".")
+        try:
+            signature = _b64url_decode(signature_segment)
+        except Exception as e:
+            raise InvalidTokenError("malformed token signature.") from e
+        is_valid = self._verify_signature(
+            algorithm,
+            key,
+            f"{header_segment}.{payload_segment}".encode(),
+            signature,
+        )
+        if is_valid is None:
+            self.fallbacks += 1
+            return None
+        if not is_valid:
+            raise InvalidTokenError("token signature verification failed.")
+        expiry = payload.get("exp")
+        token_app_id = payload.get(self.app_id_claim)
+        if not isinstance(expiry, (int, float)) or token_app_id is None:
+            self.fallbacks += 1
+            return None
+        now = time.time()
+        if expiry + self.leeway <= now:
+            raise InvalidTokenError("token has expired.")
+        not_before = payload.get("nbf")
+        if isinstance(not_before, (int, float)) and not_before - self.leeway > now:
+            raise InvalidTokenError("token is not yet valid.")
+        if str(token_app_id) != str(app_id):
+            raise InvalidTokenError("token was not issued for this app_id.")
+        self.verified += 1
+        return payload
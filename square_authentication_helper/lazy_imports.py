@@ -0,0 +1,81 @@
+"""
+names the helpers only import on first use, so `import square_authentication_helper` does
+not load pydantic, square_commons or square_database_structure (and its sqlalchemy
+tables) until a call needs them, see benchmarks/bench_import_time.py.
+"""
+
+import importlib
+import sys
+from typing import Any, Dict, Tuple, Type
+
+from square_authentication_helper.endpoints import ENDPOINTS
+
+_DEFERRED_MODULES: Dict[str, str] = {
+    "RecoveryMethodEnum": "square_database_structure.square.authentication.enums",
+    "StandardResponse": "square_commons.api_utils",
+}
+_PYDANTIC_MODELS = "square_authentication_helper.pydantic_models"
+
+# public names of the helper modules resolved by import_deferred (listed in their
+# __all__, so a star import still gets them).
+DEFERRED_NAMES: Tuple[str, ...] = (
+    *_DEFERRED_MODULES,
+    *sorted({endpoint.response_model for endpoint in ENDPOINTS.values()}),
+)
+
+
+def import_deferred(module_name: str, name: str) -> Any:
+    """
+    module level __getattr__ of module_name: resolve a deferred name on first access.
+
+    the response models of pydantic_models and the names in _DEFERRED_MODULES used to be
+    importable from the helper modules, they still are.
+    """
+    if not name.startswith("_"):
+        module = importlib.import_module(_DEFERRED_MODULES.get(name, _PYDANTIC_MODELS))
+        if hasattr(module, name):
+            return getattr(module, name)
+    raise AttributeError(f"module {module_name!r} has no attribute {name!r}")
+
+
+def get_response_model(name: str) -> Type:
+    """
+    StandardResponse[model] for the name of a response model in pydantic_models, names of
+    StandardResponse aliases (e.g. LogoutV0Response) are returned as they are.
+    """
+    pydantic_models = importlib.import_module(_PYDANTIC_MODELS)
+    model = getattr(pydantic_models, name)
+    if issubclass(model, pydantic_models.StandardResponse):
+        return model
+    return pydantic_models.get_standard_response_model(model)
+
+
+class DeferredNamespace(dict):
+    """
+    mapping resolving names from a module and its deferred names, to evaluate the
+    postponed annotations of the helpers (typing.get_type_hints localns).
+    """
+
+    def __init__(self, module: Any):
+        super().__init__()
+        self.module = module
+
+    def __missing__(self, name: str) -> Any:
+        try:
+            return getattr(self.module, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+
+def type_hints_namespace(obj: Any) -> DeferredNamespace:
+    """
+    localns for typing.get_type_hints on a helper class or method, the annotations name
+    types (e.g. RecoveryMethodEnum, the response models) the module only imports on
+    first use, which get_type_hints can not find on its own, e.g.
+
+        typing.get_type_hints(
+            SquareAuthenticationHelper.update_user_recovery_methods_v0,
+            localns=type_hints_namespace(SquareAuthenticationHelper),
+        )
+    """
+    return DeferredNamespace(sys.modules[obj.__module__])
@@ -1,51 +1,171 @@
-from typing import List, Optional, Tuple, IO, Any, overload, Literal, Dict
-
-from square_commons.api_utils import make_request, StandardResponse
-from square_database_structure.square.authentication.enums import RecoveryMethodEnum
-
-from square_authentication_helper.pydantic_models import (
-    TokenType,
-    RegisterUsernameV0Response,
-    LoginUsernameV0Response,
-    GenerateAccessTokenV0Response,
-    LogoutV0Response,
-    LogoutAppsV0Response,
-    GetUserDetailsV0Response,
-    LogoutAllV0Response,
-    UpdateUserAppIdsV0Response,
-    UpdateUsernameV0Response,
-    DeleteUserV0Response,
-    UpdatePasswordV0Response,
-    ValidateAndGetPayloadFromTokenV0Response,
-    UpdateProfilePhotoV0Response,
-    UpdateUserRecoveryMethodsV0Response,
-    GenerateAccountBackupCodesV0Response,
-    ResetPasswordAndLoginUsingBackupCodeV0Response,
-    SendResetPasswordEmailV0Response,
-    ValidateEmailVerificationCodeV0Response,
-    SendVerificationEmailV0Response,
-    UpdateProfileDetailsV0Response,
-    ResetPasswordAndLoginUsingResetEmailCodeV0Response,
-    RegisterLoginGoogleV0Response,
-    GetUserRecoveryMethodsV0Response,
-    AddSelfAuthProviderV0Response,
-    AddGoogleAuthProviderV0Response,
-    UnlinkAuthProviderV0Response,
+from __future__ import annotations
+
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    TYPE_CHECKING,
+    List,
+    Optional,
+    Tuple,
+    IO,
+    Any,
+    overload,
+    Literal,
+    Dict,
 )
 
+from square_authentication_helper.balancing import BalancingStrategy
+from square_authentication_helper.base import _BaseSquareAuthenticationHelper
+from square_authentication_helper.bulk import TokenValidationResult
+from square_authentication_helper.cache import TTLCache, UserDetailsCache
+from square_authentication_helper.enums import TokenType
+from square_authentication_helper.endpoints import ENDPOINTS, build_request
+from square_authentication_helper.hooks import RequestHooks
+from square_authentication_helper.jwt_utils import LocalTokenVerifier
+from square_authentication_helper.lazy_imports import DEFERRED_NAMES, import_deferred
+from square_authentication_helper.metrics import MetricsSink
+from square_authentication_helper.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    get_attempt_timeout,
+    get_call_options,
+)
+from square_authentication_helper.transport import (
+    Http2Transport,
+    PooledTransport,
+    read_response,
+)
 
-class SquareAuthenticationHelper:
+# only needed for annotations, resolved on first use by __getattr__ below.
+if TYPE_CHECKING:
+    from square_commons.api_utils import StandardResponse
+    from square_database_structure.square.authentication.enums import (
+        RecoveryMethodEnum,
+    )
+
+    from square_authentication_helper.pydantic_models import (
+        RegisterUsernameV0Response,
+        LoginUsernameV0Response,
+        GenerateAccessTokenV0Response,
+        LogoutV0Response,
+        LogoutAppsV0Response,
+        GetUserDetailsV0Response,
+        LogoutAllV0Response,
+        UpdateUserAppIdsV0Response,
+        UpdateUsernameV0Response,
+        DeleteUserV0Response,
+        UpdatePasswordV0Response,
+        ValidateAndGetPayloadFromTokenV0Response,
+        UpdateProfilePhotoV0Response,
+        UpdateUserRecoveryMethodsV0Response,
+        GenerateAccountBackupCodesV0Response,
+        ResetPasswordAndLoginUsingBackupCodeV0Response,
+        SendResetPasswordEmailV0Response,
+        ValidateEmailVerificationCodeV0Response,
+        SendVerificationEmailV0Response,
+        UpdateProfileDetailsV0Response,
+        ResetPasswordAndLoginUsingResetEmailCodeV0Response,
+        RegisterLoginGoogleV0Response,
+        GetUserRecoveryMethodsV0Response,
+        AddSelfAuthProviderV0Response,
+        AddGoogleAuthProviderV0Response,
+        UnlinkAuthProviderV0Response,
+    )
+
+
+__all__ = [
+    "SquareAuthenticationHelper",
+    "TokenType",
+    "BalancingStrategy",
+    "TTLCache",
+    "UserDetailsCache",
+    "LocalTokenVerifier",
+    "RetryPolicy",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "MetricsSink",
+    "RequestHooks",
+    "TokenValidationResult",
+    *DEFERRED_NAMES,
+]
+
+
+def __getattr__(name):
+    return import_deferred(__name__, name)
+
+
+class SquareAuthenticationHelper(_BaseSquareAuthenticationHelper):
     def __init__(
         self,
         param_int_square_authentication_port: int = 10011,
         param_str_square_authentication_ip: str = "localhost",
         param_str_square_authentication_protocol: str = "http",
+        param_int_pool_connections: int = 10,
+        param_int_pool_maxsize: int = 10,
+        param_float_pool_idle_timeout: Optional[float] = None,
+        param_validation_cache: Optional[TTLCache] = None,
+        param_local_token_verifier: Optional[LocalTokenVerifier] = None,
+        param_bool_coalesce_requests: bool = False,
+        param_user_details_cache: Optional[UserDetailsCache] = None,
+        param_retry_policy: Optional[RetryPolicy] = None,
+        param_circuit_breaker: Optional[CircuitBreaker] = None,
+        param_float_connect_timeout: Optional[float] = None,
+        param_float_read_timeout: Optional[float] = None,
+        param_list_str_square_authentication_endpoints: Optional[List[str]] = None,
+        param_balancing_strategy: BalancingStrategy = BalancingStrategy.power_of_two_choices,
+        param_str_square_authentication_url: Optional[str] = None,
+        param_bool_http2: bool = False,
+        param_metrics: Optional[MetricsSink] = None,
+        param_list_request_hooks: Optional[List[RequestHooks]] = None,
     ):
         try:
-            self.global_str_square_authentication_url_base = (
-                f"{param_str_square_authentication_protocol}://"
-                f"{param_str_square_authentication_ip}:{param_int_square_authentication_port}"
+            super().__init__(
+                param_int_square_authentication_port=param_int_square_authentication_port,
+                param_str_square_authentication_ip=param_str_square_authentication_ip,
+                param_str_square_authentication_protocol=param_str_square_authentication_protocol,
+                param_validation_cache=param_validation_cache,
+                param_local_token_verifier=param_local_token_verifier,
+                param_bool_coalesce_requests=param_bool_coalesce_requests,
+                param_user_details_cache=param_user_details_cache,
+                param_retry_policy=param_retry_policy,
+                param_circuit_breaker=param_circuit_breaker,
+                param_float_connect_timeout=param_float_connect_timeout,
+                param_float_read_timeout=param_float_read_timeout,
+                param_list_str_square_authentication_endpoints=param_list_str_square_authentication_endpoints,
+                param_balancing_strategy=param_balancing_strategy,
+                param_str_square_authentication_url=param_str_square_authentication_url,
+                param_metrics=param_metrics,
+                param_list_request_hooks=param_list_request_hooks,
             )
+            # http/2 multiplexes concurrent calls over one connection per server.
+            if param_bool_http2:
+                self.global_transport = Http2Transport(
+                    pool_maxsize=param_int_pool_maxsize,
+                    idle_timeout=param_float_pool_idle_timeout,
+                )
+            else:
+                self.global_transport = PooledTransport(
+                    pool_connections=param_int_pool_connections,
+                    pool_maxsize=param_int_pool_maxsize,
+                    idle_timeout=param_float_pool_idle_timeout,
+                )
+        except Exception:
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        close the underlying connection pool, the helper can not be used afterward.
+        """
+        try:
+            self.global_transport.close()
         except Exception:
             raise
 
@@ -58,23 +178,260 @@ class SquareAuthenticationHelper:
         params=None,
         headers=None,
         files=None,
+        return_type="json",
     ):
         try:
-            return make_request(
+            request_kwargs = dict(
                 method=method,
-                url=self.global_str_square_authentication_url_base,
                 endpoint=endpoint,
                 json=json,
                 data=data,
                 params=params,
                 headers=headers,
                 files=files,
-                return_type="json",
             )
+            if (
+                self.global_request_coalescer is None
+                and self.global_user_details_cache is None
+            ):
+                return self._send(request_kwargs, return_type)
+            idempotent = self._is_idempotent(method, endpoint)
+            key = self._get_coalescing_key(idempotent, request_kwargs, return_type)
+            if key is not None:
+                return self.global_request_coalescer.run(
+                    key, lambda: self._send(request_kwargs, return_type)
+                )
+            if self.global_user_details_cache is None or idempotent:
+                return self._send(request_kwargs, return_type)
+            # any write may change what get_user_details_v0 returns for this user,
+            # invalidate even on failure since the server may have applied it.
+            response = None
+            try:
+                response = self._send(request_kwargs, return_type)
+                return response
+            finally:
+                self.global_user_details_cache.invalidate_for_request(headers, response)
 
         except Exception:
             raise
 
+    def _send(self, request_kwargs, return_type):
+        """
+        send a request through the retry policy, circuit breaker, balancer, metrics and
+        hooks that are configured.
+        """
+        try:
+            endpoint = request_kwargs["endpoint"]
+            method = request_kwargs["method"]
+            if self._is_direct():
+                # nothing to retry, fail over or observe: one transport call without the
+                # per call closures below.
+                try:
+                    return self.global_transport.request(
+                        **request_kwargs,
+                        url=self.global_str_square_authentication_url_base,
+                        timeout=get_attempt_timeout(
+                            self.global_float_connect_timeout,
+                            self.global_float_read_timeout,
+                        ),
+                        return_type=return_type,
+                    )
+                except Exception as e:
+                    self._raise_if_deadline_exceeded(endpoint, e)
+                    raise
+
+            def send_once(url):
+                attempt_kwargs = dict(
+                    request_kwargs,
+                    url=url,
+                    timeout=get_attempt_timeout(
+                        self.global_float_connect_timeout,
+                        self.global_float_read_timeout,
+                    ),
+                )
+                if self.global_metrics is None and not self.global_list_request_hooks:
+                    return self.global_transport.request(
+                        **attempt_kwargs, return_type=return_type
+                    )
+                return self._send_observed(attempts, return_type, attempt_kwargs)
+
+            # endpoints already tried by this call, retries fail over to the others.
+            tried = set()
+            attempts = 0
+
+            def send_to(url):
+                if self.global_endpoint_balancer is None:
+                    return send_once(url)
+                return self.global_endpoint_balancer.call(url, lambda: send_once(url))
+
+            def attempt():
+                nonlocal attempts
+                attempts += 1
+                if attempts > 1 and self.global_metrics is not None:
+                    self.global_metrics.observe_retry(endpoint, method)
+                if self.global_endpoint_balancer is None:
+                    url = self.global_str_square_authentication_url_base
+                else:
+                    url = self._pick_endpoint(tried)
+                    tried.add(url)
+                if self.global_circuit_breaker is None:
+                    return send_to(url)
+                return self.global_circuit_breaker.call(url, lambda: send_to(url))
+
+            def send_with_retries():
+                try:
+                    # uploaded file objects are consumed by the first attempt.
+                    if (
+                        self.global_retry_policy is None
+                        or request_kwargs["files"] is not None
+                    ):
+                        return attempt()
+                    return self.global_retry_policy.call(
+                        method, attempt, deadline=get_call_options().deadline
+                    )
+                except Exception as e:
+                    self._raise_if_deadline_exceeded(endpoint, e)
+                    raise
+
+            if self.global_metrics is None:
+                return send_with_retries()
+            start = time.perf_counter()
+            try:
+                response = send_with_retries()
+            except Exception as e:
+                self.global_metrics.observe_request(
+                    endpoint, method, time.perf_counter() - start, e
+                )
+                raise
+            self.global_metrics.observe_request(
+                endpoint, method, time.perf_counter() - start
+            )
+            return response
+        except Exception:
+            raise
+
+    def _send_observed(self, attempt, return_type, request_kwargs):
+        """
+        send one attempt taking the raw response, so it can be measured for the
+        metrics sink and reported to the request hooks.
+        """
+        try:
+            info = self._before_request(attempt, request_kwargs)
+            start = time.perf_counter()
+            try:
+                response = self.global_transport.request(
+                    **request_kwargs, return_type="response"
+                )
+                parse_start = time.perf_counter()
+                result = read_response(response, return_type)
+            except Exception as e:
+                self._on_request_error(info, e, start)
+                raise
+            self._after_response(info, request_kwargs, response, start, parse_start)
+            return result
+        except Exception:
+            raise
+
+    def _make_parsed_request(
+        self,
+        response_model,
+        response_as_pydantic,
+        **request_kwargs,
+    ):
+        """
+        send a request and return the json dict, or with response_as_pydantic, parse
+        the raw body straight into response_model in a single pass.
+        """
+        try:
+            if not response_as_pydantic:
+                return self._make_request(**request_kwargs)
+            response = self._make_request(**request_kwargs, return_type="bytes")
+            return self._parse_response(response_model, response)
+        except Exception:
+            raise
+
+    def _call_endpoint(self, name, response_as_pydantic, **arguments):
+        """
+        call the endpoint registered under name in ENDPOINTS with the helper method's
+        arguments, through its cache when it has one.
+        """
+        try:
+            endpoint = ENDPOINTS[name]
+            if endpoint.cache == "validation" and (
+                self.global_validation_cache is not None
+                or self.global_local_token_verifier is not None
+            ):
+                return self._call_validation_cached(
+                    endpoint, response_as_pydantic, arguments
+                )
+            if (
+                endpoint.cache == "user_details"
+                and self.global_user_details_cache is not None
+            ):
+                return self._call_user_details_cached(
+                    endpoint, response_as_pydantic, arguments
+                )
+            return self._make_parsed_request(
+                response_model=endpoint.response_model,
+                response_as_pydantic=response_as_pydantic,
+                **build_request(endpoint, arguments),
+            )
+        except Exception:
+            raise
+
+    def _call_validation_cached(self, endpoint, response_as_pydantic, arguments):
+        """
+        validate_and_get_payload_from_token_v0 through the validation cache and the local
+        token verifier, a cached result is served while the circuit is open.
+        """
+        try:
+            cache_key = self._get_validation_cache_key(arguments)
+            response = self._get_cached_validation(cache_key, arguments)
+            if response is None:
+                if self.global_validation_cache is None:
+                    return self._make_parsed_request(
+                        response_model=endpoint.response_model,
+                        response_as_pydantic=response_as_pydantic,
+                        **build_request(endpoint, arguments),
+                    )
+                try:
+                    response = self._make_request(**build_request(endpoint, arguments))
+                except CircuitOpenError:
+                    # stale entries never outlive the token exp.
+                    response = self.global_validation_cache.get_stale(cache_key)
+                    if response is None:
+                        raise
+                else:
+                    self._set_cached_validation(cache_key, response)
+            return self._get_result(endpoint, response_as_pydantic, response)
+        except Exception:
+            raise
+
+    def _call_user_details_cached(self, endpoint, response_as_pydantic, arguments):
+        """
+        get_user_details_v0 through the user details cache, a recently expired entry is
+        served while the circuit is open.
+        """
+        try:
+            access_token = arguments["access_token"]
+            response = self.global_user_details_cache.get(access_token)
+            if response is None:
+                generation = self.global_user_details_cache.generation
+                try:
+                    response = self._make_request(**build_request(endpoint, arguments))
+                except CircuitOpenError:
+                    # server is known to be down, fall back to a recently expired entry.
+                    response = self.global_user_details_cache.get_stale(access_token)
+                    if response is None:
+                        raise
+                else:
+                    self.global_user_details_cache.set(
+                        access_token, response, generation
+                    )
+            return self._get_result(endpoint, response_as_pydantic, response)
+        except Exception:
+            raise
+
     @overload
     def register_username_v0(
         self,
@@ -99,18 +456,13 @@ class SquareAuthenticationHelper:
         response_as_pydantic: bool = False,
     ) -> Any:
         try:
-            endpoint = "register_username/v0"
-            data = {
-                "username": username,
-                "password": password,
-                "app_id": app_id,
-            }
-            response = self._make_request(method="POST", endpoint=endpoint, json=data)
-
-            if response_as_pydantic:
-                return StandardResponse[RegisterUsernameV0Response](**response)
-            else:
-                return response
+            return self._call_endpoint(
+                "register_username_v0",
+                response_as_pydantic,
+                username=username,
+                password=password,
+                app_id=app_id,
+            )
         except Exception:
             raise
 
@@ -141,18 +493,14 @@ class SquareAuthenticationHelper:
         response_as_pydantic: bool = False,
     ) -> Any:
         try:
-            endpoint = "login_username/v0"
-            data = {
-                "username": username,
-                "password": password,
-                "app_id": app_id,
-                "assign_app_id_if_missing": assign_app_id_if_missing,
-            }
-            response = self._make_request(method="POST", endpoint=endpoint, json=data)
-            if response_as_pydantic:
-                return StandardResponse[LoginUsernameV0Response](**response)
-            else:
-                return response
+            return self._call_endpoint(
+                "login_username_v0",
+                response_as_pydantic,
+                username=username,
+                password=password,
+                app_id=app_id,
+                assign_app_id_if_missing=assign_app_id_if_missing,
+            )
         except Exception:
             raise
 
@@ -174,17 +522,11 @@ class SquareAuthenticationHelper:
         response_as_pydantic: bool = False,
     ) -> Any:
         try:
-            endpoint = "generate_access_token/v0"
-            headers = {
-                "refresh_token": refresh_token,
-            }
-            response = self._make_request(
-                method="GET", endpoint=endpoint, headers=headers
+            return self._call_endpoint(
+                "generate_access_token_v0",
+                response_as_pydantic,
+                refresh_token=refresh_token,
             )
-            if response_as_pydantic:
-                return StandardResponse[GenerateAccessTokenV0Response](**response)
-            else:
-                return response
         except Exception:
             raise
 
@@ -208,17 +550,11 @@ class SquareAuthenticationHelper:
         response_as_pydantic: bool = False,
     ) -> Any:
         try:
-            endpoint = "logout/v0"
-            headers = {
-                "refresh_token": refresh_token,
-            }
-            response = self._make_request(
-                method="DELETE", endpoint=endpoint, headers=headers
+            return self._call_endpoint(
+                "logout_v0",
+                response_as_pydantic,
+                refresh_token=refresh_token,
             )
-            if response_as_pydantic:
-                return LogoutV0Response(**response)
-            else:
-                return response
         except Exception:
             raise
 
@@ -243,20 +579,12 @@ class SquareAuthenticationHelper:
         response_as_pydantic: bool = False,
     ) -> Any:
         try:
-            endpoint = "logout/apps/v0"
-            headers = {
-                "access_token": access_token,
-            }
-            body = {
-                "app_ids": app_ids,
-            }
-            response = self._make_request(
-                method="POST", endpoint=endpoint, headers=headers, json=body
+            return self._call_endpoint(
+                "logout_apps_v0",
+                response_as_pydantic,
+                access_token=access_token,
+                app_ids=app_ids,
             )
-            if response_as_pydantic:
-                return LogoutAppsV0Response(**response)
-            else:
-                return response
         except Exception:
             raise
 
@@ -280,17 +608,11 @@ class SquareAuthenticationHelper:
         response_as_pydantic: bool = False,
     ) -> Any:
         try:
-            endpoint = "logout/all/v0"
-            headers = {
-                "access_token": access_token,
-            }
-            response = self._make_request(
-                method="DELETE", endpoint=endpoint, headers=headers
+            return self._call_endpoint(
+                "logout_all_v0",
+                response_as_pydantic,
+                access_token=access_token,
             )
-            if response_as_pydantic:
-                return LogoutAllV0Response(**response)
-            else:
-                return response
         except Exception:
             raise
 
@@ -314,19 +636,11 @@ class SquareAuthenticationHelper:
         response_as_pydantic: bool = False,
     ) -> Any:
         try:
-            endpoint = "get_user_details/v0"
-            headers = {
-                "access_token": access_token,
-            }
-            response = self._make_request(
-                method="GET",
-                endpoint=endpoint,
-                headers=headers,
+            return self._call_endpoint(
+                "get_user_details_v0",
+                response_as_pydantic,
+                access_token=access_token,
             )
-            if response_as_pydantic:
-                return StandardResponse[GetUserDetailsV0Response](**response)
-            else:
-                return response
         except Exception:
             raise
 
@@ -356,21 +670,13 @@ class SquareAuthenticationHelper:
         response_as_pydantic: bool = False,
     ) -> Any:
         try:
-            endpoint = "update_user_app_ids/v0"
-            headers = {
-                "access_token": access_token,
-            }
-            payload = {
-                "app_ids_to_add": app_ids_to_add,
-                "app_ids_to_remove": app_ids_to_remove,
-            }
-            response = self._make_request(
-                method="PATCH", endpoint=endpoint, headers=headers, json=payload
+            return self._call_endpoint(
+                "update_user_app_ids_v0",
+                response_as_pydantic,
+                access_token=access_token,
+                app_ids_to_add=app_ids_to_add,
+                app_ids_to_remove=app_ids_to_remove,
             )
-            if response_as_pydantic:
-                return StandardResponse[UpdateUserAppIdsV0Response](**response)
-            else:
-                return response
         except Exception:
             raise
 
@@ -397,20 +703,12 @@ class SquareAuthenticationHelper:
         response_as_pydantic: bool = False,
     ) -> Any:
         try:
-            endpoint = "update_username/v0"
-            params = {
-                "new_username": new_username,
-            }
-            headers = {
-                "access_token": access_token,
-            }
-            response = self._make_request(
-                method="PATCH", endpoint=endpoint, params=params, headers=headers
+            return self._call_endpoint(
+                "update_username_v0",
+                response_as_pydantic,
+                new_username=new_username,
+                access_token=access_token,
             )
-            if response_as_pydantic:
-                return StandardResponse[UpdateUsernameV0Response](**response)
-            else:
-                return response
         except Exception:
             raise
 
@@ -437,20 +735,12 @@ class SquareAuthenticationHelper:
         response_as_pydantic: bool = False,
     ) -> Any:
         try:
-            endpoint = "delete_user/v0"
-            data = {
-                "password": password,
-            }
-            headers = {
-                "access_token": access_token,
-            }
-            response = self._make_request(
-                method="POST", endpoint=endpoint, json=data, headers=headers
+            return self._call_endpoint(
+                "delete_user_v0",
+                response_as_pydantic,
+                password=password,
+                access_token=access_token,
             )
-            if response_as_pydantic:
-                return DeleteUserV0Response(**response)
-            else:
-                return response
         except Exception:
             raise
 
@@ -486,23 +776,15 @@ class SquareAuthenticationHelper:
         response_as_pydantic: bool = False,
     ) -> Any:
         try:
-            endpoint = "update_password/v0"
-            data = {
-                "old_password": old_password,
-                "new_password": new_password,
-                "logout_other_sessions": logout_other_sessions,
-                "preserve_session_refresh_token": preserve_session_refresh_token,
-            }
-            headers = {
-                "access_token": access_token,
-            }
-            response = self._make_request(
-                method="PATCH", endpoint=endpoint, json=data, headers=headers
+            return self._call_endpoint(
+                "update_password_v0",
+                response_as_pydantic,
+                old_password=old_password,
+                new_password=new_password,
+                access_token=access_token,
+                logout_other_sessions=logout_other_sessions,
+                preserve_session_refresh_token=preserve_session_refresh_token,
             )
-            if response_as_pydantic:
-                return UpdatePasswordV0Response(**response)
-            else:
-                return response
         except Exception:
             raise
 
@@ -532,20 +814,66 @@ class SquareAuthenticationHelper:
         response_as_pydantic: bool = False,
     ) -> Any:
         try:
-            endpoint = "validate_and_get_payload_from_token/v0"
-            params = {"token_type": token_type.value, "app_id": app_id}
-            headers = {
-                "token": token,
-            }
-            response = self._make_request(
-                method="GET", endpoint=endpoint, headers=headers, params=params
+            return self._call_endpoint(
+                "validate_and_get_payload_from_token_v0",
+                response_as_pydantic,
+                token=token,
+                token_type=token_type,
+                app_id=app_id,
+            )
+        except Exception:
+            raise
+
+    def validate_tokens_bulk(
+        self,
+        tokens: List[str],
+        token_type: TokenType,
+        app_id: int,
+        max_concurrency: Optional[int] = None,
+        response_as_pydantic: bool = False,
+    ) -> List[TokenValidationResult]:
+        """
+        validate many tokens concurrently with validate_and_get_payload_from_token_v0, so
+        the validation cache and local token verifier apply to every token.
+
+        :param max_concurrency: max validations in flight, defaults to the transport pool_maxsize.
+        :return: one result per token in input order, failures are returned, not raised.
+        """
+        try:
+            if max_concurrency is not None and max_concurrency < 1:
+                raise ValueError("max_concurrency must be >= 1.")
+            # duplicate tokens share one validation.
+            unique_tokens = list(dict.fromkeys(tokens))
+            if not unique_tokens:
+                return []
+            max_workers = min(
+                max_concurrency or self.global_transport.pool_maxsize,
+                len(unique_tokens),
             )
-            if response_as_pydantic:
-                return StandardResponse[ValidateAndGetPayloadFromTokenV0Response](
-                    **response
+
+            # worker threads run in a copy of the caller context (call_options).
+            context = contextvars.copy_context()
+
+            def validate(token):
+                try:
+                    response = context.copy().run(
+                        self.validate_and_get_payload_from_token_v0,
+                        token=token,
+                        token_type=token_type,
+                        app_id=app_id,
+                        response_as_pydantic=response_as_pydantic,
+                    )
+                    return TokenValidationResult(token, response=response)
+                except Exception as e:
+                    return TokenValidationResult(token, error=e)
+
+            with ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="square_authentication_bulk"
+            ) as executor:
+                dict_results = dict(
+                    zip(unique_tokens, executor.map(validate, unique_tokens))
                 )
-            else:
-                return response
+            return [dict_results[token] for token in tokens]
         except Exception:
             raise
 
@@ -572,24 +900,12 @@ class SquareAuthenticationHelper:
         response_as_pydantic: bool = False,
     ) -> Any:
         try:
-            endpoint = "update_profile_photo/v0"
-
-            headers = {
-                "access_token": access_token,
-            }
-            if profile_photo:
-                files = {
-                    "profile_photo": profile_photo,
-                }
-            else:
-                files = None
-            response = self._make_request(
-                method="PATCH", endpoint=endpoint, headers=headers, files=files
+            return self._call_endpoint(
+                "update_profile_photo_v0",
+                response_as_pydantic,
+                access_token=access_token,
+                profile_photo=profile_photo,
             )
-            if response_as_pydantic:
-                return StandardResponse[UpdateProfilePhotoV0Response](**response)
-            else:
-                return response
         except Exception:
             raise
 
@@ -623,29 +939,13 @@ class SquareAuthenticationHelper:
         if recovery_methods_to_remove is None:
             recovery_methods_to_remove = []
         try:
-            endpoint = "update_user_recovery_methods/v0"
-
-            headers = {
-                "access_token": access_token,
-            }
-            # convert to json serializable format
-            recovery_methods_to_add_formatted = [
-                method.value for method in recovery_methods_to_add
-            ]
-            recovery_methods_to_remove_formatted = [
-                method.value for method in recovery_methods_to_remove
-            ]
-            json = {
-                "recovery_methods_to_add": recovery_methods_to_add_formatted,
-                "recovery_methods_to_remove": recovery_methods_to_remove_formatted,
-            }
-            response = self._make_request(
-                method="PATCH", endpoint=endpoint, headers=headers, json=json
+            return self._call_endpoint(
+                "update_user_recovery_methods_v0",
+                response_as_pydantic,
+                access_token=access_token,
+                recovery_methods_to_add=recovery_methods_to_add,
+                recovery_methods_to_remove=recovery_methods_to_remove,
             )
-            if response_as_pydantic:
-                return StandardResponse[UpdateUserRecoveryMethodsV0Response](**response)
-            else:
-                return response
         except Exception:
             raise
 
@@ -669,20 +969,11 @@ class SquareAuthenticationHelper:
         response_as_pydantic: bool = False,
     ) -> Any:
         try:
-            endpoint = "generate_account_backup_codes/v0"
-
-            headers = {
-                "access_token": access_token,
-            }
-            response = self._make_request(
-                method="POST", endpoint=endpoint, headers=headers
+            return self._call_endpoint(
+                "generate_account_backup_codes_v0",
+                response_as_pydantic,
+                access_token=access_token,
             )
-            if response_as_pydantic:
-                return StandardResponse[GenerateAccountBackupCodesV0Response](
-                    **response
-                )
-            else:
-                return response
         except Exception:
             raise
 
@@ -718,22 +1009,15 @@ class SquareAuthenticationHelper:
         response_as_pydantic: bool = False,
     ) -> Any:
         try:
-            endpoint = "reset_password_and_login_using_backup_code/v0"
-
-            json = {
-                "backup_code": backup_code,
-                "username": username,
-                "new_password": new_password,
-                "app_id": app_id,
-                "logout_other_sessions": logout_other_sessions,
-            }
-            response = self._make_request(method="POST", endpoint=endpoint, json=json)
-            if response_as_pydantic:
-                return StandardResponse[ResetPasswordAndLoginUsingBackupCodeV0Response](
-                    **response
-                )
-            else:
-                return response
+            return self._call_endpoint(
+                "reset_password_and_login_using_backup_code_v0",
+                response_as_pydantic,
+                backup_code=backup_code,
+                username=username,
+                new_password=new_password,
+                app_id=app_id,
+                logout_other_sessions=logout_other_sessions,
+            )
         except Exception:
             raise
 
@@ -760,17 +1044,12 @@ class SquareAuthenticationHelper:
         response_as_pydantic: bool = False,
     ) -> Any:
         try:
-            endpoint = "send_reset_password_email/v0"
-
-            json = {
-                "username": username,
-                "redirect_url": redirect_url,
-            }
-            response = self._make_request(method="POST", endpoint=endpoint, json=json)
-            if response_as_pydantic:
-                return StandardResponse[SendResetPasswordEmailV0Response](**response)
-            else:
-                return response
+            return self._call_endpoint(
+                "send_reset_password_email_v0",
+                response_as_pydantic,
+                username=username,
+                redirect_url=redirect_url,
+            )
         except Exception:
             raise
 
@@ -797,22 +1076,12 @@ class SquareAuthenticationHelper:
         response_as_pydantic: bool = False,
     ) -> Any:
         try:
-            endpoint = "validate_email_verification_code/v0"
-            headers = {
-                "access_token": access_token,
-            }
-            json = {
-                "verification_code": verification_code,
-            }
-            response = self._make_request(
-                method="POST", endpoint=endpoint, json=json, headers=headers
+            return self._call_endpoint(
+                "validate_email_verification_code_v0",
+                response_as_pydantic,
+                access_token=access_token,
+                verification_code=verification_code,
             )
-            if response_as_pydantic:
-                return StandardResponse[ValidateEmailVerificationCodeV0Response](
-                    **response
-                )
-            else:
-                return response
         except Exception:
             raise
 
@@ -839,21 +1108,12 @@ class SquareAuthenticationHelper:
         response_as_pydantic: bool = False,
     ) -> Any:
         try:
-            endpoint = "send_verification_email/v0"
-            headers = {
-                "access_token": access_token,
-            }
-            body = {
-                "redirect_url": redirect_url,
-            }
-
-            response = self._make_request(
-                method="POST", endpoint=endpoint, headers=headers, json=body
+            return self._call_endpoint(
+                "send_verification_email_v0",
+                response_as_pydantic,
+                access_token=access_token,
+                redirect_url=redirect_url,
             )
-            if response_as_pydantic:
-                return StandardResponse[SendVerificationEmailV0Response](**response)
-            else:
-                return response
         except Exception:
             raise
 
@@ -892,25 +1152,16 @@ class SquareAuthenticationHelper:
         response_as_pydantic: bool = False,
     ) -> Any:
         try:
-            endpoint = "update_profile_details/v0"
-            headers = {
-                "access_token": access_token,
-            }
-            params = {
-                "first_name": first_name,
-                "last_name": last_name,
-                "email": email,
-                "phone_number_country_code": phone_number_country_code,
-                "phone_number": phone_number,
-            }
-
-            response = self._make_request(
-                method="PATCH", endpoint=endpoint, params=params, headers=headers
+            return self._call_endpoint(
+                "update_profile_details_v0",
+                response_as_pydantic,
+                access_token=access_token,
+                first_name=first_name,
+                last_name=last_name,
+                email=email,
+                phone_number_country_code=phone_number_country_code,
+                phone_number=phone_number,
             )
-            if response_as_pydantic:
-                return StandardResponse[UpdateProfileDetailsV0Response](**response)
-            else:
-                return response
         except Exception:
             raise
 
@@ -946,27 +1197,15 @@ class SquareAuthenticationHelper:
         response_as_pydantic: bool = False,
     ) -> Any:
         try:
-            endpoint = "reset_password_and_login_using_reset_email_code/v0"
-
-            json = {
-                "reset_email_code": reset_email_code,
-                "username": username,
-                "new_password": new_password,
-                "app_id": app_id,
-                "logout_other_sessions": logout_other_sessions,
-            }
-
-            response = self._make_request(
-                method="POST",
-                endpoint=endpoint,
-                json=json,
+            return self._call_endpoint(
+                "reset_password_and_login_using_reset_email_code_v0",
+                response_as_pydantic,
+                reset_email_code=reset_email_code,
+                username=username,
+                new_password=new_password,
+                app_id=app_id,
+                logout_other_sessions=logout_other_sessions,
             )
-            if response_as_pydantic:
-                return StandardResponse[
-                    ResetPasswordAndLoginUsingResetEmailCodeV0Response
-                ](**response)
-            else:
-                return response
         except Exception:
             raise
 
@@ -996,23 +1235,13 @@ class SquareAuthenticationHelper:
         response_as_pydantic: bool = False,
     ) -> Any:
         try:
-            endpoint = "register_login_google/v0"
-
-            json = {
-                "google_id": google_id,
-                "app_id": app_id,
-                "assign_app_id_if_missing": assign_app_id_if_missing,
-            }
-
-            response = self._make_request(
-                method="POST",
-                endpoint=endpoint,
-                json=json,
+            return self._call_endpoint(
+                "register_login_google_v0",
+                response_as_pydantic,
+                google_id=google_id,
+                app_id=app_id,
+                assign_app_id_if_missing=assign_app_id_if_missing,
             )
-            if response_as_pydantic:
-                return StandardResponse[RegisterLoginGoogleV0Response](**response)
-            else:
-                return response
         except Exception:
             raise
 
@@ -1037,21 +1266,11 @@ class SquareAuthenticationHelper:
     ) -> Any:
 
         try:
-            endpoint = "get_user_recovery_methods/v0"
-
-            params = {
-                "username": username,
-            }
-
-            response = self._make_request(
-                method="GET",
-                endpoint=endpoint,
-                params=params,
+            return self._call_endpoint(
+                "get_user_recovery_methods_v0",
+                response_as_pydantic,
+                username=username,
             )
-            if response_as_pydantic:
-                return StandardResponse[GetUserRecoveryMethodsV0Response](**response)
-            else:
-                return response
         except Exception:
             raise
 
@@ -1078,20 +1297,12 @@ class SquareAuthenticationHelper:
         response_as_pydantic: bool = False,
     ) -> Any:
         try:
-            endpoint = "add_self_auth_provider/v0"
-            headers = {
-                "access_token": access_token,
-            }
-            json = {
-                "password": password,
-            }
-            response = self._make_request(
-                method="POST", endpoint=endpoint, headers=headers, json=json
+            return self._call_endpoint(
+                "add_self_auth_provider_v0",
+                response_as_pydantic,
+                access_token=access_token,
+                password=password,
             )
-            if response_as_pydantic:
-                return StandardResponse[AddSelfAuthProviderV0Response](**response)
-            else:
-                return response
         except Exception:
             raise
 
@@ -1118,20 +1329,12 @@ class SquareAuthenticationHelper:
         response_as_pydantic: bool = False,
     ) -> Any:
         try:
-            endpoint = "add_google_auth_provider/v0"
-            headers = {
-                "access_token": access_token,
-            }
-            json = {
-                "google_id_token": google_id_token,
-            }
-            response = self._make_request(
-                method="POST", endpoint=endpoint, headers=headers, json=json
+            return self._call_endpoint(
+                "add_google_auth_provider_v0",
+                response_as_pydantic,
+                access_token=access_token,
+                google_id_token=google_id_token,
             )
-            if response_as_pydantic:
-                return StandardResponse[AddGoogleAuthProviderV0Response](**response)
-            else:
-                return response
         except Exception:
             raise
 
@@ -1158,19 +1361,11 @@ class SquareAuthenticationHelper:
         response_as_pydantic: bool = False,
     ) -> Any:
         try:
-            endpoint = "unlink_auth_provider/v0"
-            headers = {
-                "access_token": access_token,
-            }
-            json = {
-                "auth_provider": auth_provider,
-            }
-            response = self._make_request(
-                method="POST", endpoint=endpoint, headers=headers, json=json
+            return self._call_endpoint(
+                "unlink_auth_provider_v0",
+                response_as_pydantic,
+                access_token=access_token,
+                auth_provider=auth_provider,
             )
-            if response_as_pydantic:
-                return StandardResponse[UnlinkAuthProviderV0Response](**response)
-            else:
-                return response
         except Exception:
             raise
@@ -0,0 +1,310 @@
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from square_authentication_helper.resilience import get_status_code
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def get_error_label(error: BaseException) -> str:
+    """
+    http status code of error if it has one, its class name otherwise.
+    """
+    status_code = get_status_code(error)
+    return str(status_code) if status_code is not None else type(error).__name__
+
+
+def get_body_sizes(response: Any) -> Tuple[int, int]:
+    """
+    (request body bytes, response body bytes) of a requests / httpx response.
+    """
+    sent = response.request.headers.get("Content-Length")
+    return int(sent) if sent else 0, len(response.content)
+
+
+class MetricsSink:
+    """
+    receives measurements of every upstream call made by a helper, override the methods
+    you need (e.g. to forward to statsd or opentelemetry), the defaults do nothing.
+
+    endpoint is the path without a leading slash, e.g. get_user_details/v0. calls served
+    from a cache, the local token verifier or a coalesced request are not upstream calls.
+    """
+
+    def observe_request(
+        self,
+        endpoint: str,
+        method: str,
+        seconds: float,
+        error: Optional[BaseException] = None,
+    ):
+        """
+        one call including its retries, error is the exception it finally raised.
+        """
+
+    def observe_retry(self, endpoint: str, method: str):
+        """
+        one extra attempt made by the retry policy.
+        """
+
+    def observe_bytes(self, endpoint: str, method: str, sent: int, received: int):
+        """
+        request and response body sizes of one successful attempt.
+        """
+
+    def register_cache(self, name: str, cache: Any):
+        """
+        called once per cache configured on the helper, cache has a stats() method
+        returning at least hits and misses.
+        """
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int):
+        # counts[i]: observations <= buckets[i], the last slot is +inf.
+        self.counts = [0] * (size + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry(MetricsSink):
+    """
+    thread safe in memory sink keeping per (endpoint, method) latency histograms and
+    request / error / retry / byte counters, exported with render_prometheus.
+    """
+
+    def __init__(
+        self, buckets: Sequence[float] = DEFAULT_BUCKETS, prefix: str = "square_auth"
+    ):
+        """
+        :param buckets: upper bounds in seconds of the latency histogram buckets.
+        :param prefix: prefix of every exported metric name.
+        """
+        if not buckets or list(buckets) != sorted(set(buckets)):
+            raise ValueError("buckets must be non empty, sorted and unique.")
+        self.buckets = tuple(float(bucket) for bucket in buckets)
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, str], _Histogram] = {}
+        self._errors: Dict[Tuple[str, str, str], int] = {}
+        self._retries: Dict[Tuple[str, str], int] = {}
+        self._bytes_sent: Dict[Tuple[str, str], int] = {}
+        self._bytes_received: Dict[Tuple[str, str], int] = {}
+        self._caches: Dict[str, Any] = {}
+
+    def observe_request(self, endpoint, method, seconds, error=None):
+        key = (endpoint, method)
+        # bisect_left: an observation equal to a bound belongs to that bucket.
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(len(self.buckets))
+            histogram.counts[index] += 1
+            histogram.sum += seconds
+            histogram.count += 1
+            if error is not None:
+                error_key = (endpoint, method, get_error_label(error))
+                self._errors[error_key] = self._errors.get(error_key, 0) + 1
+
+    def observe_retry(self, endpoint, method):
+        key = (endpoint, method)
+        with self._lock:
+            self._retries[key] = self._retries.get(key, 0) + 1
+
+    def observe_bytes(self, endpoint, method, sent, received):
+        key = (endpoint, method)
+        with self._lock:
+            self._bytes_sent[key] = self._bytes_sent.get(key, 0) + sent
+            self._bytes_received[key] = self._bytes_received.get(key, 0) + received
+
+    def register_cache(self, name, cache):
+        with self._lock:
+            self._caches[name] = cache
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        plain dict copy of every metric, keyed by "endpoint method".
+        """
+        with self._lock:
+            endpoints = {}
+            for (endpoint, method), histogram in self._histograms.items():
+                key = (endpoint, method)
+                endpoints[f"{endpoint} {method}"] = {
+                    "requests": histogram.count,
+                    "seconds_sum": histogram.sum,
+                    "errors": {
+                        label: count
+                        for (e, m, label), count in self._errors.items()
+                        if (e, m) == key
+                    },
+                    "retries": self._retries.get(key, 0),
+                    "bytes_sent": self._bytes_sent.get(key, 0),
+                    "bytes_received": self._bytes_received.get(key, 0),
+                }
+            caches = dict(self._caches)
+        return {
+            "endpoints": endpoints,
+            "caches": {name: cache.stats() for name, cache in caches.items()},
+        }
+
+    def render_prometheus(self) -> str:
+        """
+        every metric in the prometheus text exposition format (version 0.0.4).
+        """
+        prefix = self.prefix
+        lines: List[str] = []
+        with self._lock:
+            histograms = {
+                key: (list(h.counts), h.sum, h.count)
+                for key, h in self._histograms.items()
+            }
+            errors = dict(self._errors)
+            retries = dict(self._retries)
+            bytes_sent = dict(self._bytes_sent)
+            bytes_received = dict(self._bytes_received)
+            caches = dict(self._caches)
+
+        name = f"{prefix}_request_duration_seconds"
+        lines.append(f"# HELP {name} latency of upstream calls, retries included.")
+        lines.append(f"# TYPE {name} histogram")
+        for (endpoint, method), (counts, total, count) in sorted(histograms.items()):
+            labels = _format_labels(endpoint=endpoint, method=method)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels(
+                    endpoint=endpoint, method=method, le=_format_value(bound)
+                )
+                lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+            bucket_labels = _format_labels(endpoint=endpoint, method=method, le="+Inf")
+            lines.append(f"{name}_bucket{bucket_labels} {count}")
+            lines.append(f"{name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{name}_count{labels} {count}")
+
+        _append_counter(
+            lines,
+            f"{prefix}_requests_total",
+            "upstream calls.",
+            {key: value[2] for key, value in histograms.items()},
+            ("endpoint", "method"),
+        )
+        _append_counter(
+            lines,
+            f"{prefix}_request_errors_total",
+            "upstream calls that raised, by status code or exception class.",
+            errors,
+            ("endpoint", "method", "error"),
+        )
+        _append_counter(
+            lines,
+            f"{prefix}_request_retries_total",
+            "extra attempts made by the retry policy.",
+            retries,
+            ("endpoint", "method"),
+        )
+        _append_counter(
+            lines,
+            f"{prefix}_request_bytes_sent_total",
+            "request body bytes.",
+            bytes_sent,
+            ("endpoint", "method"),
+        )
+        _append_counter(
+            lines,
+            f"{prefix}_response_bytes_received_total",
+            "response body bytes.",
+            bytes_received,
+            ("endpoint", "method"),
+        )
+
+        cache_stats = {name: cache.stats() for name, cache in sorted(caches.items())}
+        _append_counter(
+            lines,
+            f"{prefix}_cache_hits_total",
+            "cache lookups answered from the cache.",
+            {(name,): stats["hits"] for name, stats in cache_stats.items()},
+            ("cache",),
+        )
+        _append_counter(
+            lines,
+            f"{prefix}_cache_misses_total",
+            "cache lookups that went upstream.",
+            {(name,): stats["misses"] for name, stats in cache_stats.items()},
+            ("cache",),
+        )
+        name = f"{prefix}_cache_hit_ratio"
+        lines.append(f"# HELP {name} hits / lookups since the cache was created.")
+        lines.append(f"# TYPE {name} gauge")
+        for cache_name, stats in cache_stats.items():
+            lookups = stats["hits"] + stats["misses"]
+            ratio = stats["hits"] / lookups if lookups else 0.0
+            lines.append(
+                f"{name}{_format_labels(cache=cache_name)} {_format_value(ratio)}"
+            )
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(**labels: str) -> str:
+    return (
+        "{"
+        + ",".join(
+            f'{key}="{_escape_label_value(str(value))}"'
+            for key, value in labels.items()
+        )
+        + "}"
+    )
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value))
+
+
+def _append_counter(
+    lines: List[str],
+    name: str,
+    description: str,
+    values: Dict[tuple, int],
+    label_names: Tuple[str, ...],
+):
+    lines.append(f"# HELP {name} {description}")
+    lines.append(f"# TYPE {name} counter")
+    for key, value in sorted(values.items()):
+        lines.append(f"{name}{_format_labels(**dict(zip(label_names, key)))} {value}")
+
+
+def serve_prometheus(
+    registry: MetricsRegistry, port: int = 9464, host: str = "0.0.0.0"
+) -> ThreadingHTTPServer:
+    """
+    serve registry.render_prometheus() on http://host:port/metrics from a daemon thread,
+    call shutdown() on the returned server to stop it.
+    """
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
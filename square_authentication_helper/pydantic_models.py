@@ -1,13 +1,23 @@
-from enum import Enum
-from typing import List, Dict, TypeAlias
+from functools import cache
+from typing import (
+    List,
+    Dict,
+    TypeAlias,
+    Type,
+)
 
 from pydantic import BaseModel
 from square_commons.api_utils import StandardResponse
 
+from square_authentication_helper.enums import TokenType
 
-class TokenType(Enum):
-    access_token = "access_token"
-    refresh_token = "refresh_token"
+
+@cache
+def get_standard_response_model(data_model: Type) -> Type[StandardResponse]:
+    """
+    StandardResponse[data_model], built (and its validator compiled) once per model.
+    """
+    return StandardResponse[data_model]
 
 
 class RegisterUsernameV0ResponseMain(BaseModel):
@@ -0,0 +1,512 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import Enum
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Collection,
+    Deque,
+    Dict,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+)
+
+import requests
+
+
+def _get_default_retry_exceptions() -> Tuple[Type[BaseException], ...]:
+    import httpx
+
+    return (requests.ConnectionError, requests.Timeout, httpx.TransportError)
+
+
+def get_status_code(error: BaseException) -> Optional[int]:
+    """
+    http status of a requests.HTTPError / httpx.HTTPStatusError, none for other errors.
+    """
+    return getattr(getattr(error, "response", None), "status_code", None)
+
+
+class RetryBudget:
+    """
+    token bucket capping retries to a fraction of requests, so retries can not multiply
+    the load on a server that is already failing.
+
+    every request deposits ratio tokens, every retry withdraws one, and min_retries_per_second
+    tokens are added over time so low traffic clients can still retry.
+    """
+
+    def __init__(
+        self,
+        ratio: float = 0.1,
+        min_retries_per_second: float = 1.0,
+        max_tokens: float = 10.0,
+    ):
+        """
+        :param ratio: retries allowed per request (0.1 = at most 10% extra load).
+        :param min_retries_per_second: retries always allowed regardless of traffic.
+        :param max_tokens: max retries that can be saved up for a burst.
+        """
+        if ratio < 0 or min_retries_per_second < 0 or max_tokens < 1:
+            raise ValueError(
+                "ratio and min_retries_per_second must be >= 0 and max_tokens >= 1."
+            )
+        self.ratio = ratio
+        self.min_retries_per_second = min_retries_per_second
+        self.max_tokens = max_tokens
+        self._lock = threading.Lock()
+        self._float_tokens = max_tokens
+        self._float_last_refill = time.monotonic()
+        self.exhausted = 0
+
+    @property
+    def tokens(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._float_tokens
+
+    def _refill(self):
+        now = time.monotonic()
+        self._float_tokens = min(
+            self.max_tokens,
+            self._float_tokens
+            + (now - self._float_last_refill) * self.min_retries_per_second,
+        )
+        self._float_last_refill = now
+
+    def deposit(self):
+        with self._lock:
+            self._refill()
+            self._float_tokens = min(self.max_tokens, self._float_tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self._float_tokens >= 1:
+                self._float_tokens -= 1
+                return True
+            self.exhausted += 1
+            return False
+
+
+class RetryPolicy:
+    """
+    retry with capped exponential backoff and full jitter for transient failures.
+
+    by default only GET requests (the idempotent reads, e.g. get_user_details_v0,
+    validate_and_get_payload_from_token_v0, get_user_recovery_methods_v0) are retried,
+    add "POST" / "PATCH" / "DELETE" to retry_methods to opt in for writes.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 0.1,
+        max_delay: float = 2.0,
+        retry_on_status: Collection[int] = frozenset({429, 502, 503, 504}),
+        retry_on_exceptions: Optional[Tuple[Type[BaseException], ...]] = None,
+        retry_methods: Collection[str] = frozenset({"GET"}),
+        budget: Optional[RetryBudget] = None,
+    ):
+        """
+        :param max_attempts: total attempts including the first one.
+        :param base_delay: backoff before the first retry is drawn from [0, base_delay].
+        :param max_delay: cap of the backoff window.
+        :param retry_on_status: http statuses that are retried.
+        :param retry_on_exceptions: exception types that are retried, defaults to
+            connection errors and timeouts of requests and httpx.
+        :param retry_methods: http methods that are retried.
+        :param budget: retry budget (can be shared between helpers), defaults to a new
+            RetryBudget().
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be >= 1.")
+        if base_delay < 0 or max_delay < 0:
+            raise ValueError("base_delay and max_delay must be >= 0.")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on_status = frozenset(retry_on_status)
+        self.retry_on_exceptions = (
+            retry_on_exceptions
+            if retry_on_exceptions is not None
+            else _get_default_retry_exceptions()
+        )
+        self.retry_methods = frozenset(method.upper() for method in retry_methods)
+        self.budget = budget if budget is not None else RetryBudget()
+        self.retries = 0
+
+    def is_retryable(self, method: str, error: BaseException) -> bool:
+        if method.upper() not in self.retry_methods:
+            return False
+        status_code = get_status_code(error)
+        if status_code is not None:
+            return status_code in self.retry_on_status
+        return isinstance(error, self.retry_on_exceptions)
+
+    def get_delay(self, attempt: int) -> float:
+        """
+        full jitter backoff before retry number attempt (starting at 1).
+        """
+        return random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        )
+
+    def _get_retry_delay(
+        self,
+        method: str,
+        error: BaseException,
+        attempt: int,
+        deadline: Optional["Deadline"],
+    ) -> Optional[float]:
+        """
+        backoff before the next attempt, none if the error must be raised.
+        """
+        if attempt >= self.max_attempts or not self.is_retryable(method, error):
+            return None
+        delay = self.get_delay(attempt)
+        # a retry that starts after the deadline can only fail.
+        if deadline is not None and delay >= deadline.remaining():
+            return None
+        if not self.budget.try_withdraw():
+            return None
+        return delay
+
+    def call(
+        self,
+        method: str,
+        function: Callable[[], Any],
+        deadline: Optional["Deadline"] = None,
+    ) -> Any:
+        self.budget.deposit()
+        attempt = 1
+        while True:
+            try:
+                return function()
+            except Exception as e:
+                delay = self._get_retry_delay(method, e, attempt, deadline)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            self.retries += 1
+            attempt += 1
+
+    async def call_async(
+        self,
+        method: str,
+        function: Callable[[], Awaitable[Any]],
+        deadline: Optional["Deadline"] = None,
+    ) -> Any:
+        self.budget.deposit()
+        attempt = 1
+        while True:
+            try:
+                return await function()
+            except Exception as e:
+                delay = self._get_retry_delay(method, e, attempt, deadline)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            self.retries += 1
+            attempt += 1
+
+
+class CircuitOpenError(Exception):
+    """
+    raised instead of calling a server whose circuit is open.
+    """
+
+    def __init__(self, key: str, retry_after: float):
+        super().__init__(
+            f"circuit for {key} is open, retry in {max(retry_after, 0):.1f} seconds."
+        )
+        self.key = key
+        self.retry_after = retry_after
+
+
+class CircuitState(Enum):
+    closed = "closed"
+    open = "open"
+    half_open = "half_open"
+
+
+def is_server_failure(error: BaseException) -> bool:
+    """
+    default circuit breaker classification: 5xx / 429 responses, connection errors and
+    timeouts count as failures, other errors (e.g. 4xx) mean the server is healthy.
+    """
+    status_code = get_status_code(error)
+    if status_code is not None:
+        return status_code >= 500 or status_code == 429
+    return isinstance(error, _get_default_retry_exceptions())
+
+
+class _Circuit:
+    def __init__(self, window_size: int):
+        self.state = CircuitState.closed
+        self.outcomes: Deque[bool] = deque(maxlen=window_size)
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+
+
+class CircuitBreaker:
+    """
+    failure rate circuit breaker keeping one circuit per key (the helper base url), so a
+    breaker can be shared by every helper talking to the same servers.
+
+    closed: calls go through and their outcomes are recorded in a sliding window, the
+        circuit opens when at least minimum_calls are recorded and the failure rate
+        reaches failure_rate_threshold.
+    open: calls fail fast with CircuitOpenError for reset_timeout seconds.
+    half_open: up to half_open_max_calls trial calls go through, a success closes the
+        circuit and a failure opens it again.
+    """
+
+    def __init__(
+        self,
+        failure_rate_threshold: float = 0.5,
+        window_size: int = 20,
+        minimum_calls: int = 10,
+        reset_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        is_failure: Callable[[BaseException], bool] = is_server_failure,
+    ):
+        """
+        :param failure_rate_threshold: failure ratio (0 to 1] of the window that opens the circuit.
+        :param window_size: number of most recent calls the failure rate is computed over.
+        :param minimum_calls: calls needed in the window before the circuit can open.
+        :param reset_timeout: seconds the circuit stays open before a trial call.
+        :param half_open_max_calls: concurrent trial calls allowed while half open.
+        :param is_failure: decides whether an exception counts as a server failure.
+        """
+        if not 0 < failure_rate_threshold <= 1:
+            raise ValueError("failure_rate_threshold must be in (0, 1].")
+        if window_size < 1 or not 1 <= minimum_calls <= window_size:
+            raise ValueError("minimum_calls must be between 1 and window_size.")
+        if reset_timeout <= 0 or half_open_max_calls < 1:
+            raise ValueError(
+                "reset_timeout must be positive and half_open_max_calls >= 1."
+            )
+        self.failure_rate_threshold = failure_rate_threshold
+        self.window_size = window_size
+        self.minimum_calls = minimum_calls
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.is_failure = is_failure
+        self._lock = threading.Lock()
+        self._circuits: Dict[str, _Circuit] = {}
+        self.rejected = 0
+
+    def get_state(self, key: str) -> CircuitState:
+        with self._lock:
+            circuit = self._circuits.get(key)
+            if circuit is None:
+                return CircuitState.closed
+            if (
+                circuit.state == CircuitState.open
+                and time.monotonic() - circuit.opened_at >= self.reset_timeout
+            ):
+                return CircuitState.half_open
+            return circuit.state
+
+    def reset(self, key: Optional[str] = None):
+        with self._lock:
+            if key is None:
+                self._circuits.clear()
+            else:
+                self._circuits.pop(key, None)
+
+    def before_call(self, key: str):
+        """
+        reserve a call on the circuit of key, raises CircuitOpenError if it is not allowed.
+        """
+        with self._lock:
+            circuit = self._circuits.get(key)
+            if circuit is None:
+                circuit = self._circuits[key] = _Circuit(self.window_size)
+            if circuit.state == CircuitState.open:
+                remaining = self.reset_timeout - (time.monotonic() - circuit.opened_at)
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(key, remaining)
+                circuit.state = CircuitState.half_open
+                circuit.half_open_calls = 0
+            if circuit.state == CircuitState.half_open:
+                if circuit.half_open_calls >= self.half_open_max_calls:
+                    self.rejected += 1
+                    raise CircuitOpenError(key, 0.0)
+                circuit.half_open_calls += 1
+
+    def after_call(self, key: str, error: Optional[BaseException] = None):
+        """
+        record the outcome of a call reserved with before_call.
+        """
+        with self._lock:
+            circuit = self._circuits[key]
+            if error is not None and not isinstance(error, Exception):
+                # cancelled / interrupted calls say nothing about the server.
+                if circuit.state == CircuitState.half_open:
+                    circuit.half_open_calls -= 1
+                return
+        failed = error is not None and self.is_failure(error)
+        with self._lock:
+            circuit = self._circuits[key]
+            if circuit.state == CircuitState.half_open:
+                circuit.half_open_calls -= 1
+                if failed:
+                    self._open(circuit)
+                else:
+                    circuit.state = CircuitState.closed
+                    circuit.outcomes.clear()
+                return
+            if circuit.state == CircuitState.open:
+                return
+            circuit.outcomes.append(failed)
+            if (
+                len(circuit.outcomes) >= self.minimum_calls
+                and sum(circuit.outcomes) / len(circuit.outcomes)
+                >= self.failure_rate_threshold
+            ):
+                self._open(circuit)
+
+    def _open(self, circuit: _Circuit):
+        circuit.state = CircuitState.open
+        circuit.opened_at = time.monotonic()
+        circuit.outcomes.clear()
+
+    def call(self, key: str, function: Callable[[], Any]) -> Any:
+        self.before_call(key)
+        try:
+            result = function()
+        except BaseException as e:
+            self.after_call(key, e)
+            raise
+        self.after_call(key)
+        return result
+
+    async def call_async(self, key: str, function: Callable[[], Awaitable[Any]]) -> Any:
+        self.before_call(key)
+        try:
+            result = await function()
+        except BaseException as e:
+            self.after_call(key, e)
+            raise
+        self.after_call(key)
+        return result
+
+
+class DeadlineExceededError(TimeoutError):
+    """
+    raised when the time budget given to call_options(deadline=...) runs out.
+    """
+
+
+class Deadline:
+    """
+    absolute point in (monotonic) time by which a call, retries included, must finish.
+    """
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+class CallOptions(NamedTuple):
+    connect_timeout: Optional[float] = None
+    read_timeout: Optional[float] = None
+    deadline: Optional[Deadline] = None
+
+
+_call_options: ContextVar[CallOptions] = ContextVar(
+    "square_authentication_call_options", default=CallOptions()
+)
+
+
+def get_call_options() -> CallOptions:
+    return _call_options.get()
+
+
+@contextmanager
+def call_options(
+    connect_timeout: Optional[float] = None,
+    read_timeout: Optional[float] = None,
+    timeout: Optional[float] = None,
+    deadline: Optional[float] = None,
+) -> Iterator[CallOptions]:
+    """
+    override timeouts for every helper call made by the current thread / asyncio task
+    inside the block, nested blocks inherit unset values and the earliest deadline.
+
+    :param connect_timeout: seconds to wait for a connection.
+    :param read_timeout: seconds to wait for response data.
+    :param timeout: shorthand for the same connect and read timeout.
+    :param deadline: time budget in seconds for every call in the block, including retries
+        and backoff, attempts get at most the remaining budget as timeout and no retry is
+        started that could not finish in time.
+    """
+    outer = _call_options.get()
+    new_deadline = outer.deadline
+    if deadline is not None:
+        if new_deadline is None or deadline < new_deadline.remaining():
+            new_deadline = Deadline(deadline)
+    options = CallOptions(
+        connect_timeout=next(
+            (
+                v
+                for v in (connect_timeout, timeout, outer.connect_timeout)
+                if v is not None
+            ),
+            None,
+        ),
+        read_timeout=next(
+            (v for v in (read_timeout, timeout, outer.read_timeout) if v is not None),
+            None,
+        ),
+        deadline=new_deadline,
+    )
+    token = _call_options.set(options)
+    try:
+        yield options
+    finally:
+        _call_options.reset(token)
+
+
+def get_attempt_timeout(
+    connect_timeout: Optional[float],
+    read_timeout: Optional[float],
+) -> Optional[Tuple[Optional[float], Optional[float]]]:
+    """
+    (connect, read) timeout of the next attempt: call_options overrides, then the given
+    defaults, both capped by the remaining deadline. none means no timeout.
+    """
+    options = _call_options.get()
+    if options.connect_timeout is not None:
+        connect_timeout = options.connect_timeout
+    if options.read_timeout is not None:
+        read_timeout = options.read_timeout
+    if options.deadline is not None:
+        remaining = options.deadline.remaining()
+        if remaining <= 0:
+            raise DeadlineExceededError(
+                "deadline exceeded before the request was sent."
+            )
+        connect_timeout = min(remaining, connect_timeout or remaining)
+        read_timeout = min(remaining, read_timeout or remaining)
+    if connect_timeout is None and read_timeout is None:
+        return None
+    return connect_timeout, read_timeout
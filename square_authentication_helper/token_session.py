@@ -0,0 +1,188 @@
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from square_authentication_helper.jwt_utils import InvalidTokenError, decode_unverified
+
+__all__ = ["TokenSession", "AsyncTokenSession"]
+
+
+def _get_tokens_from_response(response: Any) -> tuple[Optional[str], Optional[str]]:
+    """
+    pull access / refresh tokens out of a login, register or google login response,
+    as a dict or as a pydantic StandardResponse.
+    """
+    if isinstance(response, dict):
+        main = (response.get("data") or {}).get("main") or {}
+        return main.get("access_token"), main.get("refresh_token")
+    main = response.data.main
+    return getattr(main, "access_token", None), getattr(main, "refresh_token", None)
+
+
+def _get_token_expiry(access_token: Optional[str]) -> Optional[float]:
+    if not access_token:
+        return None
+    try:
+        _, payload = decode_unverified(access_token)
+    except InvalidTokenError:
+        return None
+    expiry = payload.get("exp")
+    if isinstance(expiry, (int, float)):
+        return float(expiry)
+    return None
+
+
+class _TokenState:
+    def __init__(self, refresh_token: str, access_token: Optional[str], margin: float):
+        if not refresh_token:
+            raise ValueError("a refresh token is required to create a token session.")
+        if margin < 0:
+            raise ValueError("refresh_margin must be >= 0.")
+        self.refresh_token = refresh_token
+        self.refresh_margin = margin
+        self.refresh_count = 0
+        self._set_access_token(access_token)
+
+    def _set_access_token(self, access_token: Optional[str]):
+        self.access_token = access_token
+        self.access_token_expiry = _get_token_expiry(access_token)
+
+    def needs_refresh(self) -> bool:
+        if not self.access_token:
+            return True
+        if self.access_token_expiry is None:
+            return False
+        return self.access_token_expiry - self.refresh_margin <= time.time()
+
+    def apply_refresh_response(self, response: Any):
+        access_token, _ = _get_tokens_from_response(response)
+        if not access_token:
+            raise ValueError("generate_access_token_v0 did not return an access token.")
+        self._set_access_token(access_token)
+        self.refresh_count += 1
+
+
+class TokenSession(_TokenState):
+    """
+    keeps a fresh access token for one login, refreshing it through
+    generate_access_token_v0 shortly before it expires.
+
+    concurrent callers share a single refresh (single flight).
+    """
+
+    def __init__(
+        self,
+        helper,
+        refresh_token: str,
+        access_token: Optional[str] = None,
+        refresh_margin: float = 30.0,
+    ):
+        """
+        :param helper: SquareAuthenticationHelper used for refreshes and calls.
+        :param refresh_margin: seconds before exp at which the access token is refreshed.
+        """
+        super().__init__(refresh_token, access_token, refresh_margin)
+        self.helper = helper
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_response(
+        cls, helper, response: Any, refresh_margin: float = 30.0
+    ) -> "TokenSession":
+        """
+        :param response: output of login_username_v0, register_username_v0 or
+            register_login_google_v0, as dict or pydantic model.
+        """
+        access_token, refresh_token = _get_tokens_from_response(response)
+        return cls(helper, refresh_token, access_token, refresh_margin)
+
+    def get_access_token(self) -> str:
+        if not self.needs_refresh():
+            return self.access_token
+        with self._lock:
+            # another caller may have refreshed while this one waited.
+            if self.needs_refresh():
+                self.apply_refresh_response(
+                    self.helper.generate_access_token_v0(
+                        refresh_token=self.refresh_token
+                    )
+                )
+            return self.access_token
+
+    def refresh(self) -> str:
+        """
+        force a refresh, callers forcing one at the same time share it.
+        """
+        refresh_count = self.refresh_count
+        with self._lock:
+            # another caller refreshed while this one waited for the lock.
+            if self.refresh_count == refresh_count:
+                self.apply_refresh_response(
+                    self.helper.generate_access_token_v0(
+                        refresh_token=self.refresh_token
+                    )
+                )
+            return self.access_token
+
+    def call(self, method: str | Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        call a helper method with the current access token.
+
+        :param method: helper method or its name, for example "get_user_details_v0".
+        """
+        if isinstance(method, str):
+            method = getattr(self.helper, method)
+        return method(*args, access_token=self.get_access_token(), **kwargs)
+
+
+class AsyncTokenSession(_TokenState):
+    """
+    asyncio counterpart of TokenSession for AsyncSquareAuthenticationHelper.
+    """
+
+    def __init__(
+        self,
+        helper,
+        refresh_token: str,
+        access_token: Optional[str] = None,
+        refresh_margin: float = 30.0,
+    ):
+        super().__init__(refresh_token, access_token, refresh_margin)
+        self.helper = helper
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def from_response(
+        cls, helper, response: Any, refresh_margin: float = 30.0
+    ) -> "AsyncTokenSession":
+        access_token, refresh_token = _get_tokens_from_response(response)
+        return cls(helper, refresh_token, access_token, refresh_margin)
+
+    async def get_access_token(self) -> str:
+        if not self.needs_refresh():
+            return self.access_token
+        async with self._lock:
+            if self.needs_refresh():
+                self.apply_refresh_response(
+                    await self.helper.generate_access_token_v0(
+                        refresh_token=self.refresh_token
+                    )
+                )
+            return self.access_token
+
+    async def refresh(self) -> str:
+        refresh_count = self.refresh_count
+        async with self._lock:
+            if self.refresh_count == refresh_count:
+                self.apply_refresh_response(
+                    await self.helper.generate_access_token_v0(
+                        refresh_token=self.refresh_token
+                    )
+                )
+            return self.access_token
+
+    async def call(self, method: str | Callable[..., Any], *args, **kwargs) -> Any:
+        if isinstance(method, str):
+            method = getattr(self.helper, method)
+        return await method(*args, access_token=await self.get_access_token(), **kwargs)
@@ -0,0 +1,509 @@
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Literal, Optional, Tuple
+from urllib.parse import quote, unquote, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+
+UNIX_SCHEME = "unix://"
+_REQUESTS_UNIX_SCHEME = "http+unix://"
+
+
+def split_unix_url(
+    url: str, endpoint: Optional[str] = None
+) -> Tuple[Optional[str], str]:
+    """
+    (socket path, request path) for a unix:///path/to.sock base url, (none, full url)
+    for anything else.
+    """
+    if not url.startswith(UNIX_SCHEME):
+        if endpoint:
+            url = f"{url.rstrip('/')}/{endpoint.lstrip('/')}"
+        return None, url
+    return url[len(UNIX_SCHEME) :].rstrip("/"), "/" + (endpoint or "").lstrip("/")
+
+
+class _UnixHTTPConnection(HTTPConnection):
+    def __init__(self, *args, socket_path: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.socket_path = socket_path
+
+    def _new_conn(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        timeout = self.timeout
+        sock.settimeout(
+            timeout if isinstance(timeout, (int, float)) else socket.getdefaulttimeout()
+        )
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+
+class _UnixHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _UnixHTTPConnection
+
+
+class _UnixSocketAdapter(HTTPAdapter):
+    """
+    requests adapter for http+unix://<quoted socket path>/... urls, one keep-alive pool
+    per socket path.
+    """
+
+    def __init__(self, pool_maxsize: int):
+        super().__init__(pool_maxsize=pool_maxsize)
+        self._int_pool_maxsize = pool_maxsize
+        self._lock = threading.Lock()
+        self._pools: Dict[str, _UnixHTTPConnectionPool] = {}
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        return self.get_connection(request.url, proxies)
+
+    def get_connection(self, url, proxies=None):
+        socket_path = unquote(urlsplit(url).netloc)
+        with self._lock:
+            pool = self._pools.get(socket_path)
+            if pool is None:
+                pool = self._pools[socket_path] = _UnixHTTPConnectionPool(
+                    "localhost",
+                    maxsize=self._int_pool_maxsize,
+                    socket_path=socket_path,
+                )
+            return pool
+
+    def request_url(self, request, proxies):
+        return request.path_url
+
+    def close(self):
+        with self._lock:
+            for pool in self._pools.values():
+                pool.close()
+            self._pools.clear()
+        super().close()
+
+
+def read_response(response, return_type: str) -> Any:
+    """
+    body of a requests / httpx response in the form asked for by return_type.
+    """
+    response.raise_for_status()
+
+    if return_type == "json":
+        return response.json()
+    elif return_type == "bytes":
+        return response.content
+    elif return_type == "response":
+        return response
+    else:
+        return response.text
+
+
+# httpcore trace steps -> timing names, tcp connects include the dns lookup.
+_TRACE_STEPS = {
+    "connection.connect_tcp": "connect",
+    "connection.connect_unix_socket": "connect",
+    "connection.start_tls": "tls",
+    "http11.receive_response_headers": "first_byte",
+    "http2.receive_response_headers": "first_byte",
+}
+
+
+class _TraceRecorder:
+    """
+    httpx trace extension filling timings with the connect / tls durations of a new
+    connection and the seconds until the response headers arrived.
+    """
+
+    def __init__(self, timings: Dict[str, float]):
+        self.timings = timings
+        self.start = time.perf_counter()
+        self._started: Dict[str, float] = {}
+
+    def __call__(self, event_name: str, info: dict):
+        step, _, event = event_name.rpartition(".")
+        name = _TRACE_STEPS.get(step)
+        if name is None:
+            return
+        now = time.perf_counter()
+        if event == "started":
+            self._started[step] = now
+        elif event == "complete":
+            since = self.start if name == "first_byte" else self._started.get(step, now)
+            self.timings[name] = now - since
+
+    async def record_async(self, event_name: str, info: dict):
+        self(event_name, info)
+
+
+class PooledTransport:
+    """
+    keep-alive connection pool shared by every call made through one helper.
+
+    mirrors square_commons.api_utils.make_request, but sends through a single
+    requests.Session so sockets (and tls sessions) are reused between calls.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        idle_timeout: Optional[float] = None,
+    ):
+        """
+        :param pool_connections: number of per-host pools to keep.
+        :param pool_maxsize: max connections kept alive per host.
+        :param idle_timeout: seconds after which an unused pool is dropped and
+            re-opened on the next call, none to keep sockets open indefinitely.
+        """
+        if pool_connections < 1 or pool_maxsize < 1:
+            raise ValueError("pool_connections and pool_maxsize must be >= 1.")
+        if idle_timeout is not None and idle_timeout <= 0:
+            raise ValueError("idle_timeout must be positive.")
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._float_last_used = time.monotonic()
+        self._closed = False
+        self.session = self._create_session()
+
+    def _create_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.mount(_REQUESTS_UNIX_SCHEME, _UnixSocketAdapter(self.pool_maxsize))
+        return session
+
+    def _drop_idle_connections(self):
+        if self.idle_timeout is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now - self._float_last_used > self.idle_timeout:
+                # clears the pool managers, the session itself stays usable.
+                self.session.close()
+            self._float_last_used = now
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        endpoint: Optional[str] = None,
+        json: Optional[Any] = None,
+        data: Optional[Any] = None,
+        params: Optional[dict] = None,
+        headers: Optional[dict] = None,
+        files: Optional[dict] = None,
+        timeout: Optional[Any] = None,
+        return_type: Literal["json", "text", "bytes", "response"] = "json",
+        timings: Optional[Dict[str, float]] = None,
+    ) -> Any:
+        """
+        :param timings: dict to record the seconds until the response headers arrived
+            in (first_byte), requests does not expose connect / tls durations.
+        """
+        if self._closed:
+            raise RuntimeError("transport is closed.")
+        if headers:
+            headers = {key.replace("_", "-"): value for key, value in headers.items()}
+        socket_path, url = split_unix_url(url, endpoint)
+        if socket_path is not None:
+            url = _REQUESTS_UNIX_SCHEME + quote(socket_path, safe="") + url
+        self._drop_idle_connections()
+        try:
+            response = self.session.request(
+                method,
+                url,
+                json=json,
+                data=data,
+                params=params,
+                headers=headers,
+                files=files,
+                timeout=timeout,
+            )
+            if timings is not None:
+                timings["first_byte"] = response.elapsed.total_seconds()
+            return read_response(response, return_type)
+        except Exception:
+            raise
+
+    def close(self):
+        self._closed = True
+        self.session.close()
+
+
+def _prepare_httpx_arguments(
+    headers: Optional[dict], params: Optional[dict], timeout: Optional[Any]
+) -> Tuple[Optional[dict], Optional[dict], Optional[Any]]:
+    if headers:
+        headers = {key.replace("_", "-"): value for key, value in headers.items()}
+    # requests silently drops none values, httpx would send them as empty strings.
+    if params:
+        params = {key: value for key, value in params.items() if value is not None}
+    # (connect, read) tuples as used by requests.
+    if isinstance(timeout, tuple):
+        import httpx
+
+        connect_timeout, read_timeout = timeout
+        timeout = httpx.Timeout(
+            connect=connect_timeout,
+            read=read_timeout,
+            write=read_timeout,
+            pool=connect_timeout,
+        )
+    return headers, params, timeout
+
+
+class _HttpxClients:
+    """
+    the httpx clients of one transport, picked by target.
+
+    unix sockets are bound per client, and with http2 plain http targets need http/2 with
+    prior knowledge (h2c, there is no alpn without tls) while https targets negotiate it
+    and fall back to http/1.1, so each kind gets its own client and connection pool.
+    """
+
+    def __init__(self, client_class, transport_class, limits, http2: bool):
+        self.client_class = client_class
+        self.transport_class = transport_class
+        self.limits = limits
+        self.http2 = http2
+        self._lock = threading.Lock()
+        self.default = self._create(http1=True)
+        self._clients: Dict[Tuple[str, Optional[str]], Any] = {}
+
+    def _create(self, http1: bool, uds: Optional[str] = None):
+        return self.client_class(
+            transport=self.transport_class(
+                http1=http1, http2=self.http2, limits=self.limits, uds=uds
+            ),
+            timeout=None,
+        )
+
+    def get(self, url: str, endpoint: Optional[str]) -> Tuple[Any, str]:
+        """
+        (client, url to send) for a request to endpoint under base url.
+        """
+        socket_path, url = split_unix_url(url, endpoint)
+        if socket_path is not None:
+            key = ("unix", socket_path)
+            url = "http://localhost" + url
+        elif self.http2 and url.startswith("http://"):
+            key = ("h2c", None)
+        else:
+            return self.default, url
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._clients[key] = self._create(
+                        http1=not self.http2, uds=socket_path
+                    )
+        return client, url
+
+    def all(self) -> List[Any]:
+        with self._lock:
+            return [self.default, *self._clients.values()]
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+
+class Http2Transport:
+    """
+    alternative to PooledTransport backed by an httpx.Client with http/2 enabled, so
+    concurrent calls from many threads are multiplexed over one connection per server.
+
+    https urls negotiate http/2 (falling back to http/1.1), plain http and unix socket
+    urls use it with prior knowledge, so the server or a proxy in front of it must speak
+    http/2 there. needs the h2 package (pip install square_authentication_helper[http2]).
+    """
+
+    def __init__(self, pool_maxsize: int = 10, idle_timeout: Optional[float] = None):
+        """
+        :param pool_maxsize: max connections per server, mostly relevant to http/1.1
+            fallbacks since http/2 calls share one connection.
+        :param idle_timeout: seconds an idle connection is kept alive, none for no limit.
+        """
+        import httpx
+
+        if pool_maxsize < 1:
+            raise ValueError("pool_maxsize must be >= 1.")
+        if idle_timeout is not None and idle_timeout <= 0:
+            raise ValueError("idle_timeout must be positive.")
+        self.pool_maxsize = pool_maxsize
+        self.idle_timeout = idle_timeout
+        self.http2 = True
+        self._closed = False
+        self.clients = _HttpxClients(
+            httpx.Client,
+            httpx.HTTPTransport,
+            httpx.Limits(
+                max_connections=pool_maxsize,
+                max_keepalive_connections=pool_maxsize,
+                keepalive_expiry=idle_timeout,
+            ),
+            http2=True,
+        )
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        endpoint: Optional[str] = None,
+        json: Optional[Any] = None,
+        data: Optional[Any] = None,
+        params: Optional[dict] = None,
+        headers: Optional[dict] = None,
+        files: Optional[dict] = None,
+        timeout: Optional[Any] = None,
+        return_type: Literal["json", "text", "bytes", "response"] = "json",
+        timings: Optional[Dict[str, float]] = None,
+    ) -> Any:
+        """
+        :param timings: dict to record connect (dns included) and tls durations of a new
+            connection and the seconds until the response headers arrived (first_byte) in.
+        """
+        if self._closed:
+            raise RuntimeError("transport is closed.")
+        headers, params, timeout = _prepare_httpx_arguments(headers, params, timeout)
+        client, url = self.clients.get(url, endpoint)
+        try:
+            response = client.request(
+                method,
+                url,
+                json=json,
+                data=data,
+                params=params,
+                headers=headers,
+                files=files,
+                timeout=timeout,
+                extensions=(
+                    None if timings is None else {"trace": _TraceRecorder(timings)}
+                ),
+            )
+            return read_response(response, return_type)
+        except Exception:
+            raise
+
+    def close(self):
+        self._closed = True
+        for client in self.clients.all():
+            client.close()
+        self.clients.clear()
+
+
+class AsyncPooledTransport:
+    """
+    non-blocking counterpart of PooledTransport, backed by a single httpx.AsyncClient.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        idle_timeout: Optional[float] = 5.0,
+        http2: bool = False,
+    ):
+        """
+        :param max_connections: max concurrent connections (in-flight calls).
+        :param max_keepalive_connections: max idle connections kept alive.
+        :param idle_timeout: seconds an idle connection is kept alive, none for no limit.
+        :param http2: multiplex concurrent calls over one http/2 connection per server,
+            see Http2Transport. needs the h2 package.
+        """
+        import httpx
+
+        if max_connections < 1 or max_keepalive_connections < 0:
+            raise ValueError(
+                "max_connections must be >= 1 and max_keepalive_connections >= 0."
+            )
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.idle_timeout = idle_timeout
+        self.http2 = http2
+        self.clients = _HttpxClients(
+            httpx.AsyncClient,
+            httpx.AsyncHTTPTransport,
+            httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=idle_timeout,
+            ),
+            http2=http2,
+        )
+
+    @property
+    def client(self):
+        return self.clients.default
+
+    @property
+    def closed(self) -> bool:
+        return self.client.is_closed
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        endpoint: Optional[str] = None,
+        json: Optional[Any] = None,
+        data: Optional[Any] = None,
+        params: Optional[dict] = None,
+        headers: Optional[dict] = None,
+        files: Optional[dict] = None,
+        timeout: Optional[Any] = None,
+        return_type: Literal["json", "text", "bytes", "response"] = "json",
+        timings: Optional[Dict[str, float]] = None,
+    ) -> Any:
+        """
+        :param timings: dict to record connect (dns included) and tls durations of a new
+            connection and the seconds until the response headers arrived (first_byte) in.
+        """
+        if self.closed:
+            raise RuntimeError("transport is closed.")
+        headers, params, timeout = _prepare_httpx_arguments(headers, params, timeout)
+        client, url = self.clients.get(url, endpoint)
+        try:
+            response = await client.request(
+                method,
+                url,
+                json=json,
+                data=data,
+                params=params,
+                headers=headers,
+                files=files,
+                timeout=timeout,
+                extensions=(
+                    None
+                    if timings is None
+                    else {"trace": _TraceRecorder(timings).record_async}
+                ),
+            )
+            return read_response(response, return_type)
+        except Exception:
+            raise
+
+    async def close(self):
+        for client in self.clients.all():
+            await client.aclose()
+        self.clients.clear()
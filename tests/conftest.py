@@ -0,0 +1,113 @@
+import json
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+def _respond_empty(request):
+    return {"data": {"main": {}}, "message": None, "log": None}
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """
+    answers every request with the json of server.respond(self) after server.latency
+    seconds, the next server.failures requests get a 503 with the same body.
+    """
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        # the request body, for respond.
+        self.body = self.rfile.read(length) if length else b""
+        with self.server.lock:
+            self.server.requests += 1
+            fail = self.server.failures > 0
+            if fail:
+                self.server.failures -= 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        payload = json.dumps(self.server.respond(self)).encode()
+        self.send_response(503 if fail else 200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PATCH = do_DELETE = _reply
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _UnixStubHandler(_StubHandler):
+    # TCP_NODELAY does not exist on unix sockets.
+    disable_nagle_algorithm = False
+
+
+class _StubServerMixin:
+    daemon_threads = True
+    # several clients connecting at once must not overflow the listen backlog.
+    request_queue_size = 128
+
+    def _init_stub(self, respond, latency):
+        self.respond = respond or _respond_empty
+        self.latency = latency
+        self.failures = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+
+
+class StubServer(_StubServerMixin, ThreadingHTTPServer):
+    def __init__(self, respond=None, latency=0.0):
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self._init_stub(respond, latency)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class UnixStubServer(_StubServerMixin, socketserver.ThreadingUnixStreamServer):
+    def __init__(self, socket_path, respond=None, latency=0.0):
+        super().__init__(socket_path, _UnixStubHandler)
+        self._init_stub(respond, latency)
+
+    @property
+    def url(self):
+        return f"unix://{self.server_address}"
+
+
+@pytest.fixture
+def stub_server_factory(tmp_path):
+    """
+    start a local stub server, stub_server_factory(respond, latency, unix_socket):
+    respond(request_handler) returns the json body (default an empty standard
+    response), set server.failures to fail the next requests with a 503.
+    """
+    servers = []
+
+    def start(respond=None, latency=0.0, unix_socket=False):
+        if unix_socket:
+            server = UnixStubServer(
+                str(tmp_path / f"auth_{len(servers)}.sock"), respond, latency
+            )
+        else:
+            server = StubServer(respond, latency)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def stub_server(stub_server_factory):
+    return stub_server_factory()
@@ -0,0 +1,145 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from square_authentication_helper.async_main import AsyncSquareAuthenticationHelper
+from square_authentication_helper.pydantic_models import TokenType
+from square_authentication_helper.transport import AsyncPooledTransport
+
+
+def _echo_path(request):
+    return {"data": {"main": {"path": request.path}}, "message": None, "log": None}
+
+
+@pytest.fixture
+def local_server(stub_server_factory):
+    return stub_server_factory(_echo_path)
+
+
+class TestAsyncSquareAuthenticationHelperInit:
+    """Test initialization of AsyncSquareAuthenticationHelper"""
+
+    def test_init_default_parameters(self):
+        """Test initialization with default parameters"""
+        helper = AsyncSquareAuthenticationHelper()
+        assert (
+            helper.global_str_square_authentication_url_base == "http://localhost:10011"
+        )
+        assert helper.global_transport.max_connections == 100
+
+    def test_context_manager_closes_transport(self):
+        """Test leaving the async context manager closes the connection pool"""
+
+        async def run():
+            async with AsyncSquareAuthenticationHelper() as helper:
+                assert not helper.global_transport.closed
+            return helper
+
+        helper = asyncio.run(run())
+        assert helper.global_transport.closed
+
+
+class TestAsyncMethods:
+    """Test awaitable helper methods"""
+
+    @patch.object(
+        AsyncSquareAuthenticationHelper, "_make_request", new_callable=AsyncMock
+    )
+    def test_login_username_v0(self, mock_request):
+        """Test async login builds the same request as the sync helper"""
+        mock_request.return_value = {"access_token": "abc123"}
+        helper = AsyncSquareAuthenticationHelper()
+
+        result = asyncio.run(
+            helper.login_username_v0(username="testuser", password="pw", app_id=1)
+        )
+
+        mock_request.assert_awaited_once_with(
+            method="POST",
+            endpoint="login_username/v0",
+            json={
+                "username": "testuser",
+                "password": "pw",
+                "app_id": 1,
+                "assign_app_id_if_missing": False,
+            },
+        )
+        assert result == {"access_token": "abc123"}
+
+    @patch.object(
+        AsyncSquareAuthenticationHelper, "_make_request", new_callable=AsyncMock
+    )
+    def test_validate_and_get_payload_from_token_v0_pydantic(self, mock_request):
+        """Test async token validation returns a pydantic model when asked"""
+        mock_request.return_value = (
+            b'{"data": {"main": {"user_id": "u1"}}, "message": null, "log": null}'
+        )
+        helper = AsyncSquareAuthenticationHelper()
+
+        result = asyncio.run(
+            helper.validate_and_get_payload_from_token_v0(
+                token="t",
+                token_type=TokenType.access_token,
+                app_id=1,
+                response_as_pydantic=True,
+            )
+        )
+
+        assert result.data.main == {"user_id": "u1"}
+
+    @patch.object(
+        AsyncSquareAuthenticationHelper, "_make_request", new_callable=AsyncMock
+    )
+    def test_exception_propagates(self, mock_request):
+        """Test async methods re-raise request errors"""
+        mock_request.side_effect = Exception("Request failed")
+        helper = AsyncSquareAuthenticationHelper()
+
+        with pytest.raises(Exception):
+            asyncio.run(helper.get_user_details_v0(access_token="a"))
+
+
+class TestAsyncPooledTransport:
+    """Test the httpx backed transport"""
+
+    def test_concurrent_calls_share_pool(self, local_server):
+        """Test many in-flight calls complete over a bounded pool"""
+        host, port = local_server.server_address
+
+        async def run():
+            async with AsyncSquareAuthenticationHelper(
+                param_int_square_authentication_port=port,
+                param_str_square_authentication_ip=host,
+                param_int_max_connections=8,
+            ) as helper:
+                return await asyncio.gather(
+                    *(
+                        helper.get_user_recovery_methods_v0(username=f"user{i}")
+                        for i in range(50)
+                    )
+                )
+
+        results = asyncio.run(run())
+        assert len(results) == 50
+        assert results[7]["data"]["main"]["path"] == (
+            "/get_user_recovery_methods/v0?username=user7"
+        )
+
+    def test_none_params_are_dropped(self, local_server):
+        """Test none params are omitted like requests does"""
+        host, port = local_server.server_address
+
+        async def run():
+            transport = AsyncPooledTransport()
+            try:
+                return await transport.request(
+                    method="GET",
+                    url=f"http://{host}:{port}",
+                    endpoint="echo",
+                    params={"a": 1, "b": None},
+                )
+            finally:
+                await transport.close()
+
+        result = asyncio.run(run())
+        assert result["data"]["main"]["path"] == "/echo?a=1"
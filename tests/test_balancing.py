@@ -0,0 +1,124 @@
+import socket
+import time
+from collections import Counter
+
+import pytest
+import requests
+from square_authentication_helper.balancing import BalancingStrategy, EndpointBalancer
+from square_authentication_helper.main import SquareAuthenticationHelper
+from square_authentication_helper.resilience import RetryPolicy
+
+
+@pytest.fixture
+def replicas(stub_server_factory):
+    servers = [
+        stub_server_factory(lambda request, name=name: {"data": {"main": name}})
+        for name in ("a", "b")
+    ]
+    return [server.url for server in servers]
+
+
+def _unused_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TestEndpointBalancer:
+    """Test endpoint selection, ejection and re-probing"""
+
+    def test_prefers_lower_latency(self):
+        balancer = EndpointBalancer(
+            ["http://a", "http://b"], strategy=BalancingStrategy.least_latency
+        )
+        balancer.call("http://a", lambda: time.sleep(0.02))
+        balancer.call("http://b", lambda: None)
+        assert Counter(balancer.pick() for _ in range(20)) == {"http://b": 20}
+
+    def test_power_of_two_choices_spreads_load(self):
+        balancer = EndpointBalancer([f"http://{i}" for i in range(4)])
+        for url in balancer.endpoints:
+            balancer.acquire(url)
+            balancer.release(url, 0.01)
+        assert len({balancer.pick() for _ in range(100)}) > 1
+
+    def test_ejection_and_reprobe(self):
+        balancer = EndpointBalancer(
+            ["http://a", "http://b"], max_consecutive_failures=2, ejection_time=0.05
+        )
+
+        def fail():
+            raise requests.ConnectionError()
+
+        for _ in range(2):
+            with pytest.raises(requests.ConnectionError):
+                balancer.call("http://a", fail)
+        assert balancer.is_ejected("http://a")
+        assert {balancer.pick() for _ in range(20)} == {"http://b"}
+
+        time.sleep(0.06)
+        balancer.acquire("http://b")
+        # ejection is over, a is probed again.
+        assert balancer.pick(exclude={"http://b"}) == "http://a"
+        balancer.call("http://a", lambda: None)
+        assert not balancer.is_ejected("http://a")
+
+    def test_concurrent_picks_probe_once(self):
+        """Test only one pick gets an ejected endpoint until its probe finishes"""
+        balancer = EndpointBalancer(
+            ["http://a", "http://b"],
+            strategy=BalancingStrategy.least_latency,
+            max_consecutive_failures=1,
+            ejection_time=0.01,
+        )
+
+        def fail():
+            raise requests.ConnectionError()
+
+        balancer.call("http://b", lambda: time.sleep(0.01))
+        with pytest.raises(requests.ConnectionError):
+            balancer.call("http://a", fail)
+        time.sleep(0.02)
+
+        # a never answered, so it is the cheapest, but only the first pick probes it.
+        assert [balancer.pick() for _ in range(3)] == ["http://a"] + ["http://b"] * 2
+        balancer.call("http://a", lambda: None)
+        assert not balancer.is_ejected("http://a")
+        assert balancer.pick() == "http://a"
+
+    def test_client_errors_do_not_eject(self):
+        balancer = EndpointBalancer(["http://a"], max_consecutive_failures=1)
+        with pytest.raises(ValueError):
+            balancer.call("http://a", lambda: int("x"))
+        assert not balancer.is_ejected("http://a")
+
+    def test_requires_endpoints(self):
+        with pytest.raises(ValueError):
+            EndpointBalancer([])
+
+
+class TestHelperBalancing:
+    """Test the helper with several replicas"""
+
+    def test_requests_spread_over_replicas(self, replicas):
+        helper = SquareAuthenticationHelper(
+            param_list_str_square_authentication_endpoints=replicas
+        )
+        served_by = Counter(
+            helper.get_user_details_v0(access_token="t")["data"]["main"]
+            for _ in range(40)
+        )
+        helper.close()
+        assert set(served_by) == {"a", "b"}
+
+    def test_failover_to_healthy_replica(self, replicas):
+        """Test retries move to another replica and the dead one is ejected"""
+        dead = f"http://127.0.0.1:{_unused_port()}"
+        helper = SquareAuthenticationHelper(
+            param_list_str_square_authentication_endpoints=[dead, replicas[0]],
+            param_retry_policy=RetryPolicy(base_delay=0, max_attempts=2),
+        )
+        for _ in range(10):
+            assert helper.get_user_details_v0(access_token="t")["data"]["main"] == "a"
+        helper.close()
+        assert helper.global_endpoint_balancer.stats()[dead]["failures"] <= 3
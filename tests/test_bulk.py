@@ -0,0 +1,238 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from square_authentication_helper.async_main import AsyncSquareAuthenticationHelper
+from square_authentication_helper.bulk import BulkStats, run_bulk, run_bulk_async
+from square_authentication_helper.cache import TTLCache
+from square_authentication_helper.main import SquareAuthenticationHelper
+from square_authentication_helper.pydantic_models import TokenType
+
+
+def _validate(method, endpoint, headers, params, **kwargs):
+    if headers["token"].startswith("bad"):
+        raise Exception("invalid token")
+    return {"data": {"main": {"token": headers["token"]}}, "message": None, "log": None}
+
+
+@pytest.fixture
+def slow_server(stub_server_factory):
+    return stub_server_factory(latency=0.05)
+
+
+class TestValidateTokensBulk:
+    """Test bulk token validation"""
+
+    @patch.object(SquareAuthenticationHelper, "_make_request", side_effect=_validate)
+    def test_results_in_input_order_with_errors(self, mock_request):
+        """Test every token gets a result in input order and errors are not raised"""
+        tokens = ["t1", "bad1", "t2", "t1"]
+        results = SquareAuthenticationHelper().validate_tokens_bulk(
+            tokens, TokenType.access_token, app_id=1
+        )
+        assert [result.token for result in results] == tokens
+        assert [result.ok for result in results] == [True, False, True, True]
+        assert results[0].response["data"]["main"]["token"] == "t1"
+        assert str(results[1].error) == "invalid token"
+        # the duplicate token is validated once.
+        assert mock_request.call_count == 3
+
+    @patch.object(SquareAuthenticationHelper, "_make_request", side_effect=_validate)
+    def test_uses_validation_cache(self, mock_request):
+        """Test cached tokens are not sent again"""
+        helper = SquareAuthenticationHelper(param_validation_cache=TTLCache(ttl=30))
+        helper.validate_and_get_payload_from_token_v0(
+            token="t1", token_type=TokenType.access_token, app_id=1
+        )
+        helper.validate_tokens_bulk(["t1", "t2"], TokenType.access_token, app_id=1)
+        assert mock_request.call_count == 2
+
+    def test_empty_and_invalid_concurrency(self):
+        helper = SquareAuthenticationHelper()
+        assert helper.validate_tokens_bulk([], TokenType.access_token, app_id=1) == []
+        with pytest.raises(ValueError):
+            helper.validate_tokens_bulk(
+                ["t"], TokenType.access_token, app_id=1, max_concurrency=0
+            )
+
+    def test_runs_concurrently(self, slow_server):
+        """Test requests against a slow server overlap"""
+        helper = SquareAuthenticationHelper(
+            param_int_square_authentication_port=slow_server.server_address[1],
+            param_str_square_authentication_ip="127.0.0.1",
+        )
+        tokens = [f"t{i}" for i in range(20)]
+        start = time.perf_counter()
+        results = helper.validate_tokens_bulk(
+            tokens, TokenType.access_token, app_id=1, max_concurrency=10
+        )
+        elapsed = time.perf_counter() - start
+        helper.close()
+        assert all(result.ok for result in results)
+        # 20 sequential calls take at least 1s.
+        assert elapsed < 0.9
+
+    def test_async_results_in_input_order(self):
+        """Test the asyncio helper keeps input order and per item errors"""
+
+        async def validate(method, endpoint, headers, params, **kwargs):
+            await asyncio.sleep(0.01 if headers["token"] == "t1" else 0)
+            return _validate(method, endpoint, headers, params)
+
+        tokens = ["t1", "bad", "t2"]
+        with patch.object(
+            AsyncSquareAuthenticationHelper, "_make_request", side_effect=validate
+        ):
+            results = asyncio.run(
+                AsyncSquareAuthenticationHelper().validate_tokens_bulk(
+                    tokens, TokenType.access_token, app_id=1, max_concurrency=2
+                )
+            )
+        assert [result.token for result in results] == tokens
+        assert [result.ok for result in results] == [True, False, True]
+
+    def test_async_default_concurrency_without_keepalive(self):
+        """Test the default limit follows max_connections, not the keep-alive pool"""
+
+        async def validate(method, endpoint, headers, params, **kwargs):
+            return _validate(method, endpoint, headers, params)
+
+        async def run():
+            helper = AsyncSquareAuthenticationHelper(
+                param_int_max_keepalive_connections=0
+            )
+            return await asyncio.wait_for(
+                helper.validate_tokens_bulk(["t1", "t2"], TokenType.access_token, 1),
+                timeout=5,
+            )
+
+        with patch.object(
+            AsyncSquareAuthenticationHelper, "_make_request", side_effect=validate
+        ):
+            results = asyncio.run(run())
+        assert [result.ok for result in results] == [True, True]
+
+
+class _ConcurrencyProbe:
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+    def __call__(self, user_id):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            if user_id % 7 == 0:
+                raise Exception(f"failed {user_id}")
+            return {"user_id": user_id}
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+class TestRunBulk:
+    """Test the bounded thread pool fan-out"""
+
+    def test_all_items_streamed_with_errors(self):
+        """Test every item yields one result and failures are returned"""
+        probe = _ConcurrencyProbe()
+        stats = BulkStats()
+        results = list(
+            run_bulk(
+                probe,
+                ({"user_id": i} for i in range(50)),
+                max_concurrency=5,
+                stats=stats,
+            )
+        )
+        assert sorted(result.index for result in results) == list(range(50))
+        failed = [result for result in results if not result.ok]
+        assert {result.kwargs["user_id"] for result in failed} == set(range(0, 50, 7))
+        assert probe.max_active == 5
+        assert stats.succeeded == 42 and stats.failed == 8 and stats.in_flight == 0
+        assert stats.throughput > 0
+
+    def test_back_pressure(self):
+        """Test the input is read at most max_pending items ahead of the consumer"""
+        pulled = []
+
+        def items():
+            for i in range(1000):
+                pulled.append(i)
+                yield {"user_id": i + 1}
+
+        results = run_bulk(
+            lambda user_id: user_id, items(), max_concurrency=2, max_pending=4
+        )
+        next(results)
+        assert len(pulled) <= 5
+        results.close()
+        assert len(pulled) < 1000
+
+    def test_progress_callback(self):
+        reports = []
+        list(
+            run_bulk(
+                lambda user_id: user_id,
+                [{"user_id": 1}],
+                progress_callback=lambda stats: reports.append(stats.completed),
+            )
+        )
+        assert reports[-1] == 1
+
+    def test_invalid_limits(self):
+        with pytest.raises(ValueError):
+            list(run_bulk(print, [], max_concurrency=0))
+        with pytest.raises(ValueError):
+            list(run_bulk(print, [], max_concurrency=4, max_pending=2))
+
+    @patch.object(SquareAuthenticationHelper, "_make_request", return_value={})
+    def test_helper_method(self, mock_request):
+        """Test a helper *_v0 method can be fanned out directly"""
+        helper = SquareAuthenticationHelper()
+        results = list(
+            run_bulk(
+                helper.logout_all_v0, [{"access_token": f"t{i}"} for i in range(3)]
+            )
+        )
+        assert all(result.ok for result in results)
+        assert mock_request.call_count == 3
+
+
+class TestRunBulkAsync:
+    """Test the asyncio fan-out"""
+
+    def test_bounded_concurrency_and_errors(self):
+        active = 0
+        max_active = 0
+
+        async def function(user_id):
+            nonlocal active, max_active
+            active += 1
+            max_active = max(max_active, active)
+            await asyncio.sleep(0.001 * (user_id % 3))
+            active -= 1
+            if user_id == 3:
+                raise Exception("failed")
+            return user_id
+
+        async def items():
+            for i in range(30):
+                yield {"user_id": i}
+
+        async def run():
+            return [
+                result
+                async for result in run_bulk_async(function, items(), max_concurrency=4)
+            ]
+
+        results = asyncio.run(run())
+        assert sorted(result.index for result in results) == list(range(30))
+        assert [result.index for result in results if not result.ok] == [3]
+        assert max_active == 4
@@ -0,0 +1,247 @@
+import time
+from unittest.mock import patch
+
+import pytest
+from square_authentication_helper.cache import (
+    TTLCache,
+    UserDetailsCache,
+    get_payload_expiry,
+)
+from square_authentication_helper.main import SquareAuthenticationHelper
+from square_authentication_helper.pydantic_models import TokenType
+from square_authentication_helper.transport import PooledTransport
+
+
+def _user_details(user_id):
+    return {"data": {"main": {"user_id": user_id}}, "message": None, "log": None}
+
+
+class TestTTLCache:
+    """Test the bounded ttl / lru cache"""
+
+    def test_hit_and_miss_counters(self):
+        """Test lookups update hit and miss counters"""
+        cache = TTLCache(ttl=60)
+        assert cache.get("a") is None
+        cache.set("a", {"x": 1})
+        assert cache.get("a") == {"x": 1}
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+        assert cache.stats()["hit_ratio"] == 0.5
+
+    def test_ttl_expiry(self):
+        """Test entries expire after the configured ttl"""
+        cache = TTLCache(ttl=0.01)
+        cache.set("a", 1)
+        time.sleep(0.02)
+        assert cache.get("a") is None
+        assert cache.expirations == 1
+        assert len(cache) == 0
+
+    def test_expires_at_caps_ttl(self):
+        """Test an earlier expires_at wins over the ttl"""
+        cache = TTLCache(ttl=60)
+        cache.set("a", 1, expires_at=time.time() + 0.01)
+        time.sleep(0.02)
+        assert cache.get("a") is None
+
+    def test_already_expired_value_not_stored(self):
+        """Test values past their expiry are never stored"""
+        cache = TTLCache(ttl=60)
+        cache.set("a", 1, expires_at=time.time() - 1)
+        assert len(cache) == 0
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted first"""
+        cache = TTLCache(ttl=60, max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert "a" in cache
+        assert "b" not in cache
+        assert cache.evictions == 1
+
+    def test_memory_cap(self):
+        """Test entries are evicted to stay under max_bytes"""
+        cache = TTLCache(ttl=60, max_bytes=100, sizeof=lambda key, value: 40)
+        for key in "abcd":
+            cache.set(key, key)
+        assert len(cache) == 2
+        assert cache.total_bytes == 80
+
+    def test_size_only_measured_with_a_cap(self):
+        """Test sizeof is not called without max_bytes"""
+        sizes = []
+        cache = TTLCache(ttl=60, sizeof=lambda key, value: sizes.append(key) or 1)
+        cache.set("a", 1)
+        assert sizes == [] and cache.get("a") == 1
+
+    def test_oversized_replacement_evicts_the_old_value(self):
+        """Test a value over the cap does not leave the previous one cached"""
+        cache = TTLCache(ttl=60, max_bytes=10, sizeof=lambda key, value: len(value))
+        cache.set("a", "small")
+        cache.set("a", "far too large")
+        assert cache.get("a") is None
+        assert cache.total_bytes == 0
+
+    def test_stale_window(self):
+        """Test expired entries stay available to get_stale for stale_ttl"""
+        cache = TTLCache(ttl=0.01, stale_ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2, expires_at=time.time() + 0.02)
+        time.sleep(0.03)
+        assert cache.get("a") is None
+        assert cache.get_stale("a") == 1
+        # the stale window never extends past expires_at.
+        assert cache.get_stale("b") is None
+
+    def test_invalid_ttl(self):
+        """Test ttl must be positive"""
+        with pytest.raises(ValueError):
+            TTLCache(ttl=0)
+
+
+class TestGetPayloadExpiry:
+    """Test reading exp from validation responses"""
+
+    def test_exp_present(self):
+        assert get_payload_expiry({"data": {"main": {"exp": 123}}}) == 123.0
+
+    def test_exp_missing(self):
+        assert get_payload_expiry({"data": {"main": {}}}) is None
+        assert get_payload_expiry({"user_id": 1}) is None
+
+
+class TestValidationCache:
+    """Test the opt-in cache in validate_and_get_payload_from_token_v0"""
+
+    @patch.object(SquareAuthenticationHelper, "_make_request")
+    def test_second_call_served_from_cache(self, mock_request):
+        """Test repeated validations only hit the server once"""
+        mock_request.return_value = {
+            "data": {"main": {"user_id": "u1", "exp": time.time() + 60}},
+            "message": None,
+            "log": None,
+        }
+        cache = TTLCache(ttl=30)
+        helper = SquareAuthenticationHelper(param_validation_cache=cache)
+
+        for _ in range(3):
+            result = helper.validate_and_get_payload_from_token_v0(
+                token="t", token_type=TokenType.access_token, app_id=1
+            )
+
+        mock_request.assert_called_once()
+        assert result["data"]["main"]["user_id"] == "u1"
+        assert cache.hits == 2
+
+    @patch.object(SquareAuthenticationHelper, "_make_request")
+    def test_cache_key_includes_app_id(self, mock_request):
+        """Test a token validated for one app is not reused for another"""
+        mock_request.return_value = {"data": {"main": {}}, "message": None, "log": None}
+        helper = SquareAuthenticationHelper(param_validation_cache=TTLCache(ttl=30))
+
+        helper.validate_and_get_payload_from_token_v0(
+            token="t", token_type=TokenType.access_token, app_id=1
+        )
+        helper.validate_and_get_payload_from_token_v0(
+            token="t", token_type=TokenType.access_token, app_id=2
+        )
+
+        assert mock_request.call_count == 2
+
+    @patch.object(SquareAuthenticationHelper, "_make_request")
+    def test_errors_are_not_cached(self, mock_request):
+        """Test failed validations are retried against the server"""
+        mock_request.side_effect = Exception("invalid token")
+        helper = SquareAuthenticationHelper(param_validation_cache=TTLCache(ttl=30))
+
+        for _ in range(2):
+            with pytest.raises(Exception):
+                helper.validate_and_get_payload_from_token_v0(
+                    token="t", token_type=TokenType.access_token, app_id=1
+                )
+
+        assert mock_request.call_count == 2
+
+
+class TestUserDetailsCache:
+    """Test the get_user_details_v0 cache and its write-through invalidation"""
+
+    def test_invalidate_drops_all_tokens_of_user(self):
+        """Test invalidating one token drops every cached token of that user"""
+        cache = UserDetailsCache()
+        cache.set("t1", _user_details("u1"), cache.generation)
+        cache.set("t2", _user_details("u1"), cache.generation)
+        cache.set("t3", _user_details("u2"), cache.generation)
+
+        cache.invalidate(token="t1")
+
+        assert cache.get("t2") is None
+        assert cache.get("t3") is not None
+
+    def test_stale_fetch_is_not_stored(self):
+        """Test a fetch started before an invalidation is discarded"""
+        cache = UserDetailsCache()
+        generation = cache.generation
+        cache.invalidate(user_id="u1")
+        cache.set("t1", _user_details("u1"), generation)
+        assert cache.get("t1") is None
+
+    def test_other_users_fetch_is_stored(self):
+        """Test an invalidation only discards in-flight fetches of the same user"""
+        cache = UserDetailsCache()
+        generation = cache.generation
+        cache.invalidate(user_id="u2")
+        cache.invalidate(token="t3")
+        cache.set("t1", _user_details("u1"), generation)
+        assert cache.get("t1") is not None
+        cache.set("t3", _user_details("u3"), generation)
+        assert cache.get("t3") is None
+
+    def test_forgotten_generations_reject_in_flight_fetches(self):
+        """Test a bounded invalidation history errs on the side of not storing"""
+        cache = UserDetailsCache(max_entries=2)
+        generation = cache.generation
+        for user_id in ("u2", "u3", "u4"):
+            cache.invalidate(user_id=user_id)
+        cache.set("t1", _user_details("u1"), generation)
+        assert cache.get("t1") is None
+        cache.set("t1", _user_details("u1"), cache.generation)
+        assert cache.get("t1") is not None
+
+    def test_details_served_from_cache(self):
+        """Test repeated detail fetches only hit the server once"""
+        helper = SquareAuthenticationHelper(param_user_details_cache=UserDetailsCache())
+        with patch.object(
+            PooledTransport, "request", return_value=_user_details("u1")
+        ) as mock_request:
+            for _ in range(3):
+                result = helper.get_user_details_v0(access_token="t1")
+
+        assert mock_request.call_count == 1
+        assert result["data"]["main"]["user_id"] == "u1"
+
+    def test_mutation_invalidates(self):
+        """Test a write for the same user forces the next fetch to the server"""
+        helper = SquareAuthenticationHelper(param_user_details_cache=UserDetailsCache())
+        with patch.object(
+            PooledTransport, "request", return_value=_user_details("u1")
+        ) as mock_request:
+            helper.get_user_details_v0(access_token="t1")
+            helper.update_profile_details_v0(access_token="t1", first_name="a")
+            helper.get_user_details_v0(access_token="t1")
+
+        assert mock_request.call_count == 3
+
+    def test_failed_mutation_invalidates(self):
+        """Test a write that errors still invalidates the cached details"""
+        helper = SquareAuthenticationHelper(param_user_details_cache=UserDetailsCache())
+        with patch.object(PooledTransport, "request", return_value=_user_details("u1")):
+            helper.get_user_details_v0(access_token="t1")
+        with patch.object(PooledTransport, "request", side_effect=Exception("boom")):
+            with pytest.raises(Exception):
+                helper.logout_all_v0(access_token="t1")
+
+        assert helper.global_user_details_cache.get("t1") is None
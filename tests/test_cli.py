@@ -0,0 +1,244 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from square_authentication_helper.bulk import run_bulk
+from square_authentication_helper.cli import Checkpoint, main
+from square_authentication_helper.main import SquareAuthenticationHelper
+from square_authentication_helper.pydantic_models import TokenType
+
+
+def _read_jsonl(path):
+    with open(path) as file:
+        return sorted((json.loads(line) for line in file), key=lambda r: r["line"])
+
+
+class TestCheckpoint:
+    """Test the resume watermark"""
+
+    def test_watermark_advances_over_contiguous_lines(self, tmp_path):
+        checkpoint = Checkpoint(str(tmp_path / "state.json"))
+        for line in (1, 0, 3):
+            checkpoint.add(line)
+        assert checkpoint.watermark == 2
+        assert checkpoint.done == {3}
+        checkpoint.save()
+
+        restored = Checkpoint(str(tmp_path / "state.json"))
+        assert 0 in restored and 3 in restored and 2 not in restored
+
+    def test_failed_lines_do_not_hold_the_watermark(self, tmp_path):
+        checkpoint = Checkpoint(str(tmp_path / "state.json"), max_failed=2)
+        for line in range(1000):
+            checkpoint.add(line, ok=line not in (0, 5, 7))
+        assert checkpoint.watermark == 1000
+        assert checkpoint.done == set()
+        assert checkpoint.failed == {0, 5}
+        assert checkpoint.dropped == 1
+        checkpoint.save()
+
+        restored = Checkpoint(str(tmp_path / "state.json"))
+        assert 0 not in restored and 5 not in restored and 7 in restored
+        restored.add(0)
+        assert restored.failed == {5} and restored.watermark == 1000
+
+
+class TestBulkCli:
+    """Test the square-auth-bulk entry point"""
+
+    @patch.object(SquareAuthenticationHelper, "_make_request")
+    def test_jsonl_operations(self, mock_request, tmp_path):
+        """Test each row calls its operation and failures are reported per line"""
+        mock_request.side_effect = [{"data": None}, Exception("boom")]
+        input_path = tmp_path / "ops.jsonl"
+        input_path.write_text(
+            json.dumps(
+                {"operation": "logout_apps_v0", "access_token": "a", "app_ids": [1]}
+            )
+            + "\n\n"
+            + json.dumps({"operation": "logout_all_v0", "access_token": "b"})
+            + "\n"
+        )
+        output_path = tmp_path / "out.jsonl"
+
+        exit_code = main(
+            [str(input_path), "-o", str(output_path), "--concurrency", "1", "--quiet"]
+        )
+
+        assert exit_code == 1
+        records = _read_jsonl(output_path)
+        assert records[0] == {"line": 0, "ok": True, "response": {"data": None}}
+        assert records[1]["ok"] is False and "boom" in records[1]["error"]
+
+    @patch.object(SquareAuthenticationHelper, "_make_request")
+    def test_csv_with_default_operation(self, mock_request, tmp_path):
+        """Test csv cells are json decoded and enums are coerced"""
+        mock_request.return_value = {"data": {"main": {}}}
+        input_path = tmp_path / "tokens.csv"
+        input_path.write_text("token,token_type,app_id\nt1,access_token,1\n")
+        output_path = tmp_path / "out.jsonl"
+
+        exit_code = main(
+            [
+                str(input_path),
+                "-o",
+                str(output_path),
+                "--operation",
+                "validate_and_get_payload_from_token_v0",
+                "--quiet",
+            ]
+        )
+
+        assert exit_code == 0
+        mock_request.assert_called_once_with(
+            method="GET",
+            endpoint="validate_and_get_payload_from_token/v0",
+            headers={"token": "t1"},
+            params={"token_type": TokenType.access_token.value, "app_id": 1},
+        )
+
+    @patch.object(SquareAuthenticationHelper, "_make_request")
+    def test_csv_string_arguments_are_not_decoded(self, mock_request, tmp_path):
+        """Test numeric looking cells stay strings for str arguments"""
+        mock_request.return_value = {"data": {"main": {}}}
+        input_path = tmp_path / "users.csv"
+        input_path.write_text(
+            "operation,username,password,app_id\nregister_username_v0,2024,123456,1\n"
+        )
+
+        assert (
+            main([str(input_path), "-o", str(tmp_path / "out.jsonl"), "--quiet"]) == 0
+        )
+        assert mock_request.call_args.kwargs["json"] == {
+            "username": "2024",
+            "password": "123456",
+            "app_id": 1,
+        }
+
+    @patch.object(SquareAuthenticationHelper, "_make_request", return_value={})
+    def test_resume_skips_completed_rows(self, mock_request, tmp_path):
+        """Test a second run with the same checkpoint only sends new rows"""
+        input_path = tmp_path / "ops.jsonl"
+        input_path.write_text(
+            "".join(json.dumps({"access_token": f"t{i}"}) + "\n" for i in range(5))
+        )
+        output_path = tmp_path / "out.jsonl"
+        command = [
+            str(input_path),
+            "-o",
+            str(output_path),
+            "--operation",
+            "logout_all_v0",
+            "--checkpoint",
+            str(tmp_path / "state.json"),
+            "--checkpoint-every",
+            "2",
+            "--quiet",
+        ]
+        assert main(command) == 0
+        with open(input_path, "a") as file:
+            file.write(json.dumps({"access_token": "t5"}) + "\n")
+        assert main(command) == 0
+
+        assert mock_request.call_count == 6
+        assert [record["line"] for record in _read_jsonl(output_path)] == list(range(6))
+
+    def test_unknown_operation(self, tmp_path):
+        input_path = tmp_path / "ops.jsonl"
+        input_path.write_text(json.dumps({"operation": "close"}) + "\n")
+        output_path = tmp_path / "out.jsonl"
+        assert main([str(input_path), "-o", str(output_path), "--quiet"]) == 1
+        assert "unknown operation" in _read_jsonl(output_path)[0]["error"]
+
+    @patch.object(SquareAuthenticationHelper, "_make_request")
+    def test_resume_retries_failed_rows(self, mock_request, tmp_path):
+        """Test failed rows are not checkpointed"""
+        mock_request.side_effect = [{}, Exception("boom"), {}]
+        input_path = tmp_path / "ops.jsonl"
+        input_path.write_text(
+            "".join(json.dumps({"access_token": f"t{i}"}) + "\n" for i in range(2))
+        )
+        command = [
+            str(input_path),
+            "-o",
+            str(tmp_path / "out.jsonl"),
+            "--operation",
+            "logout_all_v0",
+            "--concurrency",
+            "1",
+            "--checkpoint",
+            str(tmp_path / "state.json"),
+            "--quiet",
+        ]
+        assert main(command) == 1
+        assert main(command) == 0
+
+        assert mock_request.call_count == 3
+        assert mock_request.call_args.kwargs["headers"] == {"access_token": "t1"}
+
+    @patch.object(SquareAuthenticationHelper, "_make_request", return_value={})
+    def test_malformed_line_fails_only_its_row(self, mock_request, tmp_path):
+        """Test a line that is not json is reported and the other rows still run"""
+        input_path = tmp_path / "ops.jsonl"
+        input_path.write_text(
+            "".join(json.dumps({"access_token": f"t{i}"}) + "\n" for i in range(5))
+            + "{not json\n"
+            + json.dumps({"access_token": "t6"})
+            + "\n"
+        )
+        output_path = tmp_path / "out.jsonl"
+        command = [
+            str(input_path),
+            "-o",
+            str(output_path),
+            "--operation",
+            "logout_all_v0",
+            "--checkpoint",
+            str(tmp_path / "state.json"),
+            "--quiet",
+        ]
+        assert main(command) == 1
+
+        records = _read_jsonl(output_path)
+        assert [record["ok"] for record in records] == [True] * 5 + [False, True]
+        assert mock_request.call_count == 6
+        checkpoint = Checkpoint(str(tmp_path / "state.json"))
+        assert checkpoint.watermark == 7 and checkpoint.failed == {5}
+
+    @patch.object(SquareAuthenticationHelper, "_make_request", return_value={})
+    def test_checkpoint_is_saved_when_the_run_is_interrupted(
+        self, mock_request, tmp_path
+    ):
+        def interrupted_run_bulk(*args, **kwargs):
+            for count, result in enumerate(run_bulk(*args, **kwargs)):
+                if count == 2:
+                    raise KeyboardInterrupt
+                yield result
+
+        input_path = tmp_path / "ops.jsonl"
+        input_path.write_text(
+            "".join(json.dumps({"access_token": f"t{i}"}) + "\n" for i in range(4))
+        )
+        command = [
+            str(input_path),
+            "-o",
+            str(tmp_path / "out.jsonl"),
+            "--operation",
+            "logout_all_v0",
+            "--concurrency",
+            "1",
+            "--checkpoint",
+            str(tmp_path / "state.json"),
+            "--quiet",
+        ]
+        with (
+            patch("square_authentication_helper.cli.run_bulk", interrupted_run_bulk),
+            pytest.raises(KeyboardInterrupt),
+        ):
+            main(command)
+
+        written = [record["line"] for record in _read_jsonl(tmp_path / "out.jsonl")]
+        checkpoint = Checkpoint(str(tmp_path / "state.json"))
+        assert len(written) == 2
+        assert [line for line in range(4) if line in checkpoint] == written
@@ -0,0 +1,251 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from square_authentication_helper.async_main import AsyncSquareAuthenticationHelper
+from square_authentication_helper.coalescing import (
+    RequestCoalescer,
+    make_request_key,
+)
+from square_authentication_helper.main import SquareAuthenticationHelper
+from square_authentication_helper.resilience import DeadlineExceededError
+from square_authentication_helper.transport import AsyncPooledTransport, PooledTransport
+
+
+def _run_in_threads(function, count=10, coalescer=None, release=None):
+    """
+    run function in count threads, when given release is set once every follower
+    has joined the leader's call in coalescer.
+    """
+    results = [None] * count
+
+    def target(index):
+        results[index] = function()
+
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    if release is not None:
+        deadline = time.monotonic() + 5
+        while coalescer.coalesced < count - 1:
+            assert time.monotonic() < deadline, "followers did not join"
+            time.sleep(0.001)
+        release.set()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestMakeRequestKey:
+    """Test request identity used for coalescing"""
+
+    def test_header_order_does_not_matter(self):
+        assert make_request_key("GET", "e", {"a": 1, "b": 2}) == make_request_key(
+            "GET", "e", {"b": 2, "a": 1}
+        )
+
+    def test_unhashable_params(self):
+        assert make_request_key("GET", "e", params={"ids": [1, 2]}) is None
+
+
+class TestRequestCoalescer:
+    """Test thread single flight"""
+
+    def test_errors_are_shared(self):
+        """Test every waiting caller sees the leader's exception"""
+        coalescer = RequestCoalescer()
+        release = threading.Event()
+        calls = []
+
+        def failing():
+            calls.append(1)
+            release.wait()
+            raise ValueError("upstream failed")
+
+        def call():
+            try:
+                coalescer.run("k", failing)
+            except ValueError as e:
+                return e
+
+        results = _run_in_threads(call, count=5, coalescer=coalescer, release=release)
+        assert len(calls) == 1
+        assert all(isinstance(result, ValueError) for result in results)
+
+    def test_follower_keeps_its_own_deadline(self):
+        """Test a caller joining a slow call gives up at its deadline"""
+        helper = SquareAuthenticationHelper(param_bool_coalesce_requests=True)
+        release = threading.Event()
+        leader_started = threading.Event()
+
+        def slow_request(**kwargs):
+            leader_started.set()
+            release.wait(5)
+            return {"data": {"main": {}}}
+
+        with patch.object(PooledTransport, "request", side_effect=slow_request):
+            leader = threading.Thread(
+                target=helper.get_user_recovery_methods_v0, args=("u",)
+            )
+            leader.start()
+            leader_started.wait(5)
+            start = time.perf_counter()
+            with pytest.raises(DeadlineExceededError):
+                with helper.call_options(deadline=0.1):
+                    helper.get_user_recovery_methods_v0("u")
+            elapsed = time.perf_counter() - start
+            release.set()
+            leader.join()
+
+        assert elapsed < 1
+        assert helper.global_request_coalescer.coalesced == 1
+
+
+class TestHelperCoalescing:
+    """Test opt-in coalescing in _make_request"""
+
+    def test_identical_gets_share_one_call(self):
+        """Test concurrent identical reads hit the server once"""
+        helper = SquareAuthenticationHelper(param_bool_coalesce_requests=True)
+        release = threading.Event()
+
+        def slow_request(**kwargs):
+            release.wait()
+            return {"data": {"main": {"user_id": "u1"}}}
+
+        with patch.object(
+            PooledTransport, "request", side_effect=slow_request
+        ) as mock_request:
+            results = _run_in_threads(
+                lambda: helper.get_user_details_v0(access_token="a"),
+                coalescer=helper.global_request_coalescer,
+                release=release,
+            )
+
+        assert mock_request.call_count == 1
+        assert all(result is results[0] for result in results)
+        assert helper.global_request_coalescer.coalesced == 9
+
+    def test_writes_are_not_coalesced(self):
+        """Test non GET requests are always sent"""
+        helper = SquareAuthenticationHelper(param_bool_coalesce_requests=True)
+
+        def slow_request(**kwargs):
+            time.sleep(0.02)
+            return {}
+
+        with patch.object(
+            PooledTransport, "request", side_effect=slow_request
+        ) as mock_request:
+            _run_in_threads(lambda: helper.logout_all_v0(access_token="a"), count=3)
+
+        assert mock_request.call_count == 3
+
+    def test_disabled_by_default(self):
+        """Test coalescing is opt-in"""
+        assert SquareAuthenticationHelper().global_request_coalescer is None
+
+
+class TestAsyncHelperCoalescing:
+    """Test coalescing in the asyncio helper"""
+
+    def test_identical_gets_share_one_call(self):
+        """Test concurrent identical reads hit the server once"""
+
+        async def slow_request(**kwargs):
+            await asyncio.sleep(0.02)
+            return {"data": {"main": {}}}
+
+        async def run():
+            helper = AsyncSquareAuthenticationHelper(param_bool_coalesce_requests=True)
+            return await asyncio.gather(
+                *(helper.get_user_recovery_methods_v0(username="u") for _ in range(10)),
+                helper.get_user_recovery_methods_v0(username="other"),
+            )
+
+        with patch.object(
+            AsyncPooledTransport, "request", side_effect=slow_request
+        ) as mock_request:
+            results = asyncio.run(run())
+
+        assert mock_request.call_count == 2
+        assert len(results) == 11
+
+    def test_errors_are_shared(self):
+        """Test every waiting task sees the leader's exception"""
+
+        async def failing_request(**kwargs):
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream failed")
+
+        async def run():
+            helper = AsyncSquareAuthenticationHelper(param_bool_coalesce_requests=True)
+            return await asyncio.gather(
+                *(helper.get_user_details_v0(access_token="a") for _ in range(3)),
+                return_exceptions=True,
+            )
+
+        with patch.object(
+            AsyncPooledTransport, "request", side_effect=failing_request
+        ) as mock_request:
+            results = asyncio.run(run())
+
+        assert mock_request.call_count == 1
+        assert all(isinstance(result, ValueError) for result in results)
+
+    def test_cancelled_leader_does_not_cancel_followers(self):
+        """Test cancelling the first caller leaves the shared call running"""
+
+        async def slow_request(**kwargs):
+            await asyncio.sleep(0.01)
+            return {"data": {"main": {}}}
+
+        async def run():
+            helper = AsyncSquareAuthenticationHelper(param_bool_coalesce_requests=True)
+            leader = asyncio.create_task(helper.get_user_recovery_methods_v0("u"))
+            await asyncio.sleep(0)
+            follower = asyncio.create_task(helper.get_user_recovery_methods_v0("u"))
+            await asyncio.sleep(0)
+            leader.cancel()
+            result = await follower
+            assert leader.cancelled()
+            return result
+
+        with patch.object(
+            AsyncPooledTransport, "request", side_effect=slow_request
+        ) as mock_request:
+            result = asyncio.run(run())
+
+        assert mock_request.call_count == 1
+        assert result["data"]["main"] == {}
+
+    def test_follower_keeps_its_own_deadline(self):
+        """Test a task joining a slow call gives up at its deadline, the call goes on"""
+
+        async def slow_request(**kwargs):
+            await asyncio.sleep(0.3)
+            return {"data": {"main": {}}}
+
+        async def run():
+            helper = AsyncSquareAuthenticationHelper(param_bool_coalesce_requests=True)
+            leader = asyncio.create_task(helper.get_user_recovery_methods_v0("u"))
+            await asyncio.sleep(0)
+            start = time.perf_counter()
+            with pytest.raises(DeadlineExceededError):
+                with helper.call_options(deadline=0.05):
+                    await helper.get_user_recovery_methods_v0("u")
+            elapsed = time.perf_counter() - start
+            assert helper.global_request_coalescer.coalesced == 1
+            return elapsed, await leader
+
+        with patch.object(
+            AsyncPooledTransport, "request", side_effect=slow_request
+        ) as mock_request:
+            elapsed, result = asyncio.run(run())
+
+        assert elapsed < 0.25
+        assert mock_request.call_count == 1
+        assert result["data"]["main"] == {}
@@ -0,0 +1,131 @@
+import inspect
+from unittest.mock import patch
+
+import pytest
+from square_authentication_helper.async_main import AsyncSquareAuthenticationHelper
+from square_authentication_helper.cache import UserDetailsCache
+from square_authentication_helper.endpoints import (
+    ENDPOINTS,
+    ENDPOINTS_BY_PATH,
+    build_request,
+)
+from square_authentication_helper.main import SquareAuthenticationHelper
+from square_authentication_helper.pydantic_models import TokenType
+from square_database_structure.square.authentication.enums import RecoveryMethodEnum
+
+
+class TestEndpointRegistry:
+    """Test the endpoint table driving the helpers"""
+
+    def test_every_helper_method_is_registered(self):
+        for helper_class in (
+            SquareAuthenticationHelper,
+            AsyncSquareAuthenticationHelper,
+        ):
+            methods = {
+                name
+                for name, _ in inspect.getmembers(helper_class, inspect.isfunction)
+                if name.endswith("_v0")
+            }
+            assert methods == set(ENDPOINTS)
+
+    @pytest.mark.parametrize("name", sorted(ENDPOINTS))
+    def test_arguments_match_signature(self, name):
+        """Test every argument of the method is sent exactly once"""
+        endpoint = ENDPOINTS[name]
+        parameters = set(
+            inspect.signature(getattr(SquareAuthenticationHelper, name)).parameters
+        ) - {"self", "response_as_pydantic"}
+        sent = endpoint.headers + endpoint.json + endpoint.params + endpoint.files
+        assert len(sent) == len(set(sent))
+        assert set(sent) == parameters
+
+    def test_paths_are_unique(self):
+        assert len(ENDPOINTS_BY_PATH) == len(ENDPOINTS)
+
+    def test_build_request(self):
+        request = build_request(
+            ENDPOINTS["validate_and_get_payload_from_token_v0"],
+            {"token": "t", "token_type": TokenType.access_token, "app_id": 1},
+        )
+        assert request == {
+            "method": "GET",
+            "endpoint": "validate_and_get_payload_from_token/v0",
+            "headers": {"token": "t"},
+            "params": {"token_type": TokenType.access_token.value, "app_id": 1},
+        }
+
+    def test_build_request_converts_enum_lists(self):
+        method = next(iter(RecoveryMethodEnum))
+        request = build_request(
+            ENDPOINTS["update_user_recovery_methods_v0"],
+            {
+                "access_token": "a",
+                "recovery_methods_to_add": [method],
+                "recovery_methods_to_remove": [],
+            },
+        )
+        assert request["json"] == {
+            "recovery_methods_to_add": [method.value],
+            "recovery_methods_to_remove": [],
+        }
+
+    def test_build_request_without_files(self):
+        request = build_request(
+            ENDPOINTS["update_profile_photo_v0"],
+            {"access_token": "a", "profile_photo": None},
+        )
+        assert request["files"] is None
+
+
+class TestRegistryDrivenRequests:
+    """Test the request path follows the table"""
+
+    def test_idempotent_endpoint_keeps_user_details_cache(self):
+        """Test a registered read does not invalidate the user details cache"""
+        helper = SquareAuthenticationHelper(
+            param_user_details_cache=UserDetailsCache(ttl=60)
+        )
+        response = {"data": {"main": {}}, "message": None, "log": None}
+        with patch.object(
+            helper.global_transport, "request", return_value=response
+        ) as mock_request:
+            helper.get_user_details_v0(access_token="a")
+            helper.get_user_recovery_methods_v0(username="u")
+            helper.get_user_details_v0(access_token="a")
+        assert mock_request.call_count == 2
+
+    def test_write_endpoint_invalidates_user_details_cache(self):
+        helper = SquareAuthenticationHelper(
+            param_user_details_cache=UserDetailsCache(ttl=60)
+        )
+        response = {"data": {"main": {}}, "message": None, "log": None}
+        with patch.object(
+            helper.global_transport, "request", return_value=response
+        ) as mock_request:
+            helper.get_user_details_v0(access_token="a")
+            helper.logout_all_v0(access_token="a")
+            helper.get_user_details_v0(access_token="a")
+        assert mock_request.call_count == 3
+
+    def test_plain_helper_calls_the_transport_directly(self):
+        """Test a helper without resilience, metrics or hooks sends one transport call"""
+        helper = SquareAuthenticationHelper()
+        assert helper._is_direct()
+        response = {"data": {"main": {}}, "message": None, "log": None}
+        with patch.object(
+            helper.global_transport, "request", return_value=response
+        ) as mock_request:
+            assert helper.logout_all_v0(access_token="a") is response
+        mock_request.assert_called_once_with(
+            method="DELETE",
+            endpoint="logout/all/v0",
+            json=None,
+            data=None,
+            params=None,
+            headers={"access_token": "a"},
+            files=None,
+            url="http://localhost:10011",
+            timeout=None,
+            return_type="json",
+        )
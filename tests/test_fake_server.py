@@ -0,0 +1,233 @@
+import asyncio
+import time
+
+import pytest
+import requests
+from square_authentication_helper.async_main import AsyncSquareAuthenticationHelper
+from square_authentication_helper.cache import UserDetailsCache
+from square_authentication_helper.endpoints import ENDPOINTS
+from square_authentication_helper.fake_server import FakeAuthenticationServer
+from square_authentication_helper.jwt_utils import LocalTokenVerifier
+from square_authentication_helper.main import SquareAuthenticationHelper
+from square_authentication_helper.pydantic_models import TokenType
+from square_authentication_helper.resilience import RetryPolicy
+from square_database_structure.square.authentication.enums import (
+    AuthProviderEnum,
+    RecoveryMethodEnum,
+)
+
+
+@pytest.fixture
+def fake_server():
+    with FakeAuthenticationServer(seed=0) as server:
+        yield server
+
+
+def _make_helper(server, **kwargs):
+    return SquareAuthenticationHelper(
+        param_str_square_authentication_url=server.url, **kwargs
+    )
+
+
+class TestFakeAuthenticationServer:
+    """Test the helpers end to end against the bundled fake server"""
+
+    def test_every_endpoint(self, fake_server):
+        """Test every helper method with pydantic output against the fake server"""
+        state = fake_server.state
+        with _make_helper(fake_server) as helper:
+            registered = helper.register_username_v0(
+                "alice", "pw1", app_id=1, response_as_pydantic=True
+            ).data.main
+            user_id = registered.user_id
+            login = helper.login_username_v0(
+                "alice", "pw1", 2, True, response_as_pydantic=True
+            ).data.main
+            access_token = helper.generate_access_token_v0(
+                login.refresh_token, response_as_pydantic=True
+            ).data.main.access_token
+            payload = helper.validate_and_get_payload_from_token_v0(
+                access_token, TokenType.access_token, 2, response_as_pydantic=True
+            ).data.main
+            assert payload["user_id"] == user_id
+
+            details = helper.get_user_details_v0(
+                access_token, response_as_pydantic=True
+            ).data.main
+            assert details.apps == ["app_1", "app_2"]
+            assert helper.update_user_app_ids_v0(
+                access_token, [3], [1], response_as_pydantic=True
+            ).data.main == [2, 3]
+            assert (
+                helper.update_username_v0(
+                    new_username="alice2",
+                    access_token=access_token,
+                    response_as_pydantic=True,
+                ).data.main.username
+                == "alice2"
+            )
+            helper.update_profile_details_v0(
+                access_token,
+                first_name="Alice",
+                email="alice@example.com",
+                response_as_pydantic=True,
+            )
+            helper.send_verification_email_v0(
+                access_token, None, response_as_pydantic=True
+            )
+            helper.validate_email_verification_code_v0(
+                access_token,
+                state.email_verification_codes[user_id],
+                response_as_pydantic=True,
+            )
+            assert set(
+                helper.update_user_recovery_methods_v0(
+                    access_token,
+                    list(RecoveryMethodEnum),
+                    response_as_pydantic=True,
+                ).data.main
+            ) == {method.value for method in RecoveryMethodEnum}
+            backup_codes = helper.generate_account_backup_codes_v0(
+                access_token, response_as_pydantic=True
+            ).data.main.backup_codes
+            recovery = helper.get_user_recovery_methods_v0(
+                "alice2", response_as_pydantic=True
+            ).data
+            assert recovery.backup_code_details.available == len(backup_codes)
+
+            helper.reset_password_and_login_using_backup_code_v0(
+                backup_codes[0], "alice2", "pw2", 2, False, response_as_pydantic=True
+            )
+            helper.send_reset_password_email_v0(
+                "alice2", None, response_as_pydantic=True
+            )
+            login = helper.reset_password_and_login_using_reset_email_code_v0(
+                state.reset_email_codes[user_id],
+                "alice2",
+                "pw3",
+                2,
+                True,
+                response_as_pydantic=True,
+            ).data.main
+            # logout_other_sessions ended every earlier session.
+            with pytest.raises(requests.HTTPError):
+                helper.generate_access_token_v0(registered.refresh_token)
+            access_token = login.access_token
+            helper.update_password_v0(
+                old_password="pw3",
+                new_password="pw4",
+                access_token=access_token,
+                logout_other_sessions=True,
+                preserve_session_refresh_token=login.refresh_token,
+            )
+            assert helper.update_profile_photo_v0(
+                access_token,
+                ("photo.png", b"png", "image/png"),
+                response_as_pydantic=True,
+            ).data.main
+            assert helper.add_google_auth_provider_v0(
+                access_token, "google-alice", response_as_pydantic=True
+            ).data.main.auth_providers == ["SELF", "GOOGLE"]
+            helper.unlink_auth_provider_v0(
+                access_token, AuthProviderEnum.GOOGLE.value, response_as_pydantic=True
+            )
+
+            google = helper.register_login_google_v0(
+                "google-bob", 1, False, response_as_pydantic=True
+            ).data.main
+            assert google.was_new_user
+            helper.add_self_auth_provider_v0(
+                google.access_token, "pw", response_as_pydantic=True
+            )
+            helper.logout_v0(google.refresh_token, response_as_pydantic=True)
+
+            helper.logout_apps_v0(access_token, [3], response_as_pydantic=True)
+            helper.logout_all_v0(access_token, response_as_pydantic=True)
+            access_token = helper.login_username_v0("alice2", "pw4", 2)["data"]["main"][
+                "access_token"
+            ]
+            helper.delete_user_v0(
+                password="pw4", access_token=access_token, response_as_pydantic=True
+            )
+        assert set(fake_server.requests) == {e.path for e in ENDPOINTS.values()}
+        assert "alice2" not in state.user_ids_by_username
+
+    def test_errors_are_http_errors(self, fake_server):
+        with _make_helper(fake_server) as helper:
+            helper.register_username_v0("alice", "pw", 1)
+            with pytest.raises(requests.HTTPError) as exc_info:
+                helper.register_username_v0("alice", "pw", 1)
+        assert exc_info.value.response.status_code == 409
+        assert exc_info.value.response.json()["message"]
+
+    def test_injected_errors_are_retried(self, fake_server):
+        with _make_helper(
+            fake_server, param_retry_policy=RetryPolicy(max_attempts=3, base_delay=0)
+        ) as helper:
+            helper.register_username_v0("alice", "pw", 1)
+            fake_server.fail_next(2)
+            result = helper.get_user_recovery_methods_v0("alice")
+        assert result["data"]["main"] == {"EMAIL": False, "BACKUP_CODE": False}
+        assert fake_server.requests["get_user_recovery_methods/v0"] == 3
+        assert fake_server.injected_errors == 2
+
+    def test_error_rate(self):
+        with FakeAuthenticationServer(error_rate=1.0, error_status=500) as server:
+            with _make_helper(server) as helper:
+                with pytest.raises(requests.HTTPError) as exc_info:
+                    helper.get_user_recovery_methods_v0("alice")
+        assert exc_info.value.response.status_code == 500
+
+    def test_tokens_verify_locally(self, fake_server):
+        """Test issued access tokens verify with LocalTokenVerifier and the secret"""
+        verifier = LocalTokenVerifier("fake-secret")
+        with _make_helper(fake_server, param_local_token_verifier=verifier) as helper:
+            access_token = helper.register_username_v0("alice", "pw", 1)["data"][
+                "main"
+            ]["access_token"]
+            helper.validate_and_get_payload_from_token_v0(
+                access_token, TokenType.access_token, 1
+            )
+        assert verifier.verified == 1
+        assert "validate_and_get_payload_from_token/v0" not in fake_server.requests
+
+    def test_user_details_cache_end_to_end(self, fake_server):
+        with _make_helper(
+            fake_server, param_user_details_cache=UserDetailsCache(ttl=60)
+        ) as helper:
+            access_token = helper.register_username_v0("alice", "pw", 1)["data"][
+                "main"
+            ]["access_token"]
+            helper.get_user_details_v0(access_token)
+            helper.get_user_details_v0(access_token)
+            helper.update_username_v0(new_username="alice2", access_token=access_token)
+            details = helper.get_user_details_v0(access_token)
+        assert details["data"]["main"]["username"] == "alice2"
+        assert fake_server.requests["get_user_details/v0"] == 2
+
+    def test_async_helper(self, fake_server):
+        async def run():
+            async with AsyncSquareAuthenticationHelper(
+                param_str_square_authentication_url=fake_server.url
+            ) as helper:
+                registered = await helper.register_username_v0("alice", "pw", 1)
+                access_token = registered["data"]["main"]["access_token"]
+                return await asyncio.gather(
+                    *[
+                        helper.get_user_details_v0(
+                            access_token, response_as_pydantic=True
+                        )
+                        for _ in range(5)
+                    ]
+                )
+
+        results = asyncio.run(run())
+        assert {result.data.main.username for result in results} == {"alice"}
+
+    def test_injected_latency(self):
+        with FakeAuthenticationServer(latency=0.05) as server:
+            with _make_helper(server) as helper:
+                start = time.perf_counter()
+                with pytest.raises(requests.HTTPError):
+                    helper.get_user_recovery_methods_v0("alice")
+        assert time.perf_counter() - start >= 0.05
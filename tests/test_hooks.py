@@ -0,0 +1,149 @@
+import asyncio
+
+import pytest
+import requests
+from square_authentication_helper.async_main import AsyncSquareAuthenticationHelper
+from square_authentication_helper.hooks import REDACTED, RequestHooks, RequestInfo
+from square_authentication_helper.main import SquareAuthenticationHelper
+from square_authentication_helper.metrics import MetricsRegistry
+from square_authentication_helper.resilience import RetryPolicy
+
+
+def _echo_headers(request):
+    return {
+        "data": {
+            "main": {
+                "traceparent": request.headers.get("traceparent"),
+                "access_token": request.headers.get("access-token"),
+            }
+        },
+        "message": None,
+        "log": None,
+    }
+
+
+@pytest.fixture
+def echo_server(stub_server_factory):
+    return stub_server_factory(_echo_headers)
+
+
+class _RecordingHooks(RequestHooks):
+    def __init__(self):
+        self.events = []
+
+    def before_request(self, info):
+        info.headers["traceparent"] = f"trace-{info.attempt}"
+        self.events.append(("before", info))
+
+    def after_response(self, info):
+        self.events.append(("after", info))
+
+    def on_error(self, info, error):
+        self.events.append(("error", info, error))
+
+
+class TestRequestHooks:
+    """Test the request lifecycle hooks"""
+
+    def test_hooks_see_each_attempt(self, echo_server):
+        """Test hooks can add headers and receive sizes and timings"""
+        hooks = _RecordingHooks()
+        with SquareAuthenticationHelper(
+            param_int_square_authentication_port=echo_server.server_address[1],
+            param_str_square_authentication_ip="127.0.0.1",
+            param_list_request_hooks=[hooks],
+        ) as helper:
+            result = helper.get_user_details_v0(access_token="a")
+        assert result["data"]["main"]["traceparent"] == "trace-1"
+        assert [event[0] for event in hooks.events] == ["before", "after"]
+        info = hooks.events[1][1]
+        assert info.endpoint == "get_user_details/v0"
+        assert info.method == "GET"
+        assert info.status_code == 200
+        assert info.request_bytes == 0
+        assert info.response_bytes > 0
+        assert {"first_byte", "parse", "total"} <= set(info.timings)
+        assert info.timings["total"] >= info.timings["parse"]
+
+    def test_on_error_and_retries(self, echo_server):
+        """Test a failed attempt reaches on_error and the retry gets its own info"""
+        hooks = _RecordingHooks()
+        echo_server.failures = 1
+        with SquareAuthenticationHelper(
+            param_int_square_authentication_port=echo_server.server_address[1],
+            param_str_square_authentication_ip="127.0.0.1",
+            param_list_request_hooks=[hooks],
+            param_retry_policy=RetryPolicy(base_delay=0),
+        ) as helper:
+            result = helper.get_user_details_v0(access_token="a")
+        assert result["data"]["main"]["traceparent"] == "trace-2"
+        assert [event[0] for event in hooks.events] == [
+            "before",
+            "error",
+            "before",
+            "after",
+        ]
+        _, info, error = hooks.events[1]
+        assert isinstance(error, requests.HTTPError)
+        assert info.status_code == 503
+        assert hooks.events[3][1].attempt == 2
+
+    def test_hooks_with_metrics(self, echo_server):
+        """Test hooks and metrics can be combined"""
+        hooks = _RecordingHooks()
+        registry = MetricsRegistry()
+        with SquareAuthenticationHelper(
+            param_int_square_authentication_port=echo_server.server_address[1],
+            param_str_square_authentication_ip="127.0.0.1",
+            param_list_request_hooks=[hooks, RequestHooks()],
+            param_metrics=registry,
+        ) as helper:
+            helper.get_user_details_v0(access_token="a")
+        endpoint = registry.snapshot()["endpoints"]["get_user_details/v0 GET"]
+        assert endpoint["bytes_received"] == hooks.events[1][1].response_bytes
+
+    def test_async_hooks_report_connect_time(self, echo_server):
+        """Test the httpx transport reports the connect time of a new connection"""
+        hooks = _RecordingHooks()
+
+        async def run():
+            async with AsyncSquareAuthenticationHelper(
+                param_int_square_authentication_port=echo_server.server_address[1],
+                param_str_square_authentication_ip="127.0.0.1",
+                param_list_request_hooks=[hooks],
+            ) as helper:
+                await helper.get_user_details_v0(access_token="a")
+                await helper.get_user_details_v0(access_token="a")
+
+        asyncio.run(run())
+        first, second = [event[1] for event in hooks.events if event[0] == "after"]
+        assert {"connect", "first_byte", "parse", "total"} <= set(first.timings)
+        # the second call reuses the kept alive connection.
+        assert "connect" not in second.timings
+        assert "first_byte" in second.timings
+
+    def test_credentials_are_redacted(self, echo_server):
+        """Test hooks never see credential headers and can not replace them"""
+
+        class _OverwritingHooks(RequestHooks):
+            def before_request(self, info):
+                seen.append(dict(info.headers))
+                info.headers["access_token"] = "forged"
+                info.headers["traceparent"] = "trace"
+
+        seen = []
+        with SquareAuthenticationHelper(
+            param_int_square_authentication_port=echo_server.server_address[1],
+            param_str_square_authentication_ip="127.0.0.1",
+            param_list_request_hooks=[_OverwritingHooks()],
+        ) as helper:
+            result = helper.get_user_details_v0(access_token="secret")
+        assert seen == [{"access_token": REDACTED}]
+        assert result["data"]["main"] == {
+            "traceparent": "trace",
+            "access_token": "secret",
+        }
+
+    def test_request_info_repr(self):
+        info = RequestInfo("a/v0", "GET", "http://localhost")
+        assert "GET a/v0" in repr(info)
@@ -0,0 +1,184 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+from unittest.mock import patch
+
+import pytest
+from square_authentication_helper.jwt_utils import (
+    InvalidTokenError,
+    LocalTokenVerifier,
+    decode_unverified,
+)
+from square_authentication_helper.main import SquareAuthenticationHelper
+from square_authentication_helper.pydantic_models import TokenType
+
+SECRET = "test-secret"
+
+
+def _b64url(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def make_hs256_token(payload, secret=SECRET, header=None):
+    header = header or {"alg": "HS256", "typ": "JWT"}
+    header_segment = _b64url(json.dumps(header).encode())
+    payload_segment = _b64url(json.dumps(payload).encode())
+    signing_input = f"{header_segment}.{payload_segment}"
+    signature = hmac.new(
+        secret.encode(), signing_input.encode(), hashlib.sha256
+    ).digest()
+    return f"{signing_input}.{_b64url(signature)}"
+
+
+class TestDecodeUnverified:
+    """Test splitting tokens without verification"""
+
+    def test_decode(self):
+        token = make_hs256_token({"user_id": "u1"})
+        header, payload = decode_unverified(token)
+        assert header["alg"] == "HS256"
+        assert payload == {"user_id": "u1"}
+
+    def test_malformed(self):
+        with pytest.raises(InvalidTokenError):
+            decode_unverified("not-a-token")
+
+
+class TestLocalTokenVerifier:
+    """Test offline access token verification"""
+
+    def test_valid_token(self):
+        """Test a correctly signed, unexpired token for the app is accepted"""
+        verifier = LocalTokenVerifier(SECRET)
+        payload = {"user_id": "u1", "app_id": 1, "exp": time.time() + 60}
+        assert verifier.verify(make_hs256_token(payload), app_id=1) == payload
+        assert verifier.verified == 1
+
+    def test_bad_signature(self):
+        """Test a token signed with another key is rejected"""
+        verifier = LocalTokenVerifier(SECRET)
+        token = make_hs256_token({"app_id": 1, "exp": time.time() + 60}, secret="other")
+        with pytest.raises(InvalidTokenError):
+            verifier.verify(token, app_id=1)
+
+    def test_expired(self):
+        """Test an expired token is rejected"""
+        verifier = LocalTokenVerifier(SECRET)
+        token = make_hs256_token({"app_id": 1, "exp": time.time() - 1})
+        with pytest.raises(InvalidTokenError):
+            verifier.verify(token, app_id=1)
+
+    def test_wrong_app_id(self):
+        """Test a token issued for another app is rejected"""
+        verifier = LocalTokenVerifier(SECRET)
+        token = make_hs256_token({"app_id": 2, "exp": time.time() + 60})
+        with pytest.raises(InvalidTokenError):
+            verifier.verify(token, app_id=1)
+
+    def test_unknown_kid_is_ambiguous(self):
+        """Test tokens signed with an unknown key id fall back to the server"""
+        verifier = LocalTokenVerifier({"k1": SECRET})
+        token = make_hs256_token(
+            {"app_id": 1, "exp": time.time() + 60},
+            header={"alg": "HS256", "kid": "k2"},
+        )
+        assert verifier.verify(token, app_id=1) is None
+        assert verifier.fallbacks == 1
+
+    def test_unaccepted_algorithm_is_ambiguous(self):
+        """Test algorithms outside the allow list fall back to the server"""
+        verifier = LocalTokenVerifier(SECRET, algorithms=("RS256",))
+        token = make_hs256_token({"app_id": 1, "exp": time.time() + 60})
+        assert verifier.verify(token, app_id=1) is None
+
+    def test_missing_claims_are_ambiguous(self):
+        """Test tokens without exp or app_id fall back to the server"""
+        verifier = LocalTokenVerifier(SECRET)
+        assert verifier.verify(make_hs256_token({"app_id": 1}), app_id=1) is None
+
+    def test_rs256_with_public_key(self):
+        """Test asymmetric tokens are verified with a public key via pyjwt"""
+        jwt = pytest.importorskip("jwt")
+        rsa = pytest.importorskip("cryptography.hazmat.primitives.asymmetric.rsa")
+        serialization = pytest.importorskip(
+            "cryptography.hazmat.primitives.serialization"
+        )
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        public_pem = private_key.public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        payload = {"app_id": 1, "exp": int(time.time()) + 60}
+        token = jwt.encode(payload, private_key, algorithm="RS256")
+        verifier = LocalTokenVerifier(public_pem, algorithms=("RS256",))
+        assert verifier.verify(token, app_id=1) == payload
+
+    @pytest.mark.parametrize(
+        "key",
+        [
+            "-----BEGIN PUBLIC KEY-----\nMIIB\n-----END PUBLIC KEY-----\n",
+            b"ssh-ed25519 AAAAC3NzaC1lZDI1NTE5 user@host",
+            {"kid-1": SECRET, "kid-2": "-----BEGIN CERTIFICATE-----\n"},
+        ],
+    )
+    def test_public_key_as_hmac_secret(self, key):
+        """Test public keys are refused as hmac secrets (algorithm confusion)"""
+        with pytest.raises(ValueError):
+            LocalTokenVerifier(key)
+
+    def test_mixed_algorithms(self):
+        with pytest.raises(ValueError):
+            LocalTokenVerifier(SECRET, algorithms=("HS256", "RS256"))
+
+
+class TestHelperLocalVerification:
+    """Test validate_and_get_payload_from_token_v0 with a local verifier"""
+
+    @patch.object(SquareAuthenticationHelper, "_make_request")
+    def test_access_token_verified_locally(self, mock_request):
+        """Test verified access tokens skip the server"""
+        helper = SquareAuthenticationHelper(
+            param_local_token_verifier=LocalTokenVerifier(SECRET)
+        )
+        token = make_hs256_token(
+            {"user_id": "u1", "app_id": 1, "exp": time.time() + 60}
+        )
+
+        result = helper.validate_and_get_payload_from_token_v0(
+            token=token, token_type=TokenType.access_token, app_id=1
+        )
+
+        mock_request.assert_not_called()
+        assert result["data"]["main"]["user_id"] == "u1"
+
+    @patch.object(SquareAuthenticationHelper, "_make_request")
+    def test_ambiguous_token_falls_back_to_server(self, mock_request):
+        """Test tokens the verifier can not decide on go to the server"""
+        mock_request.return_value = {"data": {"main": {}}, "message": None, "log": None}
+        helper = SquareAuthenticationHelper(
+            param_local_token_verifier=LocalTokenVerifier({"k1": SECRET})
+        )
+        token = make_hs256_token({"app_id": 1, "exp": time.time() + 60})
+
+        helper.validate_and_get_payload_from_token_v0(
+            token=token, token_type=TokenType.access_token, app_id=1
+        )
+
+        mock_request.assert_called_once()
+
+    @patch.object(SquareAuthenticationHelper, "_make_request")
+    def test_refresh_tokens_always_use_server(self, mock_request):
+        """Test refresh tokens are never verified locally"""
+        mock_request.return_value = {"data": {"main": {}}, "message": None, "log": None}
+        helper = SquareAuthenticationHelper(
+            param_local_token_verifier=LocalTokenVerifier(SECRET)
+        )
+        token = make_hs256_token({"app_id": 1, "exp": time.time() + 60})
+
+        helper.validate_and_get_payload_from_token_v0(
+            token=token, token_type=TokenType.refresh_token, app_id=1
+        )
+
+        mock_request.assert_called_once()
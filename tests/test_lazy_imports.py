@@ -0,0 +1,135 @@
+import json
+import subprocess
+import sys
+from unittest.mock import patch
+
+from square_authentication_helper.cli import _coerce_arguments
+from square_authentication_helper.main import SquareAuthenticationHelper
+
+_DEFERRED_MODULES = (
+    "pydantic",
+    "sqlalchemy",
+    "square_commons",
+    "square_database_structure",
+    "square_authentication_helper.pydantic_models",
+)
+
+
+def _loaded_modules(statement: str) -> list:
+    """modules of _DEFERRED_MODULES loaded after running statement in a fresh interpreter."""
+    code = (
+        f"import sys\n{statement}\n"
+        f"print(__import__('json').dumps([m for m in {_DEFERRED_MODULES!r} "
+        "if m in sys.modules]))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout)
+
+
+class TestLazyImports:
+    """Test heavy dependencies are only imported on first use"""
+
+    def test_import_does_not_load_deferred_modules(self):
+        assert _loaded_modules("import square_authentication_helper") == []
+
+    def test_dict_calls_do_not_load_deferred_modules(self):
+        """Test a dict output call does not need the response models"""
+        statement = (
+            "from unittest.mock import patch\n"
+            "from square_authentication_helper import SquareAuthenticationHelper, TokenType\n"
+            "helper = SquareAuthenticationHelper()\n"
+            "with patch.object(helper, '_make_request', return_value={'data': None}):\n"
+            "    helper.validate_and_get_payload_from_token_v0("
+            "token='t', token_type=TokenType.access_token, app_id=1)"
+        )
+        assert _loaded_modules(statement) == []
+
+    def test_deferred_names_are_still_importable(self):
+        from square_authentication_helper import (
+            RecoveryMethodEnum,
+            RegisterUsernameV0Response,
+            StandardResponse,
+        )
+        from square_authentication_helper.pydantic_models import (
+            RegisterUsernameV0Response as model,
+        )
+        from square_commons.api_utils import StandardResponse as standard_response
+        from square_database_structure.square.authentication.enums import (
+            RecoveryMethodEnum as enum,
+        )
+
+        assert RegisterUsernameV0Response is model
+        assert RecoveryMethodEnum is enum
+        assert StandardResponse is standard_response
+
+    def test_pydantic_output_with_deferred_models(self):
+        helper = SquareAuthenticationHelper()
+        with patch.object(helper, "_make_request", return_value=b'{"data": null}'):
+            result = helper.logout_v0(refresh_token="t", response_as_pydantic=True)
+        assert result.data is None
+
+    def test_cli_resolves_postponed_annotations(self):
+        """Test enum arguments are still coerced from strings"""
+        from square_database_structure.square.authentication.enums import (
+            RecoveryMethodEnum,
+        )
+
+        helper = SquareAuthenticationHelper()
+        value = next(iter(RecoveryMethodEnum)).value
+        arguments = _coerce_arguments(
+            helper.update_user_recovery_methods_v0,
+            {"access_token": "a", "recovery_methods_to_add": [value]},
+        )
+        assert arguments["recovery_methods_to_add"] == [RecoveryMethodEnum(value)]
+
+    def test_star_import_exports_deferred_names(self):
+        """Test the deferred names are listed in __all__ and resolve on star import"""
+        for module in (
+            "square_authentication_helper",
+            "square_authentication_helper.main",
+            "square_authentication_helper.async_main",
+        ):
+            namespace = {}
+            exec(f"from {module} import *", namespace)
+            for name in (
+                "RecoveryMethodEnum",
+                "StandardResponse",
+                "GetUserDetailsV0Response",
+                "UnlinkAuthProviderV0Response",
+                "TokenType",
+            ):
+                assert name in namespace, (module, name)
+        namespace = {}
+        exec("from square_authentication_helper import *", namespace)
+        for name in (
+            "SquareAuthenticationHelper",
+            "AsyncSquareAuthenticationHelper",
+            "TokenSession",
+            "run_bulk",
+            "type_hints_namespace",
+        ):
+            assert name in namespace, name
+
+    def test_type_hints_namespace(self):
+        """Test get_type_hints resolves the deferred annotations with the namespace"""
+        import typing
+
+        from square_authentication_helper import type_hints_namespace
+        from square_authentication_helper.async_main import (
+            AsyncSquareAuthenticationHelper,
+        )
+        from square_database_structure.square.authentication.enums import (
+            RecoveryMethodEnum,
+        )
+
+        for helper_class in (
+            SquareAuthenticationHelper,
+            AsyncSquareAuthenticationHelper,
+        ):
+            method = helper_class.update_user_recovery_methods_v0
+            hints = typing.get_type_hints(
+                method, localns=type_hints_namespace(helper_class)
+            )
+            assert hints["recovery_methods_to_add"] == typing.List[RecoveryMethodEnum]
@@ -4,6 +4,7 @@ from unittest.mock import patch
 import pytest
 from square_authentication_helper.main import SquareAuthenticationHelper
 from square_authentication_helper.pydantic_models import TokenType
+from square_authentication_helper.transport import PooledTransport
 from square_database_structure.square.authentication.enums import RecoveryMethodEnum
 
 
@@ -29,6 +30,23 @@ class TestSquareAuthenticationHelperInit:
             == "https://192.168.1.1:8080"
         )
 
+    def test_init_pool_parameters(self):
+        """Test initialization passes pool settings to the transport"""
+        helper = SquareAuthenticationHelper(
+            param_int_pool_connections=4,
+            param_int_pool_maxsize=32,
+            param_float_pool_idle_timeout=30.0,
+        )
+        assert helper.global_transport.pool_connections == 4
+        assert helper.global_transport.pool_maxsize == 32
+        assert helper.global_transport.idle_timeout == 30.0
+
+    def test_context_manager_closes_transport(self):
+        """Test leaving the context manager closes the connection pool"""
+        with SquareAuthenticationHelper() as helper:
+            assert not helper.global_transport.closed
+        assert helper.global_transport.closed
+
     def test_init_with_exception(self):
         """Test initialization handles exceptions"""
         with patch(
@@ -47,7 +65,7 @@ class TestSquareAuthenticationHelperMakeRequest:
         """Fixture to create a SquareAuthenticationHelper instance"""
         return SquareAuthenticationHelper()
 
-    @patch("square_authentication_helper.main.make_request")
+    @patch.object(PooledTransport, "request")
     def test_make_request_success(self, mock_make_request, helper):
         """Test successful request"""
         mock_make_request.return_value = {"status": "success"}
@@ -65,11 +83,12 @@ class TestSquareAuthenticationHelperMakeRequest:
             params=None,
             headers=None,
             files=None,
+            timeout=None,
             return_type="json",
         )
         assert result == {"status": "success"}
 
-    @patch("square_authentication_helper.main.make_request")
+    @patch.object(PooledTransport, "request")
     def test_make_request_with_all_parameters(self, mock_make_request, helper):
         """Test request with all parameters"""
         mock_make_request.return_value = {"status": "success"}
@@ -87,7 +106,7 @@ class TestSquareAuthenticationHelperMakeRequest:
         mock_make_request.assert_called_once()
         assert result == {"status": "success"}
 
-    @patch("square_authentication_helper.main.make_request")
+    @patch.object(PooledTransport, "request")
     def test_make_request_exception(self, mock_make_request, helper):
         """Test request raises exception"""
         mock_make_request.side_effect = Exception("Request failed")
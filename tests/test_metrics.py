@@ -0,0 +1,179 @@
+import asyncio
+import json
+import urllib.request
+
+import pytest
+import requests
+from square_authentication_helper.async_main import AsyncSquareAuthenticationHelper
+from square_authentication_helper.cache import TTLCache
+from square_authentication_helper.main import SquareAuthenticationHelper
+from square_authentication_helper.metrics import (
+    MetricsRegistry,
+    MetricsSink,
+    serve_prometheus,
+)
+from square_authentication_helper.pydantic_models import TokenType
+from square_authentication_helper.resilience import RetryPolicy
+
+
+@pytest.fixture
+def flaky_server(stub_server_factory):
+    return stub_server_factory(
+        lambda request: {
+            "data": {"main": {"user_id": "u"}},
+            "message": None,
+            "log": None,
+        }
+    )
+
+
+def _helper(server, **kwargs):
+    return SquareAuthenticationHelper(
+        param_int_square_authentication_port=server.server_address[1],
+        param_str_square_authentication_ip="127.0.0.1",
+        **kwargs,
+    )
+
+
+class TestMetricsRegistry:
+    """Test the in memory sink and its prometheus export"""
+
+    def test_invalid_buckets(self):
+        with pytest.raises(ValueError):
+            MetricsRegistry(buckets=(1.0, 0.5))
+
+    def test_histogram_is_cumulative(self):
+        registry = MetricsRegistry(buckets=(0.1, 1.0))
+        registry.observe_request("a/v0", "GET", 0.05)
+        registry.observe_request("a/v0", "GET", 0.1)
+        registry.observe_request("a/v0", "GET", 5.0)
+        text = registry.render_prometheus()
+        assert (
+            'square_auth_request_duration_seconds_bucket{endpoint="a/v0",method="GET",le="0.1"} 2'
+            in text
+        )
+        assert (
+            'square_auth_request_duration_seconds_bucket{endpoint="a/v0",method="GET",le="1.0"} 2'
+            in text
+        )
+        assert (
+            'square_auth_request_duration_seconds_bucket{endpoint="a/v0",method="GET",le="+Inf"} 3'
+            in text
+        )
+        assert (
+            'square_auth_request_duration_seconds_count{endpoint="a/v0",method="GET"} 3'
+            in text
+        )
+        assert 'square_auth_requests_total{endpoint="a/v0",method="GET"} 3' in text
+
+    def test_errors_are_labelled_by_status_or_class(self):
+        registry = MetricsRegistry()
+        response = requests.Response()
+        response.status_code = 401
+        registry.observe_request(
+            "a/v0", "GET", 0.01, requests.HTTPError(response=response)
+        )
+        registry.observe_request("a/v0", "GET", 0.01, requests.ConnectionError())
+        assert registry.snapshot()["endpoints"]["a/v0 GET"]["errors"] == {
+            "401": 1,
+            "ConnectionError": 1,
+        }
+
+    def test_label_values_are_escaped(self):
+        registry = MetricsRegistry()
+        registry.observe_retry('a"b\\c', "GET")
+        assert (
+            'square_auth_request_retries_total{endpoint="a\\"b\\\\c",method="GET"} 1'
+            in registry.render_prometheus()
+        )
+
+    def test_serve_prometheus(self):
+        registry = MetricsRegistry()
+        registry.observe_request("a/v0", "GET", 0.01)
+        server = serve_prometheus(registry, port=0, host="127.0.0.1")
+        try:
+            with urllib.request.urlopen(
+                f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            ) as response:
+                assert response.headers["Content-Type"].startswith("text/plain")
+                assert "square_auth_requests_total" in response.read().decode()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class TestHelperMetrics:
+    """Test the helpers report to the configured sink"""
+
+    def test_requests_bytes_and_cache_are_recorded(self, flaky_server):
+        registry = MetricsRegistry()
+        cache = TTLCache(ttl=60)
+        with _helper(
+            flaky_server, param_metrics=registry, param_validation_cache=cache
+        ) as helper:
+            for _ in range(3):
+                result = helper.validate_and_get_payload_from_token_v0(
+                    token="t", token_type=TokenType.access_token, app_id=1
+                )
+            helper.register_username_v0(username="a", password="b")
+        assert result["data"]["main"]["user_id"] == "u"
+        snapshot = registry.snapshot()
+        validate = snapshot["endpoints"]["validate_and_get_payload_from_token/v0 GET"]
+        assert validate["requests"] == 1
+        assert validate["bytes_sent"] == 0
+        assert validate["bytes_received"] > 0
+        register = snapshot["endpoints"]["register_username/v0 POST"]
+        assert register["bytes_sent"] == len(
+            json.dumps({"username": "a", "password": "b", "app_id": None})
+        )
+        assert snapshot["caches"]["validation"]["hits"] == 2
+        assert (
+            'square_auth_cache_hit_ratio{cache="validation"} 0.6666666666666666'
+            in registry.render_prometheus()
+        )
+
+    def test_retries_and_errors_are_recorded(self, flaky_server):
+        registry = MetricsRegistry()
+        flaky_server.failures = 1
+        with _helper(
+            flaky_server,
+            param_metrics=registry,
+            param_retry_policy=RetryPolicy(base_delay=0),
+        ) as helper:
+            helper.get_user_details_v0(access_token="a")
+            flaky_server.failures = 1
+            with pytest.raises(requests.HTTPError):
+                helper.update_username_v0(new_username="b", access_token="a")
+        endpoints = registry.snapshot()["endpoints"]
+        assert endpoints["get_user_details/v0 GET"]["retries"] == 1
+        assert endpoints["get_user_details/v0 GET"]["errors"] == {}
+        assert endpoints["update_username/v0 PATCH"]["errors"] == {"503": 1}
+
+    def test_custom_sink(self, flaky_server):
+        """Test a sink only overriding observe_request"""
+        calls = []
+
+        class _Sink(MetricsSink):
+            def observe_request(self, endpoint, method, seconds, error=None):
+                calls.append((endpoint, method, error))
+
+        with _helper(flaky_server, param_metrics=_Sink()) as helper:
+            helper.get_user_details_v0(access_token="a")
+        assert calls == [("get_user_details/v0", "GET", None)]
+
+    def test_async_helper(self, flaky_server):
+        registry = MetricsRegistry()
+
+        async def run():
+            async with AsyncSquareAuthenticationHelper(
+                param_int_square_authentication_port=flaky_server.server_address[1],
+                param_str_square_authentication_ip="127.0.0.1",
+                param_metrics=registry,
+            ) as helper:
+                return await helper.get_user_details_v0(access_token="a")
+
+        result = asyncio.run(run())
+        assert result["data"]["main"]["user_id"] == "u"
+        endpoint = registry.snapshot()["endpoints"]["get_user_details/v0 GET"]
+        assert endpoint["requests"] == 1
+        assert endpoint["bytes_received"] > 0
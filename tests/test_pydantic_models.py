@@ -0,0 +1,82 @@
+import json
+from unittest.mock import patch
+
+from square_authentication_helper.main import SquareAuthenticationHelper
+from square_authentication_helper.pydantic_models import (
+    GetUserDetailsV0Response,
+    LogoutV0Response,
+    get_standard_response_model,
+)
+from square_commons.api_utils import StandardResponse
+
+GET_USER_DETAILS_RESPONSE = {
+    "data": {
+        "main": {
+            "user_id": "u1",
+            "username": "testuser",
+            "profile": {
+                "user_profile_id": 1,
+                "user_profile_photo_storage_token": None,
+                "user_profile_email": None,
+                "user_profile_phone_number_country_code": None,
+                "user_profile_phone_number": None,
+                "user_profile_first_name": None,
+                "user_profile_last_name": None,
+                "user_profile_email_verified": None,
+            },
+            "apps": ["app"],
+            "sessions": [{"app_name": "app", "active_sessions": 1}],
+            "recovery_methods": {"email": False},
+            "email_verification_details": None,
+            "backup_code_details": None,
+            "auth_providers": ["self"],
+        }
+    },
+    "message": None,
+    "log": None,
+}
+
+
+class TestGetStandardResponseModel:
+    """Test cached StandardResponse specializations"""
+
+    def test_specialization_is_cached(self):
+        """Test the same class is returned on every call"""
+        assert get_standard_response_model(
+            GetUserDetailsV0Response
+        ) is get_standard_response_model(GetUserDetailsV0Response)
+
+    def test_matches_subscripted_model(self):
+        """Test the cached class validates like StandardResponse[...]"""
+        model = get_standard_response_model(GetUserDetailsV0Response)
+        assert model.model_validate(GET_USER_DETAILS_RESPONSE) == StandardResponse[
+            GetUserDetailsV0Response
+        ](**GET_USER_DETAILS_RESPONSE)
+
+
+class TestPydanticResponses:
+    """Test response_as_pydantic=True parsing in the helper"""
+
+    @patch.object(SquareAuthenticationHelper, "_make_request")
+    def test_get_user_details_v0(self, mock_request):
+        mock_request.return_value = json.dumps(GET_USER_DETAILS_RESPONSE).encode()
+        result = SquareAuthenticationHelper().get_user_details_v0(
+            access_token="a", response_as_pydantic=True
+        )
+        mock_request.assert_called_once_with(
+            method="GET",
+            endpoint="get_user_details/v0",
+            headers={"access_token": "a"},
+            return_type="bytes",
+        )
+        assert result.data.main.profile.user_profile_id == 1
+        assert result.data.main.sessions[0].app_name == "app"
+
+    @patch.object(SquareAuthenticationHelper, "_make_request")
+    def test_logout_v0(self, mock_request):
+        mock_request.return_value = b'{"data": null, "message": "ok", "log": null}'
+        result = SquareAuthenticationHelper().logout_v0(
+            refresh_token="r", response_as_pydantic=True
+        )
+        assert isinstance(result, LogoutV0Response)
+        assert result.message == "ok"
@@ -0,0 +1,357 @@
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+from square_authentication_helper.async_main import AsyncSquareAuthenticationHelper
+from square_authentication_helper.main import SquareAuthenticationHelper
+from square_authentication_helper.cache import TTLCache, UserDetailsCache
+from square_authentication_helper.pydantic_models import TokenType
+from square_authentication_helper.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitState,
+    DeadlineExceededError,
+    RetryBudget,
+    RetryPolicy,
+    call_options,
+    get_attempt_timeout,
+)
+from square_authentication_helper.transport import AsyncPooledTransport, PooledTransport
+
+
+def _http_error(status_code):
+    response = MagicMock()
+    response.status_code = status_code
+    return requests.HTTPError(response=response)
+
+
+class TestRetryBudget:
+    """Test the retry token bucket"""
+
+    def test_exhausted_without_deposits(self):
+        budget = RetryBudget(ratio=0.5, min_retries_per_second=0, max_tokens=2)
+        assert budget.try_withdraw() and budget.try_withdraw()
+        assert not budget.try_withdraw()
+        budget.deposit()
+        budget.deposit()
+        assert budget.try_withdraw()
+        assert budget.exhausted == 1
+
+
+class TestRetryPolicy:
+    """Test retry classification, backoff and the budget"""
+
+    def test_full_jitter_is_capped(self):
+        policy = RetryPolicy(base_delay=0.1, max_delay=0.3)
+        for attempt in range(1, 10):
+            assert 0 <= policy.get_delay(attempt) <= 0.3
+
+    def test_is_retryable(self):
+        policy = RetryPolicy()
+        assert policy.is_retryable("GET", _http_error(503))
+        assert policy.is_retryable("GET", requests.ConnectionError())
+        assert not policy.is_retryable("GET", _http_error(400))
+        assert not policy.is_retryable("POST", _http_error(503))
+        assert RetryPolicy(retry_methods={"GET", "POST"}).is_retryable(
+            "POST", _http_error(503)
+        )
+
+    def test_retries_until_success(self):
+        policy = RetryPolicy(max_attempts=3, base_delay=0)
+        function = MagicMock(side_effect=[requests.Timeout(), _http_error(502), "ok"])
+        assert policy.call("GET", function) == "ok"
+        assert function.call_count == 3
+        assert policy.retries == 2
+
+    def test_gives_up_after_max_attempts(self):
+        policy = RetryPolicy(max_attempts=2, base_delay=0)
+        function = MagicMock(side_effect=requests.ConnectionError())
+        with pytest.raises(requests.ConnectionError):
+            policy.call("GET", function)
+        assert function.call_count == 2
+
+    def test_budget_stops_retries(self):
+        """Test an exhausted budget turns retries off"""
+        budget = RetryBudget(ratio=0, min_retries_per_second=0, max_tokens=1)
+        policy = RetryPolicy(max_attempts=5, base_delay=0, budget=budget)
+        function = MagicMock(side_effect=requests.ConnectionError())
+        for _ in range(2):
+            with pytest.raises(requests.ConnectionError):
+                policy.call("GET", function)
+        # one retry for the first call, none for the second.
+        assert function.call_count == 3
+
+
+class TestHelperRetries:
+    """Test retries in the helpers"""
+
+    def test_get_is_retried(self):
+        helper = SquareAuthenticationHelper(
+            param_retry_policy=RetryPolicy(base_delay=0)
+        )
+        with patch.object(
+            PooledTransport,
+            "request",
+            side_effect=[_http_error(503), {"data": {"main": {}}}],
+        ) as mock_request:
+            result = helper.get_user_details_v0(access_token="a")
+        assert result == {"data": {"main": {}}}
+        assert mock_request.call_count == 2
+
+    def test_writes_are_not_retried_by_default(self):
+        helper = SquareAuthenticationHelper(
+            param_retry_policy=RetryPolicy(base_delay=0)
+        )
+        with patch.object(
+            PooledTransport, "request", side_effect=_http_error(503)
+        ) as mock_request:
+            with pytest.raises(requests.HTTPError):
+                helper.update_username_v0(new_username="n", access_token="a")
+        assert mock_request.call_count == 1
+
+    def test_async_get_is_retried(self):
+        import httpx
+
+        async def run():
+            helper = AsyncSquareAuthenticationHelper(
+                param_retry_policy=RetryPolicy(base_delay=0)
+            )
+            return await helper.get_user_recovery_methods_v0(username="u")
+
+        with patch.object(
+            AsyncPooledTransport,
+            "request",
+            side_effect=[httpx.ConnectError("refused"), {"data": {"main": {}}}],
+        ) as mock_request:
+            assert asyncio.run(run()) == {"data": {"main": {}}}
+        assert mock_request.call_count == 2
+
+
+def _fail(error):
+    def function():
+        raise error
+
+    return function
+
+
+class TestCircuitBreaker:
+    """Test the closed / open / half open state machine"""
+
+    def test_opens_on_failure_rate(self):
+        breaker = CircuitBreaker(window_size=4, minimum_calls=4, reset_timeout=60)
+        breaker.call("a", lambda: "ok")
+        for _ in range(2):
+            with pytest.raises(requests.ConnectionError):
+                breaker.call("a", _fail(requests.ConnectionError()))
+        assert breaker.get_state("a") == CircuitState.closed
+        with pytest.raises(requests.ConnectionError):
+            breaker.call("a", _fail(requests.ConnectionError()))
+        assert breaker.get_state("a") == CircuitState.open
+
+        function = MagicMock()
+        with pytest.raises(CircuitOpenError):
+            breaker.call("a", function)
+        function.assert_not_called()
+        # circuits are per key.
+        assert breaker.call("b", lambda: "ok") == "ok"
+
+    def test_client_errors_are_not_failures(self):
+        breaker = CircuitBreaker(window_size=2, minimum_calls=2)
+        for _ in range(5):
+            with pytest.raises(requests.HTTPError):
+                breaker.call("a", _fail(_http_error(401)))
+        assert breaker.get_state("a") == CircuitState.closed
+
+    def test_half_open_trial(self):
+        """Test a successful trial closes the circuit and a failed one reopens it"""
+        breaker = CircuitBreaker(window_size=1, minimum_calls=1, reset_timeout=0.01)
+        with pytest.raises(requests.Timeout):
+            breaker.call("a", _fail(requests.Timeout()))
+        time.sleep(0.02)
+        assert breaker.get_state("a") == CircuitState.half_open
+        with pytest.raises(requests.Timeout):
+            breaker.call("a", _fail(requests.Timeout()))
+        assert breaker.get_state("a") == CircuitState.open
+        time.sleep(0.02)
+        assert breaker.call("a", lambda: "ok") == "ok"
+        assert breaker.get_state("a") == CircuitState.closed
+
+    def test_half_open_limits_trial_calls(self):
+        breaker = CircuitBreaker(window_size=1, minimum_calls=1, reset_timeout=0.01)
+        with pytest.raises(requests.Timeout):
+            breaker.call("a", _fail(requests.Timeout()))
+        time.sleep(0.02)
+        breaker.before_call("a")
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call("a")
+
+
+class TestHelperCircuitBreaker:
+    """Test fail fast and stale cache fallback in the helpers"""
+
+    def _open_breaker(self, helper):
+        breaker = helper.global_circuit_breaker
+        breaker.before_call(helper.global_str_square_authentication_url_base)
+        breaker.after_call(
+            helper.global_str_square_authentication_url_base,
+            requests.ConnectionError(),
+        )
+
+    def test_fails_fast_when_open(self):
+        helper = SquareAuthenticationHelper(
+            param_circuit_breaker=CircuitBreaker(window_size=1, minimum_calls=1)
+        )
+        self._open_breaker(helper)
+        with patch.object(PooledTransport, "request") as mock_request:
+            with pytest.raises(CircuitOpenError):
+                helper.logout_all_v0(access_token="a")
+        mock_request.assert_not_called()
+
+    def test_validation_served_stale_when_open(self):
+        cache = TTLCache(ttl=0.01, stale_ttl=60)
+        helper = SquareAuthenticationHelper(
+            param_validation_cache=cache,
+            param_circuit_breaker=CircuitBreaker(window_size=1, minimum_calls=1),
+        )
+        response = {"data": {"main": {"exp": time.time() + 60}}}
+        with patch.object(PooledTransport, "request", return_value=response):
+            helper.validate_and_get_payload_from_token_v0(
+                token="t", token_type=TokenType.access_token, app_id=1
+            )
+        time.sleep(0.02)
+        self._open_breaker(helper)
+
+        assert (
+            helper.validate_and_get_payload_from_token_v0(
+                token="t", token_type=TokenType.access_token, app_id=1
+            )
+            == response
+        )
+        with pytest.raises(CircuitOpenError):
+            helper.validate_and_get_payload_from_token_v0(
+                token="other", token_type=TokenType.access_token, app_id=1
+            )
+
+    def test_user_details_served_stale_when_open(self):
+        helper = SquareAuthenticationHelper(
+            param_user_details_cache=UserDetailsCache(ttl=0.01, stale_ttl=60),
+            param_circuit_breaker=CircuitBreaker(window_size=1, minimum_calls=1),
+        )
+        response = {"data": {"main": {"user_id": "u1"}}}
+        with patch.object(PooledTransport, "request", return_value=response):
+            helper.get_user_details_v0(access_token="a")
+        time.sleep(0.02)
+        self._open_breaker(helper)
+        assert helper.get_user_details_v0(access_token="a") == response
+
+
+@pytest.fixture
+def hanging_server(stub_server_factory):
+    return stub_server_factory(lambda request: {}, latency=1)
+
+
+class TestCallOptions:
+    """Test per call timeouts and deadlines"""
+
+    def test_defaults_and_overrides(self):
+        assert get_attempt_timeout(None, None) is None
+        assert get_attempt_timeout(1.0, 5.0) == (1.0, 5.0)
+        with call_options(read_timeout=2.0):
+            assert get_attempt_timeout(1.0, 5.0) == (1.0, 2.0)
+            with call_options(timeout=0.5):
+                assert get_attempt_timeout(1.0, 5.0) == (0.5, 0.5)
+        assert get_attempt_timeout(1.0, 5.0) == (1.0, 5.0)
+
+    def test_deadline_caps_timeouts(self):
+        with call_options(deadline=0.5):
+            connect_timeout, read_timeout = get_attempt_timeout(1.0, None)
+            assert connect_timeout <= 0.5 and read_timeout <= 0.5
+            # nested blocks can only shorten the deadline.
+            with call_options(deadline=10) as options:
+                assert options.deadline.remaining() <= 0.5
+
+    def test_expired_deadline(self):
+        with call_options(deadline=0):
+            with pytest.raises(DeadlineExceededError):
+                get_attempt_timeout(None, None)
+
+    def test_retry_never_outlives_deadline(self):
+        """Test no retry is started when its backoff would pass the deadline"""
+        helper = SquareAuthenticationHelper(
+            param_retry_policy=RetryPolicy(base_delay=5, max_delay=5, max_attempts=5)
+        )
+        with patch.object(
+            PooledTransport, "request", side_effect=requests.ConnectionError()
+        ) as mock_request:
+            start = time.monotonic()
+            with helper.call_options(deadline=0.05):
+                with pytest.raises(requests.ConnectionError):
+                    # the first backoff is random, retry until one is longer than the budget.
+                    for _ in range(20):
+                        helper.get_user_details_v0(access_token="a")
+        assert time.monotonic() - start < 1
+        assert mock_request.call_count >= 1
+
+    def test_helper_timeouts_passed_to_transport(self):
+        helper = SquareAuthenticationHelper(
+            param_float_connect_timeout=1.0, param_float_read_timeout=5.0
+        )
+        with patch.object(PooledTransport, "request", return_value={}) as mock_request:
+            helper.logout_all_v0(access_token="a")
+            with helper.call_options(read_timeout=2.0):
+                helper.logout_all_v0(access_token="a")
+        assert mock_request.call_args_list[0].kwargs["timeout"] == (1.0, 5.0)
+        assert mock_request.call_args_list[1].kwargs["timeout"] == (1.0, 2.0)
+
+    def test_deadline_on_hanging_server(self, hanging_server):
+        """Test a hung server is abandoned when the deadline runs out"""
+        helper = SquareAuthenticationHelper(
+            param_int_square_authentication_port=hanging_server.server_address[1],
+            param_str_square_authentication_ip="127.0.0.1",
+        )
+        start = time.monotonic()
+        with helper.call_options(deadline=0.2):
+            with pytest.raises(DeadlineExceededError):
+                helper.get_user_details_v0(access_token="a")
+        assert time.monotonic() - start < 0.8
+        helper.close()
+
+    def test_async_read_timeout(self, hanging_server):
+        async def run():
+            helper = AsyncSquareAuthenticationHelper(
+                param_int_square_authentication_port=hanging_server.server_address[1],
+                param_str_square_authentication_ip="127.0.0.1",
+                param_float_read_timeout=0.2,
+            )
+            try:
+                await helper.get_user_details_v0(access_token="a")
+            finally:
+                await helper.close()
+
+        import httpx
+
+        start = time.monotonic()
+        with pytest.raises(httpx.ReadTimeout):
+            asyncio.run(run())
+        assert time.monotonic() - start < 0.8
+
+    @pytest.mark.parametrize("retry_policy", [None, RetryPolicy(base_delay=0)])
+    def test_async_deadline_bounds_the_whole_attempt(self, retry_policy):
+        """Test the deadline cancels an attempt the transport timeouts would not end"""
+
+        async def slow_request(**kwargs):
+            # e.g. a body trickling in, every read finishes within the read timeout.
+            await asyncio.sleep(5)
+
+        async def run():
+            helper = AsyncSquareAuthenticationHelper(param_retry_policy=retry_policy)
+            with helper.call_options(deadline=0.1):
+                await helper.get_user_details_v0(access_token="a")
+
+        start = time.monotonic()
+        with patch.object(AsyncPooledTransport, "request", side_effect=slow_request):
+            with pytest.raises(DeadlineExceededError):
+                asyncio.run(run())
+        assert time.monotonic() - start < 1
@@ -0,0 +1,193 @@
+import asyncio
+import base64
+import json
+import threading
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from square_authentication_helper.token_session import AsyncTokenSession, TokenSession
+
+
+def make_token(exp):
+    def segment(value):
+        return (
+            base64.urlsafe_b64encode(json.dumps(value).encode()).rstrip(b"=").decode()
+        )
+
+    return f"{segment({'alg': 'HS256'})}.{segment({'exp': exp})}.signature"
+
+
+def refresh_response(exp):
+    return {"data": {"main": {"access_token": make_token(exp)}}}
+
+
+def login_response(exp):
+    return {
+        "data": {
+            "main": {
+                "user_id": "u1",
+                "access_token": make_token(exp),
+                "refresh_token": "refresh123",
+                "refresh_token_expiry_time": "",
+            }
+        }
+    }
+
+
+class TestTokenSession:
+    """Test automatic access token refresh"""
+
+    def test_from_response_uses_existing_token(self):
+        """Test a fresh access token from login is used as is"""
+        helper = MagicMock()
+        session = TokenSession.from_response(helper, login_response(time.time() + 600))
+
+        session.get_access_token()
+
+        helper.generate_access_token_v0.assert_not_called()
+        assert session.refresh_token == "refresh123"
+
+    def test_refreshes_before_expiry(self):
+        """Test the token is refreshed once inside the refresh margin"""
+        helper = MagicMock()
+        helper.generate_access_token_v0.return_value = refresh_response(
+            time.time() + 600
+        )
+        session = TokenSession.from_response(
+            helper, login_response(time.time() + 10), refresh_margin=30
+        )
+
+        token = session.get_access_token()
+        session.get_access_token()
+
+        helper.generate_access_token_v0.assert_called_once_with(
+            refresh_token="refresh123"
+        )
+        assert (
+            token
+            == helper.generate_access_token_v0.return_value["data"]["main"][
+                "access_token"
+            ]
+        )
+
+    def test_missing_access_token_triggers_refresh(self):
+        """Test sessions created without an access token refresh on first use"""
+        helper = MagicMock()
+        helper.generate_access_token_v0.return_value = refresh_response(
+            time.time() + 600
+        )
+        session = TokenSession(helper, refresh_token="refresh123")
+
+        session.get_access_token()
+
+        assert session.refresh_count == 1
+
+    def test_single_flight_refresh(self):
+        """Test concurrent callers trigger exactly one refresh"""
+        helper = MagicMock()
+
+        def slow_refresh(refresh_token):
+            time.sleep(0.05)
+            return refresh_response(time.time() + 600)
+
+        helper.generate_access_token_v0.side_effect = slow_refresh
+        session = TokenSession(helper, refresh_token="refresh123")
+        threads = [threading.Thread(target=session.get_access_token) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert helper.generate_access_token_v0.call_count == 1
+
+    def test_single_flight_forced_refresh(self):
+        """Test callers forcing a refresh together trigger exactly one refresh"""
+        helper = MagicMock()
+
+        def slow_refresh(refresh_token):
+            time.sleep(0.1)
+            return refresh_response(time.time() + 600)
+
+        helper.generate_access_token_v0.side_effect = slow_refresh
+        session = TokenSession.from_response(helper, login_response(time.time() + 600))
+        barrier = threading.Barrier(20)
+        tokens = []
+
+        def force_refresh():
+            barrier.wait()
+            tokens.append(session.refresh())
+
+        threads = [threading.Thread(target=force_refresh) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert helper.generate_access_token_v0.call_count == 1
+        assert set(tokens) == {session.access_token}
+        session.refresh()
+        assert helper.generate_access_token_v0.call_count == 2
+
+    def test_call_injects_access_token(self):
+        """Test call passes the current access token to the helper method"""
+        helper = MagicMock()
+        session = TokenSession.from_response(helper, login_response(time.time() + 600))
+
+        session.call("get_user_details_v0", response_as_pydantic=False)
+
+        helper.get_user_details_v0.assert_called_once_with(
+            access_token=session.access_token, response_as_pydantic=False
+        )
+
+    def test_requires_refresh_token(self):
+        """Test responses without a refresh token are rejected"""
+        with pytest.raises(ValueError):
+            TokenSession.from_response(MagicMock(), {"data": {"main": {}}})
+
+
+class TestAsyncTokenSession:
+    """Test the asyncio token session"""
+
+    def test_single_flight_refresh(self):
+        """Test concurrent tasks trigger exactly one refresh"""
+        helper = MagicMock()
+
+        async def slow_refresh(refresh_token):
+            await asyncio.sleep(0.01)
+            return refresh_response(time.time() + 600)
+
+        helper.generate_access_token_v0 = AsyncMock(side_effect=slow_refresh)
+        helper.get_user_details_v0 = AsyncMock(return_value={"data": None})
+
+        async def run():
+            session = AsyncTokenSession(helper, refresh_token="refresh123")
+            await asyncio.gather(
+                *(session.call("get_user_details_v0") for _ in range(20))
+            )
+
+        asyncio.run(run())
+
+        assert helper.generate_access_token_v0.await_count == 1
+        assert helper.get_user_details_v0.await_count == 20
+
+    def test_single_flight_forced_refresh(self):
+        """Test tasks forcing a refresh together trigger exactly one refresh"""
+        helper = MagicMock()
+
+        async def slow_refresh(refresh_token):
+            await asyncio.sleep(0.01)
+            return refresh_response(time.time() + 600)
+
+        helper.generate_access_token_v0 = AsyncMock(side_effect=slow_refresh)
+
+        async def run():
+            session = AsyncTokenSession.from_response(
+                helper, login_response(time.time() + 600)
+            )
+            return await asyncio.gather(*(session.refresh() for _ in range(20)))
+
+        tokens = asyncio.run(run())
+
+        assert helper.generate_access_token_v0.await_count == 1
+        assert len(set(tokens)) == 1
@@ -0,0 +1,262 @@
+import asyncio
+import json
+import socket
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+from square_authentication_helper.async_main import AsyncSquareAuthenticationHelper
+from square_authentication_helper.main import SquareAuthenticationHelper
+from square_authentication_helper.pydantic_models import TokenType
+from square_authentication_helper.transport import (
+    Http2Transport,
+    PooledTransport,
+    split_unix_url,
+)
+
+
+def _echo_path(request):
+    request.server.connections.add(id(request.connection))
+    return {"data": {"main": {"path": request.path}}, "message": None, "log": None}
+
+
+@pytest.fixture
+def unix_server(stub_server_factory):
+    server = stub_server_factory(_echo_path, unix_socket=True)
+    server.connections = set()
+    return server
+
+
+def _handle_h2_connection(sock):
+    import h2.config
+    import h2.connection
+    import h2.events
+
+    connection = h2.connection.H2Connection(
+        h2.config.H2Configuration(client_side=False)
+    )
+    connection.initiate_connection()
+    sock.sendall(connection.data_to_send())
+    paths = {}
+    with sock:
+        while True:
+            try:
+                data = sock.recv(65535)
+            except OSError:
+                return
+            if not data:
+                return
+            for event in connection.receive_data(data):
+                if isinstance(event, h2.events.RequestReceived):
+                    paths[event.stream_id] = dict(event.headers)[b":path"].decode()
+                elif isinstance(event, h2.events.StreamEnded):
+                    body = json.dumps(
+                        {
+                            "data": {"main": {"path": paths.pop(event.stream_id)}},
+                            "message": None,
+                            "log": None,
+                        }
+                    ).encode()
+                    connection.send_headers(
+                        event.stream_id,
+                        [
+                            (":status", "200"),
+                            ("content-type", "application/json"),
+                            ("content-length", str(len(body))),
+                        ],
+                    )
+                    connection.send_data(event.stream_id, body, end_stream=True)
+            sock.sendall(connection.data_to_send())
+
+
+@pytest.fixture
+def h2c_server():
+    """plain text http/2 server counting the connections it accepts."""
+    pytest.importorskip("h2")
+    listener = socket.create_server(("127.0.0.1", 0))
+    connections = []
+
+    def serve():
+        while True:
+            try:
+                sock, _ = listener.accept()
+            except OSError:
+                return
+            connections.append(sock)
+            threading.Thread(
+                target=_handle_h2_connection, args=(sock,), daemon=True
+            ).start()
+
+    threading.Thread(target=serve, daemon=True).start()
+    yield listener.getsockname(), connections
+    listener.close()
+
+
+@pytest.fixture
+def local_server(stub_server_factory):
+    return stub_server_factory(
+        lambda request: {"client_port": request.client_address[1]}
+    )
+
+
+class TestPooledTransport:
+    """Test the pooled keep-alive transport"""
+
+    def test_invalid_pool_size(self):
+        """Test pool sizes must be positive"""
+        with pytest.raises(ValueError):
+            PooledTransport(pool_maxsize=0)
+
+    def test_request_formats_headers_and_url(self):
+        """Test headers and url are built like square_commons.make_request"""
+        transport = PooledTransport()
+        response = MagicMock()
+        response.json.return_value = {"data": None}
+        with patch.object(
+            transport.session, "request", return_value=response
+        ) as mock_request:
+            result = transport.request(
+                method="GET",
+                url="http://localhost:10011/",
+                endpoint="/get_user_details/v0",
+                headers={"access_token": "abc"},
+            )
+        assert result == {"data": None}
+        args, kwargs = mock_request.call_args
+        assert args == ("GET", "http://localhost:10011/get_user_details/v0")
+        assert kwargs["headers"] == {"access-token": "abc"}
+        response.raise_for_status.assert_called_once()
+
+    def test_idle_timeout_drops_pool(self):
+        """Test an idle pool is cleared before the next request"""
+        transport = PooledTransport(idle_timeout=0.01)
+        transport._float_last_used -= 1
+        with (
+            patch.object(transport.session, "close") as mock_close,
+            patch.object(transport.session, "request"),
+        ):
+            transport.request(
+                method="GET", url="http://localhost", return_type="response"
+            )
+        mock_close.assert_called_once()
+
+    def test_request_after_close_raises(self):
+        """Test a closed transport refuses new requests"""
+        transport = PooledTransport()
+        transport.close()
+        with pytest.raises(RuntimeError):
+            transport.request(method="GET", url="http://localhost")
+
+    def test_connections_are_reused(self, local_server):
+        """Test repeated calls through the helper reuse one socket"""
+        host, port = local_server.server_address
+        with SquareAuthenticationHelper(
+            param_int_square_authentication_port=port,
+            param_str_square_authentication_ip=host,
+        ) as helper:
+            ports = {
+                helper._make_request(method="GET", endpoint="ping")["client_port"]
+                for _ in range(5)
+            }
+        assert len(ports) == 1
+
+
+class TestUnixSocket:
+    """Test unix:// base urls"""
+
+    def test_split_unix_url(self):
+        """Test the socket path and request path are separated"""
+        assert split_unix_url("unix:///run/auth.sock", "/get_user_details/v0") == (
+            "/run/auth.sock",
+            "/get_user_details/v0",
+        )
+        assert split_unix_url("http://localhost:10011/", "/ping") == (
+            None,
+            "http://localhost:10011/ping",
+        )
+
+    def test_sync_helper_over_unix_socket(self, unix_server):
+        """Test the sync helper talks to a unix socket and keeps the connection alive"""
+        with SquareAuthenticationHelper(
+            param_str_square_authentication_url=unix_server.url
+        ) as helper:
+            for _ in range(3):
+                result = helper.validate_and_get_payload_from_token_v0(
+                    token="t", token_type=TokenType.access_token, app_id=1
+                )
+        assert result["data"]["main"]["path"].startswith(
+            "/validate_and_get_payload_from_token/v0?"
+        )
+        assert len(unix_server.connections) == 1
+
+    def test_async_helper_over_unix_socket(self, unix_server):
+        """Test the async helper talks to a unix socket"""
+
+        async def run():
+            async with AsyncSquareAuthenticationHelper(
+                param_str_square_authentication_url=unix_server.url
+            ) as helper:
+                return await helper.validate_and_get_payload_from_token_v0(
+                    token="t", token_type=TokenType.access_token, app_id=1
+                )
+
+        result = asyncio.run(run())
+        assert result["data"]["main"]["path"].startswith(
+            "/validate_and_get_payload_from_token/v0?"
+        )
+
+
+class TestHttp2:
+    """Test the http/2 transports"""
+
+    def test_invalid_pool_size(self):
+        """Test pool sizes must be positive"""
+        with pytest.raises(ValueError):
+            Http2Transport(pool_maxsize=0)
+
+    def test_sync_calls_share_one_connection(self, h2c_server):
+        """Test concurrent sync calls are multiplexed over one connection"""
+        (host, port), connections = h2c_server
+        with SquareAuthenticationHelper(
+            param_int_square_authentication_port=port,
+            param_str_square_authentication_ip=host,
+            param_bool_http2=True,
+        ) as helper:
+            assert isinstance(helper.global_transport, Http2Transport)
+            results = helper.validate_tokens_bulk(
+                [f"token_{i}" for i in range(20)],
+                TokenType.access_token,
+                app_id=1,
+                max_concurrency=10,
+            )
+            response = helper.global_transport.request(
+                method="GET", url=f"http://{host}:{port}", return_type="response"
+            )
+        assert all(result.ok for result in results)
+        assert response.http_version == "HTTP/2"
+        assert len(connections) == 1
+
+    def test_async_calls_share_one_connection(self, h2c_server):
+        """Test concurrent async calls are multiplexed over one connection"""
+        (host, port), connections = h2c_server
+
+        async def run():
+            async with AsyncSquareAuthenticationHelper(
+                param_int_square_authentication_port=port,
+                param_str_square_authentication_ip=host,
+                param_bool_http2=True,
+            ) as helper:
+                return await asyncio.gather(
+                    *(
+                        helper.validate_and_get_payload_from_token_v0(
+                            token=f"token_{i}",
+                            token_type=TokenType.access_token,
+                            app_id=1,
+                        )
+                        for i in range(20)
+                    )
+                )
+
+        results = asyncio.run(run())
+        assert len(results) == 20
+        assert len(connections) == 1